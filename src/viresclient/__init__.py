@@ -30,9 +30,15 @@
 from . import _data
 from ._api.token import TokenManager
 from ._api.upload import DataUpload
+from ._cache import MetadataCache, ResponseCache
 from ._client_aeolus import AeolusRequest
+from ._client_async import AsyncAeolusRequest, AsyncSwarmRequest
 from ._client_swarm import SwarmRequest
 from ._config import ClientConfig, set_token
 from ._data_handling import ReturnedData, ReturnedDataFile
+from ._shc import SHCModel
+from ._store import DataStore
+from ._wps.polling import BackoffPolling, FixedPolling, PredictivePolling
+from ._wps.retry import RetryPolicy
 
 __version__ = "0.16.0"
@@ -0,0 +1,402 @@
+# -------------------------------------------------------------------------------
+#
+# Caches of the downloaded data and metadata
+#
+# Authors: Ashley Smith <ashley.smith@ed.ac.uk>
+#          Martin Paces <martin.paces@eox.at>
+#
+# -------------------------------------------------------------------------------
+# Copyright (C) 2026 EOX IT Services GmbH
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies of this Software or works derived from this Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+# -------------------------------------------------------------------------------
+
+import json
+import os
+import shutil
+from datetime import timedelta
+from hashlib import sha256
+from tempfile import NamedTemporaryFile
+from threading import Lock
+from time import time
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.path.expanduser("~"), ".cache", "viresclient", "responses"
+)
+DEFAULT_MAX_SIZE = 5 * 1024**3  # 5 GiB
+
+# (collection name pattern, time-to-live) pairs - the first match applies
+DEFAULT_TTL_RULES = (
+    # FAST products are replaced by the OPER products and may change
+    ("_FAST_", timedelta(hours=12)),
+    ("_OPER_", timedelta(days=30)),
+)
+DEFAULT_TTL = timedelta(days=1)
+
+# time-to-live of the cached metadata responses per call
+DEFAULT_METADATA_TTLS = {
+    "available_times": timedelta(hours=1),
+    "get_collection_info": timedelta(hours=1),
+    "available_observatories": timedelta(hours=1),
+    "get_model_info": timedelta(days=1),
+    "list_jobs": timedelta(seconds=10),
+}
+DEFAULT_METADATA_TTL = timedelta(hours=1)
+
+
+class ResponseCache:
+    """On-disk cache of the downloaded data.
+
+    The responses are stored under a key calculated from the server URL
+    and the canonical form of the rendered request, i.e., only exactly
+    the same request to the same server is served from the cache.
+
+    The cached responses expire after the time-to-live (TTL) given by the
+    first rule matching any of the requested collections. By default, the
+    responses of the FAST collections expire after 12 hours, the OPER
+    collections after 30 days and the others after 1 day.
+    When the total size of the cache exceeds max_size, the least recently
+    used responses are removed.
+
+    The cache can be shared by multiple requests, threads and processes.
+
+    Example usage::
+
+        from viresclient import ResponseCache, SwarmRequest
+
+        request = SwarmRequest(cache=ResponseCache(max_size=10e9))
+
+    Args:
+        path (str): cache directory (defaults to ~/.cache/viresclient/responses)
+        max_size (int): maximum total size of the cached data in bytes
+        ttl_rules (list): (pattern, timedelta) pairs, the pattern being
+            a part of the collection name, e.g., ``("_FAST_", timedelta(hours=1))``
+        default_ttl (timedelta): TTL of the collections not matched
+            by any rule (None means no expiry)
+    """
+
+    def __init__(
+        self,
+        path=None,
+        max_size=DEFAULT_MAX_SIZE,
+        ttl_rules=DEFAULT_TTL_RULES,
+        default_ttl=DEFAULT_TTL,
+    ):
+        self.path = os.path.expanduser(path or DEFAULT_CACHE_DIR)
+        self.max_size = max_size
+        self.ttl_rules = list(ttl_rules or ())
+        self.default_ttl = default_ttl
+        self._lock = Lock()
+        os.makedirs(self.path, exist_ok=True)
+
+    def __str__(self):
+        return f"viresclient ResponseCache at {self.path}"
+
+    @staticmethod
+    def get_key(url, request):
+        """Get cache key of the request sent to the server URL."""
+        if isinstance(request, str):
+            request = request.encode("UTF-8")
+        # canonical form - whitespace differences of the rendered
+        # templates do not matter
+        canonical_request = b" ".join(request.split())
+        digest = sha256(url.encode("UTF-8"))
+        digest.update(b"\0")
+        digest.update(canonical_request)
+        return digest.hexdigest()
+
+    def get_ttl(self, collections):
+        """Get the time-to-live of the response of the given collections."""
+        ttls = []
+        for collection in collections:
+            for pattern, ttl in self.ttl_rules:
+                if pattern in collection:
+                    ttls.append(ttl)
+                    break
+            else:
+                ttls.append(self.default_ttl)
+        ttls = [ttl for ttl in ttls or [self.default_ttl] if ttl is not None]
+        return min(ttls) if ttls else None
+
+    def get(self, key, filename):
+        """Copy the cached response to the given file.
+        Returns the size of the response in bytes or None if not cached.
+        """
+        data_path, _ = self._get_paths(key)
+        try:
+            if self._is_expired(key):
+                self._remove(key)
+                return None
+            with open(data_path, "rb") as file_in:
+                with open(filename, "wb") as file_out:
+                    shutil.copyfileobj(file_in, file_out)
+                    size = file_out.tell()
+            # record the access time for the LRU eviction
+            os.utime(data_path)
+        except (OSError, ValueError):
+            return None
+        return size
+
+    def put(self, key, filename, collections=()):
+        """Store a copy of the response file in the cache."""
+        data_path, meta_path = self._get_paths(key)
+        os.makedirs(os.path.dirname(data_path), exist_ok=True)
+        ttl = self.get_ttl(collections)
+        metadata = {
+            "created": time(),
+            "expires": None if ttl is None else time() + ttl.total_seconds(),
+            "collections": list(collections),
+        }
+        with open(filename, "rb") as file_in:
+            self._write_atomic(
+                data_path, lambda file: shutil.copyfileobj(file_in, file)
+            )
+        self._write_atomic(
+            meta_path, lambda file: file.write(json.dumps(metadata).encode("UTF-8"))
+        )
+        self.evict()
+
+    def evict(self, max_size=None):
+        """Remove the expired and least recently used responses until
+        the total size of the cache is not greater than max_size.
+        """
+        max_size = self.max_size if max_size is None else max_size
+        with self._lock:
+            entries = []
+            for entry in sorted(self._list_entries()):
+                _, _, key = entry
+                try:
+                    expired = self._is_expired(key)
+                except (OSError, ValueError):
+                    expired = False
+                if expired:
+                    self._remove(key)
+                else:
+                    entries.append(entry)
+            total_size = sum(size for _, size, _ in entries)
+            for _, size, key in entries:
+                if max_size is None or total_size <= max_size:
+                    break
+                self._remove(key)
+                total_size -= size
+
+    def clear(self):
+        """Remove all cached responses."""
+        self.evict(max_size=0)
+
+    @property
+    def size(self):
+        """Total size of the cached responses in bytes."""
+        return sum(size for _, size, _ in self._list_entries())
+
+    def _list_entries(self):
+        """List (access time, size, key) tuples of the cached responses."""
+        for dirpath, _, filenames in os.walk(self.path):
+            for filename in filenames:
+                if filename.endswith((".json", ".part")):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(dirpath, filename))
+                except OSError:
+                    continue
+                yield stat.st_mtime, stat.st_size, filename
+
+    def _is_expired(self, key):
+        """Check if the TTL of the cached response has passed."""
+        _, meta_path = self._get_paths(key)
+        with open(meta_path, encoding="UTF-8") as file:
+            expires = json.load(file).get("expires")
+        return expires is not None and expires < time()
+
+    def _get_paths(self, key):
+        data_path = os.path.join(self.path, key[:2], key)
+        return data_path, f"{data_path}.json"
+
+    def _remove(self, key):
+        for path in self._get_paths(key):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    @staticmethod
+    def _write_atomic(path, write):
+        """Write file via a temporary file renamed to the target path."""
+        with NamedTemporaryFile(
+            dir=os.path.dirname(path), suffix=".part", delete=False
+        ) as file:
+            try:
+                write(file)
+            except BaseException:
+                file.close()
+                os.remove(file.name)
+                raise
+        os.replace(file.name, path)
+
+
+class MetadataCache:
+    """Cache of the metadata requests.
+
+    The responses of the :py:meth:`available_times`,
+    :py:meth:`get_collection_info`, :py:meth:`available_observatories`,
+    :py:meth:`get_model_info` and :py:meth:`list_jobs` calls are kept in memory
+    and reused until their time-to-live (TTL) expires. The responses are
+    stored under a key calculated from the server URL, the user credentials
+    and the canonical form of the rendered request.
+
+    By default, the job list expires after 10 seconds, the model information
+    after 1 day and the other responses after 1 hour. The cached responses
+    can be dropped explicitly by :py:meth:`invalidate`.
+
+    If a path is given, the responses are also persisted on disk and shared
+    by multiple processes and sessions.
+
+    The cache can be shared by multiple requests and threads.
+
+    Example usage::
+
+        from viresclient import MetadataCache, SwarmRequest
+
+        cache = MetadataCache()
+        request = SwarmRequest(metadata_cache=cache)
+        request.available_times("SW_OPER_MAGA_LR_1B")  # server request
+        request.available_times("SW_OPER_MAGA_LR_1B")  # cached response
+        cache.invalidate("available_times")
+
+    Args:
+        path (str): optional directory persisting the cached responses
+        ttls (dict): call name to TTL (timedelta) mapping overriding
+            the defaults
+        default_ttl (timedelta): TTL of the calls not listed in ttls
+    """
+
+    def __init__(self, path=None, ttls=None, default_ttl=DEFAULT_METADATA_TTL):
+        self.path = os.path.expanduser(path) if path else None
+        self.ttls = {**DEFAULT_METADATA_TTLS, **(ttls or {})}
+        self.default_ttl = default_ttl
+        self._entries = {}
+        self._lock = Lock()
+        if self.path:
+            os.makedirs(self.path, exist_ok=True)
+
+    def __str__(self):
+        if self.path:
+            return f"viresclient MetadataCache at {self.path}"
+        return "viresclient MetadataCache"
+
+    @staticmethod
+    def get_key(call, url, request, headers=None):
+        """Get cache key of the metadata request sent to the server URL."""
+        if isinstance(request, str):
+            request = request.encode("UTF-8")
+        # different users may see different content (e.g., the job list)
+        authorization = (headers or {}).get(b"Authorization", b"")
+        if isinstance(authorization, str):
+            authorization = authorization.encode("UTF-8")
+        digest = sha256(call.encode("UTF-8"))
+        for item in (url.encode("UTF-8"), authorization, b" ".join(request.split())):
+            digest.update(b"\0")
+            digest.update(item)
+        return digest.hexdigest()
+
+    def get_ttl(self, call):
+        """Get the time-to-live of the response of the given call."""
+        return self.ttls.get(call, self.default_ttl)
+
+    def get(self, call, key):
+        """Get the cached response or None if not cached or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None and self.path:
+            entry = self._load(call, key)
+        if entry is None:
+            return None
+        _, expires, response = entry
+        if expires is not None and expires < time():
+            with self._lock:
+                self._entries.pop(key, None)
+            return None
+        with self._lock:
+            self._entries[key] = entry
+        return response
+
+    def put(self, call, key, response):
+        """Store the response of the call in the cache."""
+        ttl = self.get_ttl(call)
+        expires = None if ttl is None else time() + ttl.total_seconds()
+        entry = (call, expires, response)
+        with self._lock:
+            self._entries[key] = entry
+        if self.path:
+            self._save(call, key, entry)
+
+    def invalidate(self, call=None):
+        """Drop the cached responses of the given call (e.g.,
+        ``"available_times"``) or all cached responses.
+        """
+        with self._lock:
+            self._entries = {
+                key: entry
+                for key, entry in self._entries.items()
+                if call is not None and entry[0] != call
+            }
+        if self.path:
+            if call is None:
+                paths = [
+                    os.path.join(self.path, name) for name in os.listdir(self.path)
+                ]
+            else:
+                paths = [self._get_call_dir(call)]
+            for path in paths:
+                if os.path.isdir(path):
+                    shutil.rmtree(path, ignore_errors=True)
+
+    def clear(self):
+        """Remove all cached responses."""
+        self.invalidate()
+
+    def _get_call_dir(self, call):
+        return os.path.join(self.path, call)
+
+    def _load(self, call, key):
+        try:
+            with open(
+                os.path.join(self._get_call_dir(call), f"{key}.json"), encoding="UTF-8"
+            ) as file:
+                data = json.load(file)
+            return call, data["expires"], data["response"].encode("UTF-8")
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _save(self, call, key, entry):
+        _, expires, response = entry
+        path = os.path.join(self._get_call_dir(call), f"{key}.json")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = {
+            "call": call,
+            "expires": expires,
+            "response": response.decode("UTF-8"),
+        }
+        ResponseCache._write_atomic(
+            path, lambda file: file.write(json.dumps(data).encode("UTF-8"))
+        )
+
+
+# process-wide metadata cache shared by the requests (metadata_cache=True)
+SHARED_METADATA_CACHE = MetadataCache()
@@ -30,8 +30,11 @@
 import importlib
 import json
 import os
-from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from hashlib import sha256
 from logging import CRITICAL, DEBUG, ERROR, INFO, WARNING, getLogger
+from threading import Lock
 
 # Identify whether code is running in Jupyter notebook or not
 try:
@@ -50,8 +53,11 @@ from io import StringIO
 
 from pandas import read_csv, to_datetime
 
+from ._cache import SHARED_METADATA_CACHE, MetadataCache, ResponseCache
 from ._config import ClientConfig, set_token
-from ._data_handling import ReturnedData
+from ._data_handling import ReturnedData, ReturnedDataFile
+from ._manifest import ChunkManifest
+from ._store import DataStore
 
 # from jinja2 import Environment, FileSystemLoader
 from ._wps.environment import JINJA2_ENVIRONMENT
@@ -88,6 +94,9 @@ CONFIG_FILE_PATH = os.path.join(os.path.expanduser("~"), ".viresclient,ini")
 # Maximum time-chunk size ~25 years
 MAX_CHUNK_DURATION = timedelta(days=25 * 365.25)
 
+# Tolerance of the product time extents used by the gap-aware chunk planning
+PRODUCT_TIME_MARGIN = timedelta(minutes=1)
+
 TEMPLATE_FILES = {
     "list_jobs": "vires_list_jobs.xml",
     "getTimeData": "vires_getTimeData.xml",
@@ -252,6 +261,120 @@ class ProgressBarDownloading(ProgressBar):
             self.refresh_tqdm()
 
 
+def _to_datetime(timestamp, reference):
+    """Convert pandas Timestamp to a datetime object of the same kind (naive
+    UTC or timezone aware) as the reference datetime.
+    """
+    value = timestamp.to_pydatetime()
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    if reference.tzinfo is not None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+class AdaptiveChunkPlanner:
+    """Plans the chunk intervals of a long request one by one.
+
+    The first chunk covers the interval holding at most nrecords_limit
+    records at the nominal sampling step, i.e., the worst case assuming
+    no records are filtered out. The number of records per second observed
+    in the completed chunks is then used to stretch (or shrink back)
+    the following chunks so that they are expected to hold about
+    fill_factor * nrecords_limit records. The chunks are never shorter
+    than the worst-case interval and grow by max_growth at most.
+
+    The planner can be shared by multiple threads.
+    """
+
+    def __init__(
+        self,
+        start_time,
+        end_time,
+        sampling_step,
+        nrecords_limit,
+        fill_factor=0.8,
+        max_growth=4,
+    ):
+        self.end_time = end_time
+        self.nrecords_limit = nrecords_limit
+        self.fill_factor = fill_factor
+        self.max_growth = max_growth
+        self.base_duration = min(
+            timedelta(
+                seconds=(nrecords_limit * parse_duration(sampling_step).total_seconds())
+            ),
+            MAX_CHUNK_DURATION,
+        )
+        self.nplanned = 0
+        self._duration = self.base_duration
+        self._density = 0.0  # maximum observed number of records per second
+        self._next_time = start_time
+        self._pending = []  # rejected intervals to be processed again
+        self._finished = False
+        self._lock = Lock()
+
+    def next_interval(self):
+        """Get the next (start, end) interval or None if there is none left."""
+        with self._lock:
+            if self._pending:
+                interval = self._pending.pop(0)
+            elif self._finished:
+                return None
+            else:
+                start_time = self._next_time
+                end_time = min(start_time + self._duration, self.end_time)
+                self._next_time = end_time
+                self._finished = end_time >= self.end_time
+                interval = (start_time, end_time)
+            self.nplanned += 1
+            return interval
+
+    def update(self, interval, nrecords):
+        """Adjust the following chunks to the number of records of the
+        completed chunk.
+        """
+        start_time, end_time = interval
+        duration = (end_time - start_time).total_seconds()
+        if nrecords is None or duration <= 0:
+            return
+        with self._lock:
+            self._density = max(self._density, nrecords / duration)
+            if self._density > 0:
+                duration = timedelta(
+                    seconds=self.nrecords_limit * self.fill_factor / self._density
+                )
+            else:
+                duration = MAX_CHUNK_DURATION
+            self._duration = max(
+                self.base_duration,
+                min(duration, self._duration * self.max_growth, MAX_CHUNK_DURATION),
+            )
+
+    def reject(self, interval):
+        """Split the failed (possibly too large) chunk into the worst-case
+        intervals to be processed again. Returns False if the interval cannot
+        be split any further.
+        """
+        start_time, end_time = interval
+        if end_time - start_time <= self.base_duration:
+            return False
+        with self._lock:
+            self._pending.extend(
+                ClientRequest._chunkify_request(
+                    start_time, end_time, self.base_duration, 1
+                )
+            )
+            self._duration = self.base_duration
+        return True
+
+    def stop(self):
+        """Stop planning of the following chunks."""
+        with self._lock:
+            self._pending = []
+            self._finished = True
+
+
 class ClientRequest:
     """Base class handling the requests to and downloads from the server."""
 
@@ -262,8 +385,34 @@ class ClientRequest:
         config=None,
         logging_level=DEFAULT_LOGGING_LEVEL,
         server_type=None,
+        pool_size=None,
+        polling=None,
+        retry_policy=None,
+        download_connections=None,
+        cache=None,
+        store=None,
+        metadata_cache=None,
     ):
         self._server_type = server_type
+        self._pool_size = pool_size
+        self._polling = polling
+        self._retry_policy = retry_policy
+        self._download_connections = download_connections
+        if isinstance(cache, str):
+            cache = ResponseCache(cache)
+        elif cache is True:
+            cache = ResponseCache()
+        self._cache = cache or None
+        if isinstance(store, str):
+            store = DataStore(store)
+        elif store is True:
+            store = DataStore()
+        self._store = store
+        if isinstance(metadata_cache, str):
+            metadata_cache = MetadataCache(metadata_cache)
+        elif metadata_cache is True:
+            metadata_cache = SHARED_METADATA_CACHE
+        self._metadata_cache = metadata_cache or None
 
         # Check and prompt for token if not already set, then store in config
         # Try to only do this if running in a notebook
@@ -297,7 +446,8 @@ class ClientRequest:
             attempts = 0
             while invalid_token:
                 try:
-                    self.list_jobs()
+                    # (explicit call of the blocking method of the base class)
+                    ClientRequest.list_jobs(self)
                     invalid_token = False
                 except AuthenticationError:
                     print("Token invalid.")
@@ -341,7 +491,13 @@ class ClientRequest:
 
         # service proxy with authentication
         return ViresWPS10Service(
-            url, encode_headers(**credentials), logger=self._logger
+            url,
+            encode_headers(**credentials),
+            logger=self._logger,
+            pool_size=self._pool_size,
+            polling=self._polling,
+            retry_policy=self._retry_policy,
+            download_connections=self._download_connections,
         )
 
     @staticmethod
@@ -388,29 +544,36 @@ class ClientRequest:
 
             return _copy_progress
 
+        def write_file(file_obj, callback=None, total=None):
+            if getattr(file_obj, "target", None) == retdatafile._file.name:
+                # parallel download written directly into the output file
+                file_obj.wait(
+                    callback
+                    and (lambda downloaded: callback(copied=downloaded, total=total))
+                )
+                return
+            with open(retdatafile._file.name, "wb") as out_file:
+                copyfileobj(file_obj, out_file, callback=callback, total=total)
+
         def write_response(file_obj):
             """Acts on a file object to copy it to another file
             https://stackoverflow.com/a/7244263
-            file_obj is what is returned from urllib.urlopen()
+            file_obj is the streamed HTTP response (see WPS10Service._retrieve)
             """
             size = int(file_obj.info()["Content-Length"])
             self._downloaded_chunk_sizes.append(size)
             with ProgressBarDownloading(size, leave=leave_progress_bar) as pbar:
-                with open(retdatafile._file.name, "wb") as out_file:
-                    copyfileobj(
-                        file_obj, out_file, callback=copy_progress(pbar), total=size
-                    )
+                write_file(file_obj, callback=copy_progress(pbar), total=size)
 
         def write_response_without_reporting(file_obj):
             size = int(file_obj.info()["Content-Length"])
             self._downloaded_chunk_sizes.append(size)
-            with open(retdatafile._file.name, "wb") as out_file:
-                copyfileobj(file_obj, out_file)
+            write_file(file_obj)
 
-        if show_progress:
-            return write_response
-        else:
-            return write_response_without_reporting
+        handler = write_response if show_progress else write_response_without_reporting
+        # parallel downloads are written directly into the output file
+        handler.target = retdatafile._file.name
+        return handler
 
     @staticmethod
     def _chunkify_request(start_time, end_time, sampling_step, nrecords_limit):
@@ -427,7 +590,7 @@ class ClientRequest:
         Args:
             start_time (datetime)
             end_time (datetime)
-            sampling_step (str) ISO-8601 duration
+            sampling_step (str / timedelta) ISO-8601 duration
 
         Returns:
             list of tuples of datetime pairs,
@@ -454,6 +617,237 @@ class ClientRequest:
 
         return request_intervals
 
+    @staticmethod
+    def _chunkify_request_by_days(
+        start_time,
+        end_time,
+        sampling_step,
+        nrecords_limit,
+        product_intervals=None,
+        margin=PRODUCT_TIME_MARGIN,
+        stored_intervals=(),
+    ):
+        """Split the periods not covered by the stored intervals into chunks
+        split at the day boundaries.
+
+        The contiguous periods not covered by the stored intervals are split
+        into chunks of as many whole days as fit in the interval of
+        nrecords_limit records, i.e., a chunk is not limited to a single day.
+        The days longer than the interval of nrecords_limit records are split
+        further as in _chunkify_request. The stored intervals are included
+        in the output as they are.
+
+        If the time extents of the product files are given, the chunks not
+        covered by any product file are skipped.
+
+        Args:
+            start_time (datetime)
+            end_time (datetime)
+            sampling_step (str / timedelta) ISO-8601 duration
+            nrecords_limit (int)
+            product_intervals (list): (start, end) datetime pairs
+                of the product files
+            margin (timedelta): tolerance of the product time extents
+            stored_intervals (list): sorted (start, end) datetime pairs
+                of the periods already kept in the local data store
+
+        Returns:
+            list of tuples of datetime pairs,
+                e.g. [(start1, end1), (start2, end2)]
+        """
+        chunk_duration = min(
+            timedelta(
+                seconds=(nrecords_limit * parse_duration(sampling_step).total_seconds())
+            ),
+            MAX_CHUNK_DURATION,
+        )
+        ndays = chunk_duration // timedelta(days=1)
+
+        def _chunkify_period(period_start, period_end):
+            chunks = []
+            day = period_start.replace(hour=0, minute=0, second=0, microsecond=0)
+            while day < period_end:
+                next_day = day + timedelta(days=max(ndays, 1))
+                chunk_start, chunk_end = max(day, period_start), min(
+                    next_day, period_end
+                )
+                if ndays > 0:
+                    chunks.append((chunk_start, chunk_end))
+                else:
+                    chunks.extend(
+                        ClientRequest._chunkify_request(
+                            chunk_start, chunk_end, sampling_step, nrecords_limit
+                        )
+                    )
+                day = next_day
+            return chunks
+
+        def _has_products(chunk_start, chunk_end):
+            return product_intervals is None or any(
+                product_start - margin < chunk_end
+                and product_end + margin > chunk_start
+                for product_start, product_end in product_intervals
+            )
+
+        intervals, all_chunks = [], []
+        last_time = start_time
+        for stored_start, stored_end in [*stored_intervals, (end_time, end_time)]:
+            if last_time < stored_start:
+                chunks = _chunkify_period(last_time, stored_start)
+                all_chunks.extend(chunks)
+                intervals.extend(chunk for chunk in chunks if _has_products(*chunk))
+            if stored_start < stored_end:
+                intervals.append((stored_start, stored_end))
+            last_time = max(last_time, stored_end)
+
+        if not intervals:
+            # No data available - request the first interval only
+            # to get a valid empty response.
+            intervals = all_chunks[:1]
+
+        return intervals
+
+    @staticmethod
+    def _chunkify_request_by_products(
+        start_time,
+        end_time,
+        product_intervals,
+        sampling_step,
+        nrecords_limit,
+        margin=PRODUCT_TIME_MARGIN,
+    ):
+        """Split the start and end times into chunks covering only the given
+        time extents of the product files.
+
+        The time extents are widened by the margin to tolerate imprecise
+        product metadata. The periods not covered by any product are skipped
+        and the chunk edges are aligned with the starts of the product files.
+        A chunk is never longer than the interval holding nrecords_limit
+        records at the given sampling step (see _chunkify_request).
+
+        Args:
+            start_time (datetime)
+            end_time (datetime)
+            product_intervals (list): (start, end) datetime pairs
+                of the product files
+            sampling_step (str / timedelta) ISO-8601 duration
+            nrecords_limit (int)
+            margin (timedelta)
+
+        Returns:
+            list of tuples of datetime pairs,
+                e.g. [(start1, end1), (start2, end2)]
+        """
+        max_duration = min(
+            timedelta(
+                seconds=(nrecords_limit * parse_duration(sampling_step).total_seconds())
+            ),
+            MAX_CHUNK_DURATION,
+        )
+
+        # the margins of the product time extents hold no records
+        max_duration_with_margins = max_duration + 2 * margin
+
+        products = sorted(
+            (max(start, start_time), min(end, end_time), start)
+            for start, end in (
+                (product_start - margin, product_end + margin)
+                for product_start, product_end in product_intervals
+            )
+            if start < end_time and end > start_time
+        )
+
+        if not products:
+            # No data available - request the first interval only
+            # to get a valid empty response.
+            return [(start_time, min(start_time + max_duration, end_time))]
+
+        intervals = []
+        chunk_start, chunk_end = None, None
+        for product_start, product_end, product_boundary in products:
+            if chunk_start is None:
+                chunk_start, chunk_end = product_start, product_end
+            elif product_start > chunk_end:
+                # gap - close the current chunk
+                intervals.append((chunk_start, chunk_end))
+                chunk_start, chunk_end = product_start, product_end
+            elif product_end - chunk_start > max_duration_with_margins:
+                # the chunk would be too long - close it at the product start
+                boundary = min(max(product_boundary + margin, product_start), chunk_end)
+                if boundary > chunk_start:
+                    intervals.append((chunk_start, boundary))
+                    chunk_start = boundary
+                chunk_end = max(chunk_end, product_end)
+            else:
+                chunk_end = max(chunk_end, product_end)
+        intervals.append((chunk_start, chunk_end))
+
+        # split the chunks still too long (e.g. long product files)
+        return [
+            interval
+            for chunk_start, chunk_end in intervals
+            for interval in (
+                ClientRequest._chunkify_request(
+                    chunk_start, chunk_end, sampling_step, nrecords_limit
+                )
+                if chunk_end - chunk_start > max_duration_with_margins
+                else [(chunk_start, chunk_end)]
+            )
+        ]
+
+    def _get_product_intervals(self, start_time, end_time):
+        """Get time extents of the product files of the requested collections
+        (see available_times). Only the collections defining the time-series
+        of each spacecraft are considered.
+
+        Returns:
+            list of (start, end) datetime pairs or None if not available
+        """
+        collection_groups = getattr(self._request_inputs, "collection_ids", None)
+        if not collection_groups:
+            self._logger.warning(
+                "Data availability not known. The data gaps are not skipped."
+            )
+            return None
+        product_intervals = []
+        for collections in collection_groups.values():
+            try:
+                times = ClientRequest.available_times(
+                    self, collections[0], start_time, end_time
+                )
+            except Exception as error:
+                self._logger.warning(
+                    "Failed to retrieve the availability of %s. "
+                    "The data gaps are not skipped. %s",
+                    collections[0],
+                    error,
+                )
+                return None
+            for start, end in zip(times["starttime"], times["endtime"]):
+                product_intervals.append(
+                    (_to_datetime(start, start_time), _to_datetime(end, start_time))
+                )
+        return product_intervals
+
+    def _get_metadata(self, call, request):
+        """Make a synchronous metadata request. The response is served
+        from the metadata cache if possible.
+        """
+        cache = self._metadata_cache
+        if cache is None:
+            return self._get(request, asynchronous=False, show_progress=False)
+        key = cache.get_key(
+            call,
+            self._wps_service.url,
+            request,
+            getattr(self._wps_service, "headers", None),
+        )
+        response = cache.get(call, key)
+        if response is None:
+            response = self._get(request, asynchronous=False, show_progress=False)
+            cache.put(call, key, response)
+        return response
+
     def _get(
         self,
         request=None,
@@ -512,19 +906,57 @@ class ClientRequest:
         except AuthenticationError:
             raise AuthenticationError(AUTH_ERROR_TEXT)
 
-    def get_between(
+    def _get_data(
         self,
-        start_time=None,
-        end_time=None,
-        filetype="cdf",
+        request,
+        retdatafile,
         asynchronous=True,
+        message=None,
         show_progress=True,
-        show_progress_chunks=True,
-        leave_intermediate_progress_bars=True,
+        leave_progress_bar=True,
+    ):
+        """Make a data request and stream the response to the ReturnedDataFile.
+        The request is served from the response cache if possible.
+        """
+        cache_key = None
+        if self._cache is not None:
+            cache_key = self._cache.get_key(self._wps_service.url, request)
+            size = self._cache.get(cache_key, retdatafile._file.name)
+            if size is not None:
+                self._logger.info("Response served from %s", self._cache)
+                self._downloaded_chunk_sizes.append(size)
+                return
+        self._get(
+            request=request,
+            asynchronous=asynchronous,
+            response_handler=self._response_handler(
+                retdatafile,
+                show_progress=show_progress,
+                leave_progress_bar=leave_progress_bar,
+            ),
+            message=message,
+            show_progress=show_progress,
+            leave_progress_bar=leave_progress_bar,
+        )
+        if cache_key is not None:
+            self._cache.put(
+                cache_key,
+                retdatafile._file.name,
+                collections=getattr(self, "_collection_list", None) or (),
+            )
+
+    def _prepare_chunked_request(
+        self,
+        start_time,
+        end_time,
+        filetype="cdf",
+        asynchronous=True,
         nrecords_limit=None,
         tmpdir=None,
+        skip_gaps=False,
+        use_store=False,
     ):
-        """Make the server request and download the data.
+        """Split the request into chunks and render the request of each chunk
 
         Args:
             start_time (datetime / ISO_8601 string)
@@ -532,17 +964,107 @@ class ClientRequest:
             filetype (str): one of ('csv', 'cdf')
             asynchronous (bool): True for asynchronous processing,
                 False for synchronous
-            show_progress (bool): Set to False to remove progress bars
-            show_progress_chunks (bool): Set to False to remove progress bar
-                for chunks
-            leave_intermediate_progress_bars (bool): Set to False to clean up
-                the individual progress bars left when making chunked requests
             nrecords_limit (int): Override the default limit per request
-                (e.g. nrecords_limit=3456000)
             tmpdir (str): Override the default temporary file directory
+            skip_gaps (bool): Skip the periods without data
+            use_store (bool): Plan the chunks from the days kept in the local
+                data store (see _chunkify_request_by_days)
 
         Returns:
-            ReturnedData:
+            tuple: (ReturnedData, list of the chunk intervals,
+                list of the rendered chunk requests)
+        """
+        intervals, chunk_requests = self._render_chunk_requests(
+            start_time,
+            end_time,
+            filetype=filetype,
+            asynchronous=asynchronous,
+            nrecords_limit=nrecords_limit,
+            skip_gaps=skip_gaps,
+            use_store=use_store,
+        )
+        retdatagroup = ReturnedData(
+            filetype=filetype,
+            N=len(chunk_requests),
+            tmpdir=tmpdir,
+            file_options=self._file_options,
+        )
+        return retdatagroup, intervals, chunk_requests
+
+    def _render_chunk_requests(
+        self,
+        start_time,
+        end_time,
+        filetype="cdf",
+        asynchronous=True,
+        nrecords_limit=None,
+        skip_gaps=False,
+        use_store=False,
+    ):
+        """Split the request into chunks and render the request of each chunk
+
+        Args:
+            start_time (datetime / ISO_8601 string)
+            end_time (datetime / ISO_8601 string)
+            filetype (str): one of ('csv', 'cdf')
+            asynchronous (bool): True for asynchronous processing,
+                False for synchronous
+            nrecords_limit (int): Override the default limit per request
+            skip_gaps (bool): Skip the periods without data
+            use_store (bool): Plan the chunks from the days kept in the local
+                data store (see _chunkify_request_by_days)
+
+        Returns:
+            tuple: (list of the chunk intervals,
+                list of the rendered chunk requests)
+        """
+        start_time, end_time, templatefile = self._prepare_request(
+            start_time, end_time, filetype=filetype, asynchronous=asynchronous
+        )
+        nrecords_limit = NRECORDS_LIMIT if nrecords_limit is None else nrecords_limit
+        sampling_step = self._get_sampling_step_estimate()
+        # Split the request into several intervals
+        product_intervals = (
+            self._get_product_intervals(start_time, end_time) if skip_gaps else None
+        )
+        if use_store:
+            intervals = self._chunkify_request_by_days(
+                start_time,
+                end_time,
+                sampling_step,
+                nrecords_limit,
+                product_intervals,
+                stored_intervals=self._store.lookup(
+                    self._wps_service.url,
+                    getattr(self, "_collection_list", None) or (),
+                    self._get_request_fingerprint(),
+                    start_time,
+                    end_time,
+                ),
+            )
+        elif product_intervals is not None:
+            intervals = self._chunkify_request_by_products(
+                start_time, end_time, product_intervals, sampling_step, nrecords_limit
+            )
+        else:
+            intervals = self._chunkify_request(
+                start_time, end_time, sampling_step, nrecords_limit
+            )
+
+        # Render the requests of all chunks beforehand so that each chunk
+        # can be processed independently of the shared WPSInputs object
+        chunk_requests = [
+            self._render_request(templatefile, start_time_i, end_time_i)
+            for start_time_i, end_time_i in intervals
+        ]
+
+        return intervals, chunk_requests
+
+    def _prepare_request(self, start_time, end_time, filetype, asynchronous):
+        """Check the request parameters and set the response type
+
+        Returns:
+            tuple: (start_time, end_time, template file of the request)
         """
         try:
             start_time = parse_datetime(start_time)
@@ -576,92 +1098,506 @@ class ClientRequest:
             # synchronous WPS request
             templatefile = self._templatefiles["sync"]
 
-        # Set the "sampling step" to use to split the request if it's too long
-        # (Due to the the server limit of NRECORDS_LIMIT)
-        #
+        return start_time, end_time, templatefile
+
+    def _render_request(self, templatefile, start_time, end_time):
+        """Render the request of the given time interval"""
+        self._request_inputs.begin_time = start_time
+        self._request_inputs.end_time = end_time
+        self._request = self._request_inputs.as_xml(templatefile)
+        return self._request
+
+    def _get_store_partitions(self, filetype, intervals, chunk_requests):
+        """Get the local data store partitions of the chunks
+        (None for the chunks not kept in the store).
+        """
+        if self._store is None:
+            return [None] * len(chunk_requests)
+        partitions = self._store.get_partitions(
+            self._wps_service.url,
+            getattr(self, "_collection_list", None) or (),
+            self._get_request_fingerprint(),
+            filetype,
+            intervals[0][0],
+            intervals[-1][1],
+            intervals,
+        )
+        self._request = chunk_requests[-1]
+        return partitions
+
+    def _get_request_fingerprint(self):
+        """Get fingerprint of the request parameters except of the time
+        interval and the processing mode (synchronous or asynchronous).
+        """
+        sentinel_time = datetime(2000, 1, 1)
+        request = self._render_request(
+            self._templatefiles["sync"], sentinel_time, sentinel_time
+        )
+        return sha256(b" ".join(request.split())).hexdigest()
+
+    def _get_sampling_step_estimate(self):
+        """Get the "sampling step" used to split the request if it's too long
+        (Due to the the server limit of NRECORDS_LIMIT)
+
+        The records of the collections of different spacecraft are returned
+        as separate time-series, i.e., their sampling rates add up.
+
+        Returns:
+            timedelta: estimated minimum time between two records
+        """
         # If a custom sampling step is set, then use that
         try:
-            sampling_step_estimate = self._request_inputs.sampling_step
+            sampling_step = self._request_inputs.sampling_step
         except AttributeError:
             # Assume 1Hz data otherwise (Currently will use this for Aeolus)
             # Swarm requests all have a sampling_step attribute
-            sampling_step_estimate = "PT1S"
-        # If no custom sampling step set:
-        if sampling_step_estimate is None:
+            return parse_duration("PT1S")
+
+        # Collections grouped by spacecraft
+        # (the first collection of each group defines the sampling)
+        collection_groups = getattr(self._request_inputs, "collection_ids", None)
+        if not collection_groups:
+            return parse_duration(sampling_step or "PT1S")
+
+        sampling_rate = 0.0
+        for collections in collection_groups.values():
+            # If no custom sampling step set:
             # Identify a default sampling step if possible
-            try:
-                collection_key = self._available["collections_to_keys"][
-                    self._collection_list[0]
-                ]
-                sampling_step_estimate = self._available["collection_sampling_steps"][
-                    collection_key
-                ]
-            except Exception:
-                sampling_step_estimate = "PT1S"
-        nrecords_limit = NRECORDS_LIMIT if nrecords_limit is None else nrecords_limit
-        # Split the request into several intervals
-        intervals = self._chunkify_request(
-            start_time, end_time, sampling_step_estimate, nrecords_limit
-        )
-        nchunks = len(intervals)
-        # Recreate the ReturnedData with the right number of chunks
-        retdatagroup = ReturnedData(
+            step = sampling_step
+            if step is None:
+                try:
+                    collection_key = self._available["collections_to_keys"][
+                        collections[0]
+                    ]
+                    step = self._available["collection_sampling_steps"][collection_key]
+                except Exception:
+                    step = "PT1S"
+            sampling_rate += 1 / parse_duration(step).total_seconds()
+
+        return timedelta(seconds=1 / sampling_rate)
+
+    def get_between(
+        self,
+        start_time=None,
+        end_time=None,
+        filetype="cdf",
+        asynchronous=True,
+        show_progress=True,
+        show_progress_chunks=True,
+        leave_intermediate_progress_bars=True,
+        nrecords_limit=None,
+        tmpdir=None,
+        max_workers=None,
+        resume_dir=None,
+        adaptive_chunks=False,
+        skip_gaps=False,
+    ):
+        """Make the server request and download the data.
+
+        Args:
+            start_time (datetime / ISO_8601 string)
+            end_time (datetime / ISO_8601 string)
+            filetype (str): one of ('csv', 'cdf')
+            asynchronous (bool): True for asynchronous processing,
+                False for synchronous
+            show_progress (bool): Set to False to remove progress bars
+            show_progress_chunks (bool): Set to False to remove progress bar
+                for chunks
+            leave_intermediate_progress_bars (bool): Set to False to clean up
+                the individual progress bars left when making chunked requests
+            nrecords_limit (int): Override the default limit per request
+                (e.g. nrecords_limit=3456000)
+            tmpdir (str): Override the default temporary file directory
+            max_workers (int): Maximum number of chunks processed concurrently
+                (defaults to 1, i.e. the chunks are processed one after another).
+                When set, the individual progress bars of the chunks are not
+                shown and only the overall chunk progress bar is displayed.
+            resume_dir (str): Directory where the downloaded chunks are kept
+                together with a manifest of the request. When the request is
+                interrupted, repeating the same call skips the chunks already
+                downloaded. The chunk files are kept after the request is
+                completed and the directory can be removed when not needed.
+            adaptive_chunks (bool): Set to True to size the chunks according to
+                the number of records observed in the already completed chunks.
+                Heavily filtered requests are then split in fewer chunks.
+                The total number of chunks is not known beforehand and
+                the overall chunk progress bar is not shown.
+                The local data store (``store`` option) is not used.
+                Cannot be combined with resume_dir.
+            skip_gaps (bool): Set to True to plan the chunks according to
+                the available product files (see available_times), i.e.,
+                to skip the periods without data and to align the chunks
+                with the product files. Cannot be combined with
+                adaptive_chunks.
+
+        Returns:
+            ReturnedData:
+        """
+        max_workers = 1 if max_workers is None else max_workers
+        if not isinstance(max_workers, int) or max_workers < 1:
+            raise ValueError("max_workers must be a positive integer")
+
+        if adaptive_chunks:
+            if resume_dir is not None:
+                raise ValueError("resume_dir cannot be used with adaptive_chunks")
+            if skip_gaps:
+                raise ValueError("skip_gaps cannot be used with adaptive_chunks")
+            return self._get_between_adaptive(
+                start_time,
+                end_time,
+                filetype=filetype,
+                asynchronous=asynchronous,
+                show_progress=show_progress,
+                leave_intermediate_progress_bars=leave_intermediate_progress_bars,
+                nrecords_limit=nrecords_limit,
+                tmpdir=tmpdir,
+                max_workers=max_workers,
+            )
+
+        retdatagroup, intervals, chunk_requests = self._prepare_chunked_request(
+            start_time,
+            end_time,
             filetype=filetype,
-            N=nchunks,
+            asynchronous=asynchronous,
+            nrecords_limit=nrecords_limit,
             tmpdir=tmpdir,
-            file_options=self._file_options,
+            skip_gaps=skip_gaps,
+            use_store=self._store is not None,
+        )
+        nchunks = len(chunk_requests)
+
+        partitions = self._get_store_partitions(
+            retdatagroup.filetype, intervals, chunk_requests
         )
 
-        def _get_chunk(i, start_time_i, end_time_i, leave_progress_bar=False):
+        if resume_dir is not None:
+            manifest = ChunkManifest(
+                resume_dir,
+                self._wps_service.url,
+                retdatagroup.filetype,
+                intervals,
+                chunk_requests,
+            )
+            self._logger.info(
+                "Resuming request %s: %d of %d chunks already downloaded.",
+                manifest.fingerprint,
+                len(manifest.completed),
+                nchunks,
+            )
+        else:
+            manifest = None
+
+        def _get_chunk(i, show_progress=show_progress, leave_progress_bar=False):
             """Process an individual chunk and update retdatagroup"""
             message = f"[{i + 1}/{nchunks}] "
-            # Finalise the WPSInputs object and (re-)generate the xml
-            self._request_inputs.begin_time = start_time_i
-            self._request_inputs.end_time = end_time_i
-            self._request = self._request_inputs.as_xml(templatefile)
             # Identify the individual ReturnedData object within the group
             retdatafile = retdatagroup.contents[i]
+            # Reuse the chunk downloaded by a previous, interrupted request
+            if manifest and manifest.is_completed(i):
+                self._downloaded_chunk_sizes.append(manifest.restore(i, retdatafile))
+                return
+            # Read the chunk from the local data store
+            # (not recorded in the manifest as it may be a part of a stored file)
+            partition = partitions[i]
+            if partition and partition.stored:
+                size = self._store.restore(partition, retdatafile)
+                if size is not None:
+                    self._downloaded_chunk_sizes.append(size)
+                    return
             # Make the request, as either asynchronous or synchronous
-            # The response handler streams the data to the ReturnedData object
-            response_handler = self._response_handler(
+            # The data are streamed to the ReturnedData object
+            self._get_data(
+                chunk_requests[i],
                 retdatafile,
-                show_progress=show_progress,
-                leave_progress_bar=leave_progress_bar,
-            )
-            self._get(
-                request=self._request,
                 asynchronous=asynchronous,
-                response_handler=response_handler,
                 message=message,
                 show_progress=show_progress,
                 leave_progress_bar=leave_progress_bar,
             )
+            if manifest:
+                manifest.store(i, retdatafile)
+            # Chunks without data (e.g. not yet processed) are not stored
+            if partition and retdatafile._count_records() != 0:
+                self._store.store(partition, retdatafile)
+
+        def _get_chunks_concurrently(pbar=None):
+            """Process the chunks in a pool of worker threads"""
+            self._wps_service.reserve_connections(max_workers)
+            executor = ThreadPoolExecutor(max_workers=max_workers)
+            try:
+                futures = [
+                    executor.submit(_get_chunk, i, show_progress=False)
+                    for i in range(nchunks)
+                ]
+                if pbar:
+                    pbar.update(0, nchunks, 0)
+                for ncompleted, future in enumerate(as_completed(futures), 1):
+                    future.result()
+                    if pbar:
+                        totalsize = sum(self._downloaded_chunk_sizes)
+                        final = ncompleted == nchunks
+                        pbar.update(ncompleted - final, nchunks, totalsize, final=final)
+            finally:
+                executor.shutdown(wait=True, cancel_futures=True)
 
         if nchunks > 1:
             # Track the size of each chunk as they come in
             self._downloaded_chunk_sizes = []
-            if show_progress_chunks:
+            if max_workers > 1:
+                if show_progress_chunks:
+                    with ProgressBarChunks(nchunks) as pbar:
+                        _get_chunks_concurrently(pbar)
+                else:
+                    _get_chunks_concurrently()
+            elif show_progress_chunks:
                 with ProgressBarChunks(nchunks) as pbar:
                     totalsize = 0
                     # Get each chunk serially
-                    for i, (start_time_i, end_time_i) in enumerate(intervals):
+                    for i in range(nchunks):
                         pbar.update(i, nchunks, totalsize)
                         _get_chunk(
-                            i,
-                            start_time_i,
-                            end_time_i,
-                            leave_progress_bar=leave_intermediate_progress_bars,
+                            i, leave_progress_bar=leave_intermediate_progress_bars
                         )
                         totalsize = sum(self._downloaded_chunk_sizes)
                     pbar.update(i, nchunks, totalsize, final=True)
             else:
-                for i, (start_time_i, end_time_i) in enumerate(intervals):
-                    _get_chunk(i, start_time_i, end_time_i)
+                for i in range(nchunks):
+                    _get_chunk(i)
+        else:
+            _get_chunk(0, leave_progress_bar=True)
+
+        return retdatagroup
+
+    def _get_between_adaptive(
+        self,
+        start_time,
+        end_time,
+        filetype,
+        asynchronous,
+        show_progress,
+        leave_intermediate_progress_bars,
+        nrecords_limit,
+        tmpdir,
+        max_workers,
+    ):
+        """Process the request in adaptively sized chunks (see get_between)"""
+        start_time, end_time, templatefile = self._prepare_request(
+            start_time, end_time, filetype=filetype, asynchronous=asynchronous
+        )
+        nrecords_limit = NRECORDS_LIMIT if nrecords_limit is None else nrecords_limit
+        planner = AdaptiveChunkPlanner(
+            start_time, end_time, self._get_sampling_step_estimate(), nrecords_limit
+        )
+        # the rendering of the requests modifies the shared WPSInputs object
+        render_lock = Lock()
+        chunks = []
+        self._downloaded_chunk_sizes = []
+        show_progress = show_progress and max_workers == 1
+
+        def _get_chunks():
+            """Process the planned chunks until the whole interval is covered"""
+            while True:
+                with render_lock:
+                    interval = planner.next_interval()
+                    if interval is None:
+                        return
+                    message = f"[{planner.nplanned}] "
+                    request = self._render_request(templatefile, *interval)
+                retdatafile = ReturnedDataFile(
+                    filetype=filetype, tmpdir=tmpdir, file_options=self._file_options
+                )
+                try:
+                    self._get_data(
+                        request,
+                        retdatafile,
+                        asynchronous=asynchronous,
+                        message=message,
+                        show_progress=show_progress,
+                        leave_progress_bar=leave_intermediate_progress_bars,
+                    )
+                except RuntimeError:
+                    # Server error, possibly caused by exceeding the limit
+                    # of records - retry with the worst-case chunk sizes.
+                    if planner.reject(interval):
+                        self._logger.warning(
+                            "Request of %s/%s failed. Splitting the chunk.",
+                            *interval,
+                        )
+                        continue
+                    planner.stop()
+                    raise
+                except BaseException:
+                    planner.stop()
+                    raise
+                planner.update(interval, retdatafile._count_records())
+                chunks.append((interval, retdatafile))
+
+        if max_workers > 1:
+            self._wps_service.reserve_connections(max_workers)
+            executor = ThreadPoolExecutor(max_workers=max_workers)
+            try:
+                futures = [executor.submit(_get_chunks) for _ in range(max_workers)]
+                for future in as_completed(futures):
+                    future.result()
+            finally:
+                executor.shutdown(wait=True, cancel_futures=True)
         else:
-            _get_chunk(0, start_time, end_time, leave_progress_bar=True)
+            _get_chunks()
 
+        retdatagroup = ReturnedData(filetype=filetype, file_options=self._file_options)
+        retdatagroup.close()
+        retdatagroup.contents = [
+            retdatafile for _, retdatafile in sorted(chunks, key=lambda item: item[0])
+        ]
         return retdatagroup
 
+    def iter_between(
+        self,
+        start_time=None,
+        end_time=None,
+        filetype="cdf",
+        asynchronous=True,
+        output="xarray",
+        prefetch=1,
+        show_progress_chunks=True,
+        nrecords_limit=None,
+        tmpdir=None,
+        skip_gaps=False,
+        **kwargs,
+    ):
+        """Make the server request and iterate over the data chunk by chunk.
+
+        Unlike :py:meth:`get_between`, the chunks are yielded one by one, as
+        soon as they are available, while the following chunks are being
+        downloaded and decoded in the background. Only the yielded chunk and
+        the prefetched chunks are held at a time.
+
+        Example usage::
+
+            for ds in request.iter_between(start_time, end_time, prefetch=2):
+                ...
+
+        Args:
+            start_time (datetime / ISO_8601 string)
+            end_time (datetime / ISO_8601 string)
+            filetype (str): one of ('csv', 'cdf')
+            asynchronous (bool): True for asynchronous processing,
+                False for synchronous
+            output (str): one of ('xarray', 'dataframe', 'file'), yield
+                either the decoded xarray.Dataset or pandas.DataFrame,
+                or the ReturnedDataFile holding the downloaded file
+            prefetch (int): Number of the following chunks processed
+                in the background (0 processes the chunks one by one on demand)
+            show_progress_chunks (bool): Set to False to remove progress bar
+                for chunks
+            nrecords_limit (int): Override the default limit per request
+                (e.g. nrecords_limit=3456000)
+            tmpdir (str): Override the default temporary file directory
+            skip_gaps (bool): Set to True to skip the periods without data
+                (see :py:meth:`get_between`)
+            **kwargs: Options passed to ReturnedData.as_xarray() or
+                ReturnedData.as_dataframe() (e.g. reshape=True or
+                expand=True)
+
+        Yields:
+            xarray.Dataset / pandas.DataFrame / ReturnedDataFile:
+                empty chunks are skipped
+
+        """
+        if output not in ("xarray", "dataframe", "file"):
+            raise ValueError("output must be one of 'xarray', 'dataframe', 'file'")
+        if not isinstance(prefetch, int) or prefetch < 0:
+            raise ValueError("prefetch must be a non-negative integer")
+
+        _, chunk_requests = self._render_chunk_requests(
+            start_time,
+            end_time,
+            filetype=filetype,
+            asynchronous=asynchronous,
+            nrecords_limit=nrecords_limit,
+            skip_gaps=skip_gaps,
+        )
+        return self._iter_chunks(
+            chunk_requests,
+            filetype=filetype,
+            asynchronous=asynchronous,
+            output=output,
+            prefetch=prefetch,
+            show_progress_chunks=show_progress_chunks,
+            tmpdir=tmpdir,
+            **kwargs,
+        )
+
+    def _iter_chunks(
+        self,
+        chunk_requests,
+        filetype,
+        asynchronous,
+        output,
+        prefetch,
+        show_progress_chunks,
+        tmpdir,
+        **kwargs,
+    ):
+        """Generator processing the rendered chunk requests (see iter_between)"""
+        nchunks = len(chunk_requests)
+        self._downloaded_chunk_sizes = []
+
+        def _get_chunk(i):
+            """Download and decode an individual chunk"""
+            options = dict(
+                filetype=filetype, tmpdir=tmpdir, file_options=self._file_options
+            )
+            if output == "file":
+                retdata = None
+                retdatafile = ReturnedDataFile(**options)
+            else:
+                retdata = ReturnedData(**options)
+                retdatafile = retdata.contents[0]
+            self._get_data(
+                chunk_requests[i],
+                retdatafile,
+                asynchronous=asynchronous,
+                show_progress=False,
+            )
+            if retdata is None:
+                return retdatafile
+            try:
+                if output == "xarray":
+                    data = retdata.as_xarray(**kwargs)
+                    # detach the dataset from the temporary file
+                    return None if data is None else data.load()
+                data = retdata.as_dataframe(**kwargs)
+                return None if data is None or data.empty else data
+            finally:
+                retdata.close()
+
+        show_progress_chunks = show_progress_chunks and nchunks > 1
+        pbar = ProgressBarChunks(nchunks) if show_progress_chunks else None
+        self._wps_service.reserve_connections(prefetch + 1)
+        executor = ThreadPoolExecutor(max_workers=prefetch + 1)
+        futures = {}
+        next_index = 0
+        try:
+            if pbar:
+                pbar.update(0, nchunks, 0)
+            for i in range(nchunks):
+                # keep the current and the prefetched chunks in progress
+                while next_index < min(i + prefetch + 1, nchunks):
+                    futures[next_index] = executor.submit(_get_chunk, next_index)
+                    next_index += 1
+                data = futures.pop(i).result()
+                if pbar:
+                    final = i + 1 == nchunks
+                    totalsize = sum(self._downloaded_chunk_sizes)
+                    pbar.update(i + 1 - final, nchunks, totalsize, final=final)
+                if data is not None:
+                    yield data
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            if pbar:
+                pbar.cleanup()
+
     def list_jobs(self):
         """Return job information from the server.
 
@@ -671,7 +1607,7 @@ class ClientRequest:
         templatefile = TEMPLATE_FILES["list_jobs"]
         template = JINJA2_ENVIRONMENT.get_template(templatefile)
         request = template.render().encode("UTF-8")
-        response = self._get(request, asynchronous=False, show_progress=False)
+        response = self._get_metadata("list_jobs", request)
         return json.loads(response.decode("UTF-8"))
 
     def available_times(self, collection, start_time=None, end_time=None):
@@ -690,7 +1626,7 @@ class ClientRequest:
         request = template.render(
             collection_id=collection, begin_time=start_time, end_time=end_time
         ).encode("UTF-8")
-        response = self._get(request, asynchronous=False, show_progress=False)
+        response = self._get_metadata("available_times", request)
         df = read_csv(StringIO(str(response, "utf-8")))
         # Convert to datetime objects
         try:
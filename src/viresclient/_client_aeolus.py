@@ -219,13 +219,46 @@ class AeolusRequest(ClientRequest):
         token (str):
         config (str or ClientConfig):
         logging_level (str):
+        pool_size (int): maximum number of persistent connections to the server
+            (by default sized to the number of concurrent workers)
+        polling (PollingStrategy): asynchronous job status polling strategy
+        retry_policy (RetryPolicy): retry policy of the failed server requests
+        download_connections (int): number of parallel connections used to
+            download each large data file (defaults to 1)
+        cache (ResponseCache or str): on-disk cache of the downloaded data
+            (cache object or cache directory, disabled by default)
+        metadata_cache (MetadataCache or str or bool): cache of the metadata
+            requests (cache object, directory of a persistent cache, or True
+            for a cache shared within the process, disabled by default)
 
     """
 
     def __init__(
-        self, url=None, token=None, config=None, logging_level=DEFAULT_LOGGING_LEVEL
+        self,
+        url=None,
+        token=None,
+        config=None,
+        logging_level=DEFAULT_LOGGING_LEVEL,
+        pool_size=None,
+        polling=None,
+        retry_policy=None,
+        download_connections=None,
+        cache=None,
+        metadata_cache=None,
     ):
-        super().__init__(url, token, config, logging_level, server_type="Aeolus")
+        super().__init__(
+            url,
+            token,
+            config,
+            logging_level,
+            server_type="Aeolus",
+            pool_size=pool_size,
+            polling=polling,
+            retry_policy=retry_policy,
+            download_connections=download_connections,
+            cache=cache,
+            metadata_cache=metadata_cache,
+        )
         # self._available = self._set_available_data()
         self._request_inputs = AeolusWPSInputs()
         self._request_inputs.processId = "aeolus:level1B"
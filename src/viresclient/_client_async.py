@@ -0,0 +1,407 @@
+# -------------------------------------------------------------------------------
+#
+# Handles the WPS requests to the VirES server using asyncio
+#
+# Authors: Ashley Smith <ashley.smith@ed.ac.uk>
+#          Martin Paces <martin.paces@eox.at>
+#
+# -------------------------------------------------------------------------------
+# Copyright (C) 2026 EOX IT Services GmbH
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies of this Software or works derived from this Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+# -------------------------------------------------------------------------------
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from ._client import AUTH_ERROR_TEXT, ClientRequest, ProgressBarChunks
+from ._client_aeolus import AeolusRequest
+from ._client_swarm import SwarmRequest
+from ._wps.wps import AuthenticationError, WPSError
+from ._wps.wps_async import AsyncWPS10Service, run_in_thread
+
+# Default number of chunks processed concurrently by get_between()
+DEFAULT_MAX_CONCURRENCY = 4
+
+
+class AsyncClientRequest:
+    """Mixin providing the asyncio interface of the ClientRequest.
+
+    The data requests are processed as coroutines, i.e., the job submission,
+    status polling, output download and job clean-up do not block the event
+    loop and many requests can be multiplexed on a single event loop.
+
+    The blocking calls of the data requests are executed in a pool of worker
+    threads sized to the number of concurrently processed chunks. The
+    remaining server calls are executed in the default executor of the event
+    loop.
+    """
+
+    async def _get_async(
+        self,
+        request=None,
+        asynchronous=None,
+        response_handler=None,
+        content_type=None,
+        headers=None,
+        executor=None,
+    ):
+        """Make a request and handle response according to response_handler
+
+        Args:
+            request: the rendered xml for the request
+            asynchronous (bool): True for asynchronous processing,
+                False for synchronous
+            response_handler: a function that handles the server response
+            executor: executor of the blocking calls (defaults to the default
+                executor of the event loop)
+        """
+        wps_service = AsyncWPS10Service(self._wps_service, executor)
+        try:
+            if asynchronous:
+                return await wps_service.retrieve_async(
+                    request,
+                    handler=response_handler,
+                    content_type=content_type,
+                    headers=headers,
+                )
+            else:
+                return await wps_service.retrieve(
+                    request,
+                    handler=response_handler,
+                    content_type=content_type,
+                    headers=headers,
+                )
+        except WPSError:
+            raise RuntimeError(
+                "Server error. Or perhaps the request is invalid? "
+                "Check the output of: print(request) and "
+                "print(request._request.decode())"
+            )
+        except AuthenticationError:
+            raise AuthenticationError(AUTH_ERROR_TEXT)
+
+    async def get_between(
+        self,
+        start_time=None,
+        end_time=None,
+        filetype="cdf",
+        asynchronous=True,
+        show_progress_chunks=True,
+        nrecords_limit=None,
+        tmpdir=None,
+        max_concurrency=DEFAULT_MAX_CONCURRENCY,
+    ):
+        """Make the server request and download the data (coroutine).
+
+        Args:
+            start_time (datetime / ISO_8601 string)
+            end_time (datetime / ISO_8601 string)
+            filetype (str): one of ('csv', 'cdf')
+            asynchronous (bool): True for asynchronous processing,
+                False for synchronous
+            show_progress_chunks (bool): Set to False to remove progress bar
+                for chunks
+            nrecords_limit (int): Override the default limit per request
+                (e.g. nrecords_limit=3456000)
+            tmpdir (str): Override the default temporary file directory
+            max_concurrency (int): Maximum number of chunks processed
+                concurrently (default 4). The blocking calls are executed in
+                a dedicated pool of as many threads, i.e., the concurrency is
+                not limited by the default executor of the event loop. Higher
+                values overlap more of the server processing and downloads
+                but each chunk holds a server job, a worker thread and
+                a connection, and the server may queue the jobs exceeding
+                its per-user limit anyway.
+
+        Returns:
+            ReturnedData:
+        """
+        if not isinstance(max_concurrency, int) or max_concurrency < 1:
+            raise ValueError("max_concurrency must be a positive integer")
+
+        retdatagroup, intervals, chunk_requests = self._prepare_chunked_request(
+            start_time,
+            end_time,
+            filetype=filetype,
+            asynchronous=asynchronous,
+            nrecords_limit=nrecords_limit,
+            tmpdir=tmpdir,
+            use_store=self._store is not None,
+        )
+        nchunks = len(chunk_requests)
+        partitions = self._get_store_partitions(
+            retdatagroup.filetype, intervals, chunk_requests
+        )
+        downloaded_chunk_sizes = []
+        self._wps_service.reserve_connections(min(max_concurrency, nchunks))
+        semaphore = asyncio.Semaphore(max_concurrency)
+        executor = ThreadPoolExecutor(max_workers=min(max_concurrency, nchunks))
+
+        def _response_handler(retdatafile):
+            response_handler = self._response_handler(retdatafile, show_progress=False)
+
+            def _handler(file_obj):
+                response_handler(file_obj)
+                downloaded_chunk_sizes.append(int(file_obj.info()["Content-Length"]))
+
+            return _handler
+
+        async def _get_chunk(i):
+            """Process an individual chunk and update retdatagroup"""
+            retdatafile = retdatagroup.contents[i]
+            partition = partitions[i]
+            if partition and partition.stored:
+                size = await run_in_thread(
+                    executor, self._store.restore, partition, retdatafile
+                )
+                if size is not None:
+                    downloaded_chunk_sizes.append(size)
+                    return
+            cache_key = None
+            if self._cache is not None:
+                cache_key = self._cache.get_key(
+                    self._wps_service.url, chunk_requests[i]
+                )
+                size = await run_in_thread(
+                    executor, self._cache.get, cache_key, retdatafile._file.name
+                )
+                if size is not None:
+                    downloaded_chunk_sizes.append(size)
+                    return
+            async with semaphore:
+                await self._get_async(
+                    request=chunk_requests[i],
+                    asynchronous=asynchronous,
+                    response_handler=_response_handler(retdatafile),
+                    executor=executor,
+                )
+            if cache_key is not None:
+                await run_in_thread(
+                    executor,
+                    self._cache.put,
+                    cache_key,
+                    retdatafile._file.name,
+                    getattr(self, "_collection_list", None) or (),
+                )
+            if partition and (
+                await run_in_thread(executor, retdatafile._count_records) != 0
+            ):
+                await run_in_thread(executor, self._store.store, partition, retdatafile)
+
+        async def _get_chunks(pbar=None):
+            tasks = [asyncio.ensure_future(_get_chunk(i)) for i in range(nchunks)]
+            try:
+                if pbar:
+                    pbar.update(0, nchunks, 0)
+                for ncompleted, task in enumerate(asyncio.as_completed(tasks), 1):
+                    await task
+                    if pbar:
+                        final = ncompleted == nchunks
+                        pbar.update(
+                            ncompleted - final,
+                            nchunks,
+                            sum(downloaded_chunk_sizes),
+                            final=final,
+                        )
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+        try:
+            if nchunks > 1 and show_progress_chunks:
+                with ProgressBarChunks(nchunks) as pbar:
+                    await _get_chunks(pbar)
+            else:
+                await _get_chunks()
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        return retdatagroup
+
+    async def list_jobs(self):
+        """Return job information from the server (coroutine).
+
+        Returns:
+            dict
+        """
+        return await asyncio.to_thread(ClientRequest.list_jobs, self)
+
+    async def available_times(self, collection, start_time=None, end_time=None):
+        """Returns temporal availability for a given collection (coroutine).
+
+        See :py:meth:`viresclient.SwarmRequest.available_times`
+        """
+        return await asyncio.to_thread(
+            ClientRequest.available_times, self, collection, start_time, end_time
+        )
+
+
+class AsyncSwarmRequest(AsyncClientRequest, SwarmRequest):
+    """Handles the requests to and downloads from the server, using asyncio.
+
+    The request is configured in the same way as :py:class:`SwarmRequest`,
+    while the methods communicating with the server are coroutines.
+
+    Examples:
+
+        Retrieve data of several spacecraft concurrently::
+
+            import asyncio
+            from viresclient import AsyncSwarmRequest
+
+            async def fetch(spacecraft):
+                request = AsyncSwarmRequest()
+                request.set_collection(f"SW_OPER_MAG{spacecraft}_LR_1B")
+                request.set_products(measurements=["F", "B_NEC"])
+                data = await request.get_between("2020-01-01", "2020-01-02")
+                return data.as_xarray()
+
+            async def main():
+                return await asyncio.gather(*(fetch(sc) for sc in "ABC"))
+
+            datasets = asyncio.run(main())
+
+    Args:
+        url (str):
+        token (str):
+        config (str or ClientConfig):
+        logging_level (str):
+        pool_size (int): maximum number of persistent connections to the server
+            (by default sized to the number of concurrent workers)
+        polling (PollingStrategy): asynchronous job status polling strategy
+        retry_policy (RetryPolicy): retry policy of the failed server requests
+        download_connections (int): number of parallel connections used to
+            download each large data file (defaults to 1)
+        cache (ResponseCache or str): on-disk cache of the downloaded data
+            (cache object or cache directory, disabled by default)
+        store (DataStore or str): local store of the downloaded data
+            partitioned by days (store object or store directory,
+            disabled by default)
+        metadata_cache (MetadataCache or str or bool): cache of the metadata
+            requests (cache object, directory of a persistent cache, or True
+            for a cache shared within the process, disabled by default)
+
+    """
+
+    async def get_collection_info(self, collections):
+        """Get information about a list of collections (coroutine).
+
+        See :py:meth:`viresclient.SwarmRequest.get_collection_info`
+        """
+        return await asyncio.to_thread(
+            SwarmRequest.get_collection_info, self, collections
+        )
+
+    async def available_observatories(self, collection, *args, **kwargs):
+        """Get list of available observatories from server (coroutine).
+
+        See :py:meth:`viresclient.SwarmRequest.available_observatories`
+        """
+        return await asyncio.to_thread(
+            SwarmRequest.available_observatories, self, collection, *args, **kwargs
+        )
+
+    async def get_model_info(self, *args, **kwargs):
+        """Get model info from server (coroutine).
+
+        See :py:meth:`viresclient.SwarmRequest.get_model_info`
+        """
+        return await asyncio.to_thread(
+            SwarmRequest.get_model_info, self, *args, **kwargs
+        )
+
+    async def get_times_for_orbits(self, *args, **kwargs):
+        """Translate a pair of orbit numbers to a time interval (coroutine).
+
+        See :py:meth:`viresclient.SwarmRequest.get_times_for_orbits`
+        """
+        return await asyncio.to_thread(
+            SwarmRequest.get_times_for_orbits, self, *args, **kwargs
+        )
+
+    async def get_orbit_number(self, *args, **kwargs):
+        """Translate a time to an orbit number (coroutine).
+
+        See :py:meth:`viresclient.SwarmRequest.get_orbit_number`
+        """
+        return await asyncio.to_thread(
+            SwarmRequest.get_orbit_number, self, *args, **kwargs
+        )
+
+    async def get_orbit_numbers(self, *args, **kwargs):
+        """Translate times to orbit numbers (coroutine).
+
+        See :py:meth:`viresclient.SwarmRequest.get_orbit_numbers`
+        """
+        return await asyncio.to_thread(
+            SwarmRequest.get_orbit_numbers, self, *args, **kwargs
+        )
+
+    async def get_times_for_orbits_many(self, *args, **kwargs):
+        """Translate pairs of orbit numbers to time intervals (coroutine).
+
+        See :py:meth:`viresclient.SwarmRequest.get_times_for_orbits_many`
+        """
+        return await asyncio.to_thread(
+            SwarmRequest.get_times_for_orbits_many, self, *args, **kwargs
+        )
+
+    async def get_conjunctions(self, *args, **kwargs):
+        """Get times of the spacecraft conjunctions (coroutine).
+
+        See :py:meth:`viresclient.SwarmRequest.get_conjunctions`
+        """
+        return await asyncio.to_thread(
+            SwarmRequest.get_conjunctions, self, *args, **kwargs
+        )
+
+    async def eval_model(self, *args, **kwargs):
+        """Evaluate models for the given times and locations (coroutine).
+
+        See :py:meth:`viresclient.SwarmRequest.eval_model`
+        """
+        return await asyncio.to_thread(SwarmRequest.eval_model, self, *args, **kwargs)
+
+
+class AsyncAeolusRequest(AsyncClientRequest, AeolusRequest):
+    """Handles the requests to and downloads from the server, using asyncio.
+
+    The request is configured in the same way as :py:class:`AeolusRequest`,
+    while the methods communicating with the server are coroutines.
+
+    Args:
+        url (str):
+        token (str):
+        config (str or ClientConfig):
+        logging_level (str):
+        pool_size (int): maximum number of persistent connections to the server
+            (by default sized to the number of concurrent workers)
+        polling (PollingStrategy): asynchronous job status polling strategy
+        retry_policy (RetryPolicy): retry policy of the failed server requests
+        download_connections (int): number of parallel connections used to
+            download each large data file (defaults to 1)
+        cache (ResponseCache or str): on-disk cache of the downloaded data
+            (cache object or cache directory, disabled by default)
+        metadata_cache (MetadataCache or str or bool): cache of the metadata
+            requests (cache object, directory of a persistent cache, or True
+            for a cache shared within the process, disabled by default)
+
+    """
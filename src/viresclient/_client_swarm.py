@@ -7,21 +7,34 @@ import shutil
 import sys
 import uuid
 from collections import OrderedDict
-from io import StringIO
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from io import BytesIO, StringIO
+from tempfile import TemporaryFile
 from textwrap import dedent
+from urllib.parse import urlparse
 from warnings import warn
 
 import h5py
-from numpy import asarray
-from pandas import read_csv
+from numpy import asarray, datetime64, empty, isnat, sqrt
+from pandas import read_csv, to_datetime
 from tqdm import tqdm
 
-from ._client import DEFAULT_LOGGING_LEVEL, TEMPLATE_FILES, ClientRequest, WPSInputs
+from ._client import (
+    DEFAULT_LOGGING_LEVEL,
+    NRECORDS_LIMIT,
+    TEMPLATE_FILES,
+    ClientRequest,
+    ProgressBarChunks,
+    WPSInputs,
+)
 from ._data import CONFIG_SWARM
 from ._data_handling import ReturnedDataFile
+from ._orbits import DEFAULT_ORBIT_INDEX_DIR, OrbitIndex
+from ._shc import SHCModel
+from ._store import _to_path_component
 from ._wps.environment import JINJA2_ENVIRONMENT
-from ._wps.multipart import generate_multipart_request
-from ._wps.time_util import parse_datetime
+from ._wps.multipart import MultipartPayload
+from ._wps.time_util import parse_datetime, to_utc_naive
 
 TEMPLATE_FILES = {
     **TEMPLATE_FILES,
@@ -35,6 +48,63 @@ TEMPLATE_FILES = {
     "eval_model_mp": "model_eval_multipart_payload.xml",
 }
 
+
+def _to_datetime(value):
+    """Convert numpy datetime64 value to a naive datetime object."""
+    return value.astype("datetime64[us]").astype(datetime.datetime)
+
+
+# maximum number of points evaluated by one eval_model request
+EVAL_MODEL_BATCH_SIZE = 1000000
+# eval_model input compression options
+EVAL_MODEL_COMPRESSIONS = (None, "none", "gzip", "shuffle+gzip", "auto")
+# smaller eval_model inputs are sent uncompressed (compression="auto")
+EVAL_MODEL_COMPRESSION_THRESHOLD = 16 * 1024 * 1024  # 16 MiB
+EVAL_MODEL_COMPRESSION_LEVEL = 1
+# larger eval_model HDF5 inputs and outputs are held in temporary files
+EVAL_MODEL_IN_MEMORY_LIMIT = 16 * 1024 * 1024  # 16 MiB
+
+
+def _get_hdf5_compression_options(compression, compression_level, nbytes):
+    """Get HDF5 dataset options of the selected compression of the input
+    of the given byte-size.
+    """
+    if compression not in EVAL_MODEL_COMPRESSIONS:
+        raise ValueError(
+            f"Invalid compression {compression!r}! "
+            f"Allowed options are: {EVAL_MODEL_COMPRESSIONS}"
+        )
+    if compression == "auto":
+        compression = (
+            "shuffle+gzip" if nbytes >= EVAL_MODEL_COMPRESSION_THRESHOLD else None
+        )
+    if compression in (None, "none"):
+        return {}
+    options = {
+        "compression": "gzip",
+        "compression_opts": (
+            EVAL_MODEL_COMPRESSION_LEVEL
+            if compression_level is None
+            else compression_level
+        ),
+    }
+    if compression == "shuffle+gzip":
+        options["shuffle"] = True
+    return options
+
+
+# minimum time between two updates of the local orbit index
+ORBIT_INDEX_UPDATE_INTERVAL = datetime.timedelta(hours=1)
+# minimum latitude window (degrees) selecting the records around the equator
+# crossings
+ORBIT_INDEX_LATITUDE_WINDOW = 0.2
+# upper bound of the latitude change rate (degrees per second) at the equator
+# (360 degrees per an 86 minutes orbit), used to widen the latitude window
+# of the collections sampled more coarsely than 1 second
+ORBIT_INDEX_LATITUDE_RATE = 0.07
+# duration of the request probing the sampling of the orbit index collection
+ORBIT_INDEX_PROBE_DURATION = datetime.timedelta(minutes=10)
+
 REFERENCES = {
     "General Swarm": (
         " Swarm Data Handbook, https://swarmhandbook.earth.esa.int/ ",
@@ -496,6 +566,20 @@ class SwarmRequest(ClientRequest):
         token (str):
         config (str or ClientConfig):
         logging_level (str):
+        pool_size (int): maximum number of persistent connections to the server
+            (by default sized to the number of concurrent workers)
+        polling (PollingStrategy): asynchronous job status polling strategy
+        retry_policy (RetryPolicy): retry policy of the failed server requests
+        download_connections (int): number of parallel connections used to
+            download each large data file (defaults to 1)
+        cache (ResponseCache or str): on-disk cache of the downloaded data
+            (cache object or cache directory, disabled by default)
+        store (DataStore or str): local store of the downloaded data
+            indexed by days (store object or store directory, disabled
+            by default)
+        metadata_cache (MetadataCache or str or bool): cache of the metadata
+            requests (cache object, directory of a persistent cache, or True
+            for a cache shared within the process, disabled by default)
 
     """
 
@@ -1616,9 +1700,33 @@ class SwarmRequest(ClientRequest):
     ]
 
     def __init__(
-        self, url=None, token=None, config=None, logging_level=DEFAULT_LOGGING_LEVEL
+        self,
+        url=None,
+        token=None,
+        config=None,
+        logging_level=DEFAULT_LOGGING_LEVEL,
+        pool_size=None,
+        polling=None,
+        retry_policy=None,
+        download_connections=None,
+        cache=None,
+        store=None,
+        metadata_cache=None,
     ):
-        super().__init__(url, token, config, logging_level, server_type="Swarm")
+        super().__init__(
+            url,
+            token,
+            config,
+            logging_level,
+            server_type="Swarm",
+            pool_size=pool_size,
+            polling=polling,
+            retry_policy=retry_policy,
+            download_connections=download_connections,
+            cache=cache,
+            store=store,
+            metadata_cache=metadata_cache,
+        )
 
         self._available = self._get_available_data()
         self._request_inputs = SwarmWPSInputs()
@@ -1626,6 +1734,8 @@ class SwarmRequest(ClientRequest):
         self._filterlist = []
         self._supported_filetypes = ("csv", "cdf")
         self._collection_list = None
+        self._orbit_index_dir = DEFAULT_ORBIT_INDEX_DIR
+        self._orbit_indices = {}
 
     @classmethod
     def _get_available_data(cls):
@@ -1888,7 +1998,7 @@ class SwarmRequest(ClientRequest):
                 end_time=end_time,
                 response_type="text/csv",
             ).encode("UTF-8")
-            response = self._get(request, asynchronous=False, show_progress=False)
+            response = self._get_metadata("available_observatories", request)
             return response
 
         def _csv_to_df(csv_data):
@@ -2324,7 +2434,7 @@ class SwarmRequest(ClientRequest):
             collections=",".join(collections),
             response_type="application/json",
         ).encode("UTF-8")
-        response = self._get(request, asynchronous=False, show_progress=False)
+        response = self._get_metadata("get_collection_info", request)
         response = json.loads(response.decode("UTF-8"))
         return response
 
@@ -2421,6 +2531,198 @@ class SwarmRequest(ClientRequest):
                 "Set spacecraft to None."
             )
 
+    def _get_orbit_number_collection(self, mission, spacecraft):
+        """Get collection providing the orbit numbers of the spacecraft."""
+        # Change to spacecraft = "A" etc. for this request
+        if spacecraft in ("Alpha", "Bravo", "Charlie"):
+            spacecraft = spacecraft[0]
+        if mission not in self.MISSION_SPACECRAFTS:
+            raise ValueError(
+                f"Invalid mission {mission}!"
+                f"Allowed options are: {','.join(self.MISSION_SPACECRAFTS)}"
+            )
+        spacecraft = str(spacecraft)
+        if mission == "Swarm":
+            return f"SW_OPER_MOD{spacecraft}_SC_1B"
+        if mission == "GRACE":
+            if spacecraft in "12":
+                spacecraft = "AB"[int(spacecraft) - 1]
+            elif spacecraft not in "AB":
+                raise ValueError(f"Invalid spacecraft: {spacecraft}")
+            return f"GRACE_{spacecraft}_MAG"
+        if mission == "GRACE-FO":
+            return f"GF{spacecraft}_OPER_FGM_ACAL_CORR"
+        if mission == "CryoSat-2":
+            return "CS_OPER_MAG"
+        raise ValueError(f"Orbit numbers of the {mission} mission are not available!")
+
+    def _get_orbit_index(self, mission, spacecraft, times=None, orbits=None):
+        """Get the local orbit index of the spacecraft. The index is
+        downloaded or extended when the given times or orbits are not
+        covered (at most once per ORBIT_INDEX_UPDATE_INTERVAL).
+        """
+        collection = self._get_orbit_number_collection(mission, spacecraft)
+        path = os.path.join(
+            self._orbit_index_dir,
+            _to_path_component(urlparse(self._wps_service.url).netloc or "default"),
+            f"{collection}.npz",
+        )
+        index = self._orbit_indices.get(collection)
+        if index is None and os.path.exists(path):
+            index = OrbitIndex.load(path)
+        if index is None:
+            index = OrbitIndex()
+            needs_update = True
+        else:
+            needs_update = False
+            if times is not None:
+                times = times[~isnat(times)]
+                needs_update |= times.size > 0 and times.max() > index.end_time
+            if orbits is not None:
+                needs_update |= orbits.size > 0 and (
+                    len(index) == 0 or orbits.max() >= index.orbit_numbers[-1]
+                )
+            needs_update &= (
+                isnat(index.updated)
+                or self._utcnow() - _to_datetime(index.updated)
+                > ORBIT_INDEX_UPDATE_INTERVAL
+            )
+        if needs_update:
+            self._update_orbit_index(index, collection)
+            index.save(path)
+        self._orbit_indices[collection] = index
+        return index
+
+    @staticmethod
+    def _utcnow():
+        return to_utc_naive(datetime.datetime.now(datetime.timezone.utc))
+
+    def _update_orbit_index(self, index, collection):
+        """Download the orbit numbers not yet covered by the index.
+
+        Only the records around the equator crossings are requested.
+        The latitude window is widened for the collections sampled more
+        coarsely than 1 second so that no crossing is skipped.
+        The orbits start at the ascending node crossings.
+        """
+        time_extent = self.get_collection_info(collection)[0]["timeExtent"]
+        start_time = to_utc_naive(parse_datetime(time_extent["start"]))
+        end_time = to_utc_naive(parse_datetime(time_extent["end"]))
+        if len(index):
+            # repeat the last orbit to detect the start of the following one
+            start_time = max(start_time, _to_datetime(index.start_times[-1]))
+        updated = self._utcnow()
+        intervals = (
+            self._chunkify_request(start_time, end_time, "PT1S", NRECORDS_LIMIT)
+            if start_time < end_time
+            else []
+        )
+        if intervals:
+            # the window has to hold at least one record of each crossing
+            window = max(
+                ORBIT_INDEX_LATITUDE_WINDOW,
+                ORBIT_INDEX_LATITUDE_RATE
+                * self._get_orbit_index_sampling_step(collection, start_time),
+            )
+        pbar = ProgressBarChunks(len(intervals)) if len(intervals) > 1 else None
+        try:
+            for i, (chunk_start, chunk_end) in enumerate(intervals):
+                request = SwarmWPSInputs(
+                    collection_ids={collection: [collection]},
+                    begin_time=chunk_start,
+                    end_time=chunk_end,
+                    variables=["OrbitNumber"],
+                    filters=f"Latitude >= {-window:g} AND Latitude <= {window:g}",
+                    response_type="text/csv",
+                ).as_xml(self._templatefiles["async"])
+                response = self._get(request, asynchronous=True, show_progress=False)
+                df = read_csv(StringIO(str(response, "utf-8")))
+                times = to_datetime(df["Timestamp"], utc=True).dt.tz_convert(None)
+                index.extend(
+                    times.to_numpy("datetime64[ns]"),
+                    df["OrbitNumber"].to_numpy(),
+                    chunk_end,
+                )
+                if pbar:
+                    pbar.update(i, len(intervals), 0)
+        finally:
+            if pbar:
+                pbar.cleanup()
+        index.updated = datetime64(updated, "ns")
+
+    def _get_orbit_index_sampling_step(self, collection, start_time):
+        """Get the sampling step (seconds) of the orbit index collection
+        measured from a short unfiltered request at the given time.
+        Defaults to 1 second if the probed interval has no data.
+        """
+        request = SwarmWPSInputs(
+            collection_ids={collection: [collection]},
+            begin_time=start_time,
+            end_time=start_time + ORBIT_INDEX_PROBE_DURATION,
+            variables=["OrbitNumber"],
+            response_type="text/csv",
+        ).as_xml(self._templatefiles["sync"])
+        response = self._get(request, asynchronous=False, show_progress=False)
+        df = read_csv(StringIO(str(response, "utf-8")))
+        times = to_datetime(df["Timestamp"], utc=True)
+        if times.size < 2:
+            return 1.0
+        return times.diff().dt.total_seconds().median()
+
+    def get_orbit_numbers(self, spacecraft, times, mission="Swarm"):
+        """Translate times to orbit numbers.
+
+        The translation uses a local table of the orbit start times which
+        is downloaded once per spacecraft, kept in ``~/.cache/viresclient``
+        and extended when later times are requested. The lookups are
+        vectorized and suitable for large arrays of times.
+
+        Examples:
+
+            ::
+
+                from viresclient import SwarmRequest
+                request = SwarmRequest()
+                orbits = request.get_orbit_numbers("A", df.index.values)
+
+        Args:
+            spacecraft (str): as in :py:meth:`get_orbit_number`
+            times (array): array of datetime64 values (or objects
+                convertible to datetime64, e.g. datetime or pandas Timestamp)
+            mission (str): one of ('Swarm', 'GRACE', 'GRACE-FO', 'CryoSat-2')
+
+        Returns:
+            numpy.ndarray: orbit numbers (-1 for the times not covered
+            by the orbit counter)
+
+        """
+        times = asarray(times, dtype="datetime64[ns]")
+        index = self._get_orbit_index(mission, spacecraft, times=times.ravel())
+        return index.get_orbit_numbers(times)
+
+    def get_times_for_orbits_many(self, pairs, mission="Swarm", spacecraft=None):
+        """Translate pairs of orbit numbers to time intervals.
+
+        The vectorized counterpart of :py:meth:`get_times_for_orbits`
+        using the same local orbit table as :py:meth:`get_orbit_numbers`.
+
+        Args:
+            pairs (array): sequence of (start_orbit, end_orbit) pairs
+            mission (str): one of ('Swarm', 'GRACE', 'GRACE-FO', 'CryoSat-2')
+            spacecraft (str): as in :py:meth:`get_times_for_orbits`
+
+        Returns:
+            tuple(numpy.ndarray, numpy.ndarray): The start times of the start
+            orbits and the end times of the end orbits (NaT for the orbits
+            not covered by the orbit counter).
+
+        """
+        pairs = asarray(pairs, dtype="int64").reshape(-1, 2)
+        spacecraft = self._fix_spacecraft(mission, spacecraft)
+        self._check_mission_spacecraft(mission, spacecraft)
+        index = self._get_orbit_index(mission, spacecraft, orbits=pairs[:, 1])
+        return index.get_times_for_orbits(pairs[:, 0], pairs[:, 1])
+
     def get_orbit_number(self, spacecraft, input_time, mission="Swarm"):
         """Translate a time to an orbit number.
 
@@ -2443,27 +2745,7 @@ class SwarmRequest(ClientRequest):
             raise TypeError(
                 "input_time must be datetime object or ISO-8601 " "date/time string"
             )
-        # Change to spacecraft = "A" etc. for this request
-        if spacecraft in ("Alpha", "Bravo", "Charlie"):
-            spacecraft = spacecraft[0]
-        if mission not in self.MISSION_SPACECRAFTS:
-            raise ValueError(
-                f"Invalid mission {mission}!"
-                f"Allowed options are: {','.join(self.MISSION_SPACECRAFTS)}"
-            )
-        spacecraft = str(spacecraft)
-        if mission == "Swarm":
-            collection = f"SW_OPER_MOD{spacecraft}_SC_1B"
-        elif mission == "GRACE":
-            if spacecraft in "12":
-                spacecraft = "AB"[int(spacecraft) - 1]
-            elif spacecraft not in "AB":
-                raise ValueError(f"Invalid spacecraft: {spacecraft}")
-            collection = f"GRACE_{spacecraft}_MAG"
-        elif mission == "GRACE-FO":
-            collection = f"GF{spacecraft}_OPER_FGM_ACAL_CORR"
-        elif mission == "CryoSat-2":
-            collection = "CS_OPER_MAG"
+        collection = self._get_orbit_number_collection(mission, spacecraft)
         request_inputs = SwarmWPSInputs(
             collection_ids={collection: [collection]},
             begin_time=input_time,
@@ -2527,7 +2809,7 @@ class SwarmRequest(ClientRequest):
                 custom_shc=custom_shc,
                 response_type="application/json",
             ).encode("UTF-8")
-            response = self._get(request, asynchronous=False, show_progress=False)
+            response = self._get_metadata("get_model_info", request)
             response_list = json.loads(response.decode("UTF-8"))
             return response_list
 
@@ -2678,9 +2960,29 @@ class SwarmRequest(ClientRequest):
         temp_dir=".",
         input_prefix="_model_eval_input_",
         output_prefix="_model_eval_output_",
+        stream_upload=True,
+        batch_size=EVAL_MODEL_BATCH_SIZE,
+        max_workers=1,
+        output=None,
+        compression="auto",
+        compression_level=None,
+        local=False,
     ):
         """Evaluate models for the given times and locations.
 
+        Large sets of coordinates are split in batches evaluated by separate
+        requests and the results are reassembled in the original order.
+
+        With ``local=True``, custom models in the SHC format are evaluated
+        locally (see :py:class:`viresclient.SHCModel`) without any server
+        request, e.g.::
+
+            result, sources = request.eval_model(
+                {"MyModel": "my_model.shc"}, time, lat, lon, rad, local=True
+            )
+
+        yields the ``B_NEC_MyModel`` and ``F_MyModel`` arrays.
+
         Args:
             models (list(str)/dict): from .available_models() or defineable with custom expressions
             time        (datetime64) array of times
@@ -2689,56 +2991,248 @@ class SwarmRequest(ClientRequest):
             radius      (float64) array of radii (m)
             time_precision (str) optional time precision: ns* | us | ms | s
             show_progress (bool) show download progress True
+            temp_dir, input_prefix, output_prefix: directory and name
+                prefixes of the temporary files holding the HDF5 input and
+                output larger than 16 MiB (smaller data are encoded and
+                decoded in memory)
+            stream_upload (bool) stream the input data to the server (True*)
+                or send them in one buffered block (False) for the servers
+                not accepting streamed uploads
+            batch_size (int) maximum number of points evaluated by one
+                request (1000000*, None for no batching)
+            max_workers (int) maximum number of batches evaluated
+                concurrently (1*)
+            output (dict or h5py.Group) optional output the results are
+                written to batch by batch, e.g., a dictionary of preallocated
+                (or memory-mapped) arrays or an HDF5 group; the missing
+                arrays are created (the times are stored as int64 in HDF5)
+            compression (str) compression of the HDF5 input sent to the
+                server: none | gzip | shuffle+gzip | auto* (no compression
+                of inputs smaller than 16 MiB, shuffle+gzip otherwise)
+            compression_level (int) gzip compression level (0-9, 1*)
+            local (bool) evaluate the models locally (False*); the models
+                are then paths of the SHC files (or SHCModel objects), given
+                as a dictionary of the model names and the files or as a list
+                of the files (a single file is named Custom_Model)
 
         Returns:
-            dictionary of arrays with the model values
+            dictionary of arrays with the model values (or the given output)
+        """
+        if max_workers is not None and (
+            not isinstance(max_workers, int) or max_workers < 1
+        ):
+            raise ValueError("max_workers must be a positive integer")
+        max_workers = 1 if max_workers is None else max_workers
+        if batch_size is not None and (
+            not isinstance(batch_size, int) or batch_size < 1
+        ):
+            raise ValueError("batch_size must be a positive integer")
+
+        time_type = f"datetime64[{time_precision}]"
+
+        time = asarray(time, time_type)
+        latitude = asarray(latitude, "float64")
+        longitude = asarray(longitude, "float64")
+        radius = asarray(radius, "float64")
+
+        if local:
+            local_models = self._get_local_models(models)
+
+            def _eval_batch(batch, show_progress=show_progress):
+                return self._eval_model_local(
+                    local_models,
+                    time[batch],
+                    latitude[batch],
+                    longitude[batch],
+                    radius[batch],
+                )
+
+        else:
+            _, model_expression_string = self._parse_models_input(models)
+            # validate the compression option before sending any request
+            _get_hdf5_compression_options(compression, compression_level, 0)
+
+            def _eval_batch(batch, show_progress=show_progress):
+                return self._eval_model_batch(
+                    model_expression_string,
+                    time[batch],
+                    latitude[batch],
+                    longitude[batch],
+                    radius[batch],
+                    time_type=time_type,
+                    show_progress=show_progress,
+                    stream_upload=stream_upload,
+                    compression=compression,
+                    compression_level=compression_level,
+                    temp_dir=temp_dir,
+                    input_prefix=input_prefix,
+                    output_prefix=output_prefix,
+                )
+
+        size = time.shape[0] if time.ndim else 1
+        if time.ndim == 0 or batch_size is None or size <= batch_size:
+            result, sources = _eval_batch(slice(None))
+            if output is not None:
+                self._write_model_batch(output, result, slice(None), size)
+                result = output
+            return result, sources
+
+        batches = [
+            slice(start, min(start + batch_size, size))
+            for start in range(0, size, batch_size)
+        ]
+        result = {} if output is None else output
+        # sources of the batches, merged in the batch order
+        batch_sources = {}
+
+        def _store_batch(batch, batch_result, sources):
+            self._write_model_batch(result, batch_result, batch, size)
+            batch_sources[batch.start] = sources
+
+        with tqdm(
+            total=len(batches), desc="Evaluating batches", disable=not show_progress
+        ) as pbar:
+            if max_workers > 1:
+                self._wps_service.reserve_connections(max_workers)
+                executor = ThreadPoolExecutor(max_workers=max_workers)
+                try:
+                    futures = {
+                        executor.submit(_eval_batch, batch, False): batch
+                        for batch in batches
+                    }
+                    for future in as_completed(futures):
+                        _store_batch(futures[future], *future.result())
+                        pbar.update(1)
+                finally:
+                    executor.shutdown(wait=True, cancel_futures=True)
+            else:
+                for batch in batches:
+                    _store_batch(batch, *_eval_batch(batch, False))
+                    pbar.update(1)
+
+        all_sources = []
+        for batch in batches:
+            all_sources.extend(
+                source
+                for source in batch_sources[batch.start]
+                if source not in all_sources
+            )
+        return result, all_sources
+
+    @staticmethod
+    def _get_local_models(models):
+        """Load the locally evaluated models. Returns list of
+        (name, SHCModel, source) tuples.
         """
+        if isinstance(models, (str, SHCModel)):
+            models = {"Custom_Model": models}
+        elif not isinstance(models, dict):
+            models = {
+                os.path.splitext(os.path.basename(model))[0]: model for model in models
+            }
+        local_models = []
+        for name, model in models.items():
+            if isinstance(model, SHCModel):
+                local_models.append((name, model, name))
+            else:
+                source = os.path.basename(model)
+                local_models.append((name, SHCModel.from_file(model), source))
+        return local_models
+
+    @staticmethod
+    def _eval_model_local(local_models, time, latitude, longitude, radius):
+        """Evaluate one batch of the local models."""
+        result = {
+            "Timestamp": time,
+            "Latitude": latitude,
+            "Longitude": longitude,
+            "Radius": radius,
+        }
+        for name, model, _ in local_models:
+            b_nec = model.eval(time, latitude, longitude, radius)
+            result[f"B_NEC_{name}"] = b_nec
+            result[f"F_{name}"] = sqrt((b_nec**2).sum(axis=-1))
+        return result, [source for _, _, source in local_models]
+
+    @staticmethod
+    def _write_model_batch(output, batch_result, batch, size):
+        """Write the evaluated batch of the model values to the output."""
+        for key, array in batch_result.items():
+            if array.ndim == 0:
+                if key not in output:
+                    output[key] = array
+                continue
+            if key not in output:
+                shape = (size, *array.shape[1:])
+                if hasattr(output, "create_dataset"):
+                    # HDF5 does not support the datetime64 type
+                    dtype = "int64" if array.dtype.kind == "M" else array.dtype
+                    output.create_dataset(key, shape, dtype=dtype)
+                else:
+                    output[key] = empty(shape, dtype=array.dtype)
+            target = output[key]
+            if array.dtype.kind == "M" and target.dtype.kind != "M":
+                array = array.astype("int64")
+            target[batch] = array
+
+    def _eval_model_batch(
+        self,
+        model_expression_string,
+        time,
+        latitude,
+        longitude,
+        radius,
+        time_type,
+        show_progress,
+        stream_upload,
+        compression,
+        compression_level,
+        temp_dir=".",
+        input_prefix="_model_eval_input_",
+        output_prefix="_model_eval_output_",
+    ):
+        """Evaluate models for one batch of times and locations."""
+
+        def _open_buffer(nbytes, prefix):
+            # small data are held in memory, large data in a temporary file
+            if nbytes is None or nbytes > EVAL_MODEL_IN_MEMORY_LIMIT:
+                return TemporaryFile(dir=temp_dir, prefix=prefix, suffix=".hdf5")
+            return BytesIO()
+
         # FIXME show download progress
 
-        def _write_hdf5_file(filename, data):
-            with h5py.File(filename, "w") as hdf:
+        def _write_hdf5_file(file, data):
+            nbytes = sum(array.nbytes for array in data.values())
+            options = _get_hdf5_compression_options(
+                compression, compression_level, nbytes
+            )
+            with h5py.File(file, "w") as hdf:
                 for key, array in data.items():
-                    options = (
-                        {}
-                        if array.ndim == 0
-                        else {
-                            "compression": "gzip",
-                            "compression_opts": 9,
-                        }
+                    hdf.create_dataset(
+                        key, data=array, **({} if array.ndim == 0 else options)
                     )
-                    hdf.create_dataset(key, data=array, **options)
 
-        def _read_hdf5_file(filename):
-            with h5py.File(filename, "r") as hdf:
+        def _read_hdf5_file(file):
+            with h5py.File(file, "r") as hdf:
                 data = {key: hdf[key][...] for key in hdf}
                 sources = hdf.attrs["sources"].tolist()
             if "Timestamp" in data:
                 data["Timestamp"] = data["Timestamp"].astype(time_type)
             return data, sources
 
-        def _response_handler(filename, chunksize=1024 * 1024):
+        def _response_handler(chunksize=1024 * 1024):
             def _handler(file_obj):
-                # save received received HDF5 file
-                with open(filename, "wb") as file:
+                # receive the HDF5 file in memory or in a temporary file
+                length = file_obj.info().get("Content-Length")
+                nbytes = None if length is None else int(length)
+                with _open_buffer(nbytes, output_prefix) as file:
                     shutil.copyfileobj(file_obj, file, chunksize)
-                # read results from the HDF5 file
-                return _read_hdf5_file(filename)
+                    # read results from the HDF5 file
+                    return _read_hdf5_file(file)
 
             return _handler
 
-        # FIXME: temp. file handling
         request_id = uuid.uuid4()
-        input_filename = os.path.join(temp_dir, f"{input_prefix}{request_id}.hdf5")
-        output_filename = os.path.join(temp_dir, f"{output_prefix}{request_id}.hdf5")
-
-        _, model_expression_string = self._parse_models_input(models)
-
-        time_type = f"datetime64[{time_precision}]"
-
-        time = asarray(time, time_type)
-        latitude = asarray(latitude, "float64")
-        longitude = asarray(longitude, "float64")
-        radius = asarray(radius, "float64")
 
         # the XML request and binary data are sent as multipart/related request
         # see https://en.wikipedia.org/wiki/MIME#Multipart_messages
@@ -2756,60 +3250,53 @@ class SwarmRequest(ClientRequest):
             output_mime_type="application/x-hdf5",
         ).encode("UTF-8")
 
+        # encode the input HDF5 file in memory or in a temporary file
+        input_data = {
+            "Timestamp": time.astype("int64"),
+            "Latitude": latitude,
+            "Longitude": longitude,
+            "Radius": radius,
+        }
+        input_file = _open_buffer(
+            sum(array.nbytes for array in input_data.values()), input_prefix
+        )
         try:
-            # write input HDF5 file
-            _write_hdf5_file(
-                input_filename,
-                {
-                    "Timestamp": time.astype("int64"),
-                    "Latitude": latitude,
-                    "Longitude": longitude,
-                    "Radius": radius,
-                },
-            )
-
-            # streaming request from the input HDF5 file
-            with open(input_filename, "rb") as input_file:
-                parts = [
-                    (
-                        request,
-                        {
-                            "Content-Type": "application/xml; charset=utf-8",
-                        },
-                    ),
-                    (
-                        input_file,
-                        {
-                            "Content-Id": request_id,
-                            "Content-Type": "application/x-hdf5",
-                        },
-                    ),
-                ]
-
-                # Due to the Django limitations we must aggregate the request
-                # chunks in one block.
-                # payload_size = get_multipart_request_size(parts, multipart_boundary)
-                # payload = generate_multipart_request(parts, multipart_boundary)
-                payload = b"".join(
-                    generate_multipart_request(parts, multipart_boundary)
-                )
-
-                result, sources = self._get(
-                    payload,
-                    response_handler=_response_handler(output_filename),
-                    asynchronous=False,
-                    show_progress=show_progress,
-                    content_type=(f"multipart/related; boundary={multipart_boundary}"),
-                    headers={
-                        "MIME-Version": "1.0",
-                        # "Content-Length": payload_size,
+            _write_hdf5_file(input_file, input_data)
+            del input_data
+
+            parts = [
+                (
+                    request,
+                    {
+                        "Content-Type": "application/xml; charset=utf-8",
                     },
-                )
-
+                ),
+                (
+                    input_file,
+                    {
+                        "Content-Id": request_id,
+                        "Content-Type": "application/x-hdf5",
+                    },
+                ),
+            ]
+
+            # The payload is streamed with an explicit Content-Length.
+            # Servers not accepting streamed uploads require the whole payload
+            # aggregated in one block.
+            payload = MultipartPayload(parts, multipart_boundary)
+            if not stream_upload:
+                payload = bytes(payload)
+
+            result, sources = self._get(
+                payload,
+                response_handler=_response_handler(),
+                asynchronous=False,
+                show_progress=show_progress,
+                content_type=(f"multipart/related; boundary={multipart_boundary}"),
+                headers={"MIME-Version": "1.0"},
+            )
         finally:
-            for filename in [input_filename, output_filename]:
-                if os.path.exists(filename):
-                    os.remove(filename)
+            input_file.close()
 
         return result, sources
 
@@ -2819,6 +3306,7 @@ class SwarmRequest(ClientRequest):
         input_cdf_filename,
         output_cdf_filename,
         show_progress=True,
+        stream_upload=True,
     ):
         """Evaluate models for the coordinates given in a Swarm-like CDF file.
 
@@ -2827,6 +3315,9 @@ class SwarmRequest(ClientRequest):
             input_cdf_filename (str): input CDF file.
             output_cdf_filename (str): output CDF file.
             show_progress (bool): show download progress True
+            stream_upload (bool): stream the input file to the server (True*)
+                or send it in one buffered block (False) for the servers
+                not accepting streamed uploads
 
         Returns:
             copy of output_cdf_filename
@@ -2890,14 +3381,12 @@ class SwarmRequest(ClientRequest):
                     ),
                 ]
 
-                # Due to the Django limitations we must aggregate the request
-                # chunks in one block.
-
-                # payload_size = get_multipart_request_size(parts, multipart_boundary)
-                # payload = generate_multipart_request(parts, multipart_boundary)
-                payload = b"".join(
-                    generate_multipart_request(parts, multipart_boundary)
-                )
+                # The payload is streamed from the input file with an explicit
+                # Content-Length. Servers not accepting streamed uploads
+                # require the whole payload aggregated in one block.
+                payload = MultipartPayload(parts, multipart_boundary)
+                if not stream_upload:
+                    payload = bytes(payload)
 
                 self._get(
                     payload,
@@ -2905,10 +3394,7 @@ class SwarmRequest(ClientRequest):
                     asynchronous=False,
                     show_progress=show_progress,
                     content_type=(f"multipart/related; boundary={multipart_boundary}"),
-                    headers={
-                        "MIME-Version": "1.0",
-                        # "Content-Length": payload_size,
-                    },
+                    headers={"MIME-Version": "1.0"},
                 )
 
                 os.rename(temp_cdf_filename, output_cdf_filename)
@@ -31,6 +31,10 @@ import json
 import os
 import shutil
 import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
 
 import cdflib
 import netCDF4
@@ -39,6 +43,12 @@ import pandas
 import xarray
 
 from ._wps import time_util
+from ._wps.time_util import to_utc_naive
+
+try:
+    import pyarrow
+except ImportError:  # optional dependency
+    pyarrow = None
 
 if os.name == "nt":
     import atexit
@@ -49,6 +59,11 @@ CDF_EPOCH_1970 = 62167219200000.0
 
 ALLOWED_SPACECRFTS = ["A", "B", "C", "1", "2", "-"]
 
+# Layouts of the non-expanded vector columns of the pandas dataframe
+#  "object" - object array holding the records as numpy arrays
+#  "arrow" - Arrow fixed-size lists sharing one buffer (requires pyarrow)
+VECTOR_LAYOUTS = ("object", "arrow")
+
 # Frame names to use as xarray dimension names
 FRAME_NAMES = {
     "NEC": ["B_NEC", "B_OB", "B_CF", "B_SV", "sigma_OB", "sigma_CF", "sigma_SV"],
@@ -81,6 +96,54 @@ FRAME_DESCRIPTIONS = {
 }
 
 
+def _imap_ordered(function, items, max_workers=None, use_processes=False):
+    """Apply function to the items, optionally by a pool of threads or
+    processes (the function and the items must be picklable then).
+
+    The results are yielded in the order of the items. The number of
+    pending results is bounded to limit the memory held by them.
+    """
+    if max_workers is None or max_workers == 1:
+        yield from map(function, items)
+        return
+    executor_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    with executor_class(max_workers=max_workers) as executor:
+        futures = deque()
+        for item in items:
+            futures.append(executor.submit(function, item))
+            if len(futures) >= 2 * max_workers:
+                yield futures.popleft().result()
+        while futures:
+            yield futures.popleft().result()
+
+
+def _check_vector_layout(vector_layout):
+    if vector_layout not in VECTOR_LAYOUTS:
+        raise ValueError(f"vector_layout must be one of {VECTOR_LAYOUTS}")
+    if vector_layout == "arrow" and (
+        pyarrow is None or not hasattr(pandas, "ArrowDtype")
+    ):
+        raise ImportError(
+            "vector_layout='arrow' requires the pyarrow package and pandas>=2.0"
+        )
+
+
+def _decode_cdf_file(item, variables):
+    """Decode the variables of the CDF file given as a (path, file options,
+    time slice) tuple (picklable to be decoded by a worker process).
+    """
+    path, file_options, time_slice = item
+    with FileReader(path, time_slice=time_slice, **file_options) as f:
+        return {var: numpy.asarray(f.get_variable(var)) for var in variables}
+
+
+def _check_max_workers(max_workers, name="max_workers"):
+    if max_workers is not None and (
+        not isinstance(max_workers, int) or max_workers < 1
+    ):
+        raise ValueError(f"{name} must be a positive integer")
+
+
 class FileReader:
     """Provides access to file contents (wrapper around cdflib)"""
 
@@ -90,13 +153,25 @@ class FileReader:
         filetype="cdf",
         time_variable="Timestamp",
         secondary_time_variables=None,
+        time_slice=None,
+        variable_workers=None,
     ):
         """
 
         Args:
             file (file-like or str)
+            time_slice (slice or tuple): optional time range (start, end)
+                limiting the records read from the file
+            variable_workers (int): optional number of threads decoding
+                the variables concurrently (default 1). The record parsing
+                of cdflib holds the GIL, i.e., the threads give no speed-up
+                of the parsing and overlap only the file reading and the
+                decompression of the compressed variables.
         """
+        _check_max_workers(variable_workers, "variable_workers")
         if filetype.lower() == "cdf":
+            self._file = file
+            self._variable_workers = variable_workers
             self._cdf = self._open_cdf(file)
             globalatts = self._cdf.globalattsget()
             self.sources = self._ensure_list(
@@ -107,12 +182,16 @@ class FileReader:
             )
             self.data_filters = self._ensure_list(globalatts.get("DATA_FILTERS", []))
             self.variables = self._get_attr_or_key(self._cdf.cdf_info(), "zVariables")
-            self._varatts = {var: self._cdf.varattsget(var) for var in self.variables}
-            self._varinfo = {var: self._cdf.varinq(var) for var in self.variables}
+            # variable attributes, info and data are read on demand
+            self._varatts = {}
+            self._varinfo = {}
+            self._data = {}
             self._time_variable = time_variable
             self._secondary_time_variables = (
                 secondary_time_variables if secondary_time_variables else []
             )
+            self._time_slice = self._parse_time_slice(time_slice)
+            self._record_range = None
         else:
             raise NotImplementedError(f"{filetype} not supported")
 
@@ -120,8 +199,12 @@ class FileReader:
         return self
 
     def __exit__(self, *args):
+        self._close_cdf(self._cdf)
+
+    @staticmethod
+    def _close_cdf(cdf):
         try:
-            self._cdf.close()
+            cdf.close()
         except AttributeError:
             pass
 
@@ -153,9 +236,49 @@ class FileReader:
             return getattr(obj, attr, None)
 
     def get_variable(self, var):
+        """Get decoded data of a variable (read once and memoized)."""
+        if var not in self._data:
+            self._data[var] = self._read_variable(var)
+        return self._data[var]
+
+    def read_variables(self, variables):
+        """Read data of multiple variables (read once and memoized).
+
+        If enabled by variable_workers, the variables are decoded by
+        a pool of threads, each reading the file through its own cdflib
+        handle. This gives no speed-up of the cdflib record parsing.
+        """
+        variables = [var for var in variables if var not in self._data]
+        max_workers = min(self._variable_workers or 1, len(variables))
+        if max_workers <= 1:
+            for var in variables:
+                self.get_variable(var)
+            return
+        # metadata are read through the shared handle in advance
+        for var in variables:
+            self._get_varinfo(var)
+        self.get_record_range()
+        handles = []
+        local = threading.local()
+
+        def _read_variable(var):
+            cdf = getattr(local, "cdf", None)
+            if cdf is None:
+                cdf = local.cdf = self._open_cdf(self._file)
+                handles.append(cdf)
+            return var, self._read_variable(var, cdf)
+
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                self._data.update(executor.map(_read_variable, variables))
+        finally:
+            for cdf in handles:
+                self._close_cdf(cdf)
+
+    def _read_variable(self, var, cdf=None):
         parser = self._get_data_parser(var)
         try:
-            data = parser(self._cdf.varget(var))
+            data = parser(self._read_records(var, cdf))
         except ValueError:
             data = None
         if data is None:
@@ -163,21 +286,125 @@ class FileReader:
             data = numpy.empty(shape)
         return data
 
+    def _read_records(self, var, cdf=None):
+        """Read raw data of a variable, limited to the selected records."""
+        cdf = self._cdf if cdf is None else cdf
+        if self._time_slice is None or not self._get_attr_or_key(
+            self._get_varinfo(var), "Rec_Vary"
+        ):
+            return cdf.varget(var)
+        start, end = self.get_record_range()
+        if start >= end:
+            # no record selected - handled as an empty variable
+            raise ValueError("No record selected.")
+        return cdf.varget(var, startrec=start, endrec=end - 1)
+
+    @staticmethod
+    def _parse_time_slice(time_slice):
+        """Convert the time slice to a pair of CDF_EPOCH values (or None)."""
+
+        def _to_cdf_epoch(value):
+            if value is None:
+                return None
+            value = pandas.Timestamp(value)
+            if value.tzinfo is not None:
+                value = value.tz_convert("UTC").tz_localize(None)
+            return value.value / 1e6 + CDF_EPOCH_1970
+
+        if time_slice is None:
+            return None
+        if isinstance(time_slice, slice):
+            if time_slice.step is not None:
+                raise ValueError("Time slice step is not supported.")
+            time_slice = (time_slice.start, time_slice.stop)
+        start, end = time_slice
+        return _to_cdf_epoch(start), _to_cdf_epoch(end)
+
+    def get_record_range(self):
+        """Get range of records (start, end) matching the time slice.
+
+        The records are located by a binary search of the time variable,
+        i.e., the whole time variable is not read.
+        The time slice includes the start time and excludes the end time.
+        """
+        if self._record_range is None:
+            nrecords = self.get_nrecords()
+            if self._time_slice is None:
+                self._record_range = (0, nrecords)
+            else:
+                start, end = self._time_slice
+                start = 0 if start is None else self._find_record(start, nrecords)
+                end = nrecords if end is None else self._find_record(end, nrecords)
+                self._record_range = (start, max(start, end))
+        return self._record_range
+
+    def _find_record(self, time, nrecords):
+        """Find index of the first record not earlier than the given time."""
+        low, high = 0, nrecords
+        while low < high:
+            middle = (low + high) // 2
+            value = self._cdf.varget(
+                self._time_variable, startrec=middle, endrec=middle
+            )
+            if numpy.ravel(value)[0] < time:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _get_varatts(self, var):
+        if var not in self.variables:
+            raise KeyError(var)
+        if var not in self._varatts:
+            self._varatts[var] = self._cdf.varattsget(var)
+        return self._varatts[var]
+
+    def _get_varinfo(self, var):
+        if var not in self.variables:
+            raise KeyError(var)
+        if var not in self._varinfo:
+            self._varinfo[var] = self._cdf.varinq(var)
+        return self._varinfo[var]
+
+    def _select_variables(self, variables):
+        """Get the variables to be read, the time variable always included."""
+        if variables is None:
+            return list(self.variables)
+        if isinstance(variables, str):
+            variables = [variables]
+        missing = [var for var in variables if var not in self.variables]
+        if missing:
+            raise ValueError(f"Variables not available: {', '.join(missing)}")
+        return [
+            var
+            for var in self.variables
+            if var == self._time_variable or var in variables
+        ]
+
+    def get_nrecords(self):
+        """Get number of records, i.e., length of the time variable."""
+        if self._time_variable not in self.variables:
+            return 0
+        last_record = self._get_attr_or_key(
+            self._get_varinfo(self._time_variable), "Last_Rec"
+        )
+        return 0 if last_record is None else last_record + 1
+
     def get_variable_units(self, var):
-        units = self._varatts[var].get("UNITS", "")
-        unit = self._varatts[var].get("UNIT", "")
+        units = self._get_varatts(var).get("UNITS", "")
+        unit = self._get_varatts(var).get("UNIT", "")
         return unit or units
 
     def get_variable_description(self, var):
-        desc = self._varatts[var].get("DESCRIPTION", "")
-        catdesc = self._varatts[var].get("CATDESC", "")
+        desc = self._get_varatts(var).get("DESCRIPTION", "")
+        catdesc = self._get_varatts(var).get("CATDESC", "")
         return desc if desc else catdesc
 
     def get_variable_numdims(self, var):
-        return self._get_attr_or_key(self._varinfo[var], "Num_Dims")
+        return self._get_attr_or_key(self._get_varinfo(var), "Num_Dims")
 
     def get_variable_dimsizes(self, var):
-        return self._get_attr_or_key(self._varinfo[var], "Dim_Sizes")
+        return self._get_attr_or_key(self._get_varinfo(var), "Dim_Sizes")
 
     @staticmethod
     def _cdftime_to_datetime(t):
@@ -198,10 +425,13 @@ class FileReader:
         else:
             return default_parser
 
-    def as_pandas_dataframe(self, expand=False):
+    def as_pandas_dataframe(self, expand=False, variables=None, vector_layout="object"):
+        _check_vector_layout(vector_layout)
         # Use the variables in the file as columns to create in the dataframe.
         # Skip Timestamp as it will be used as the index.
-        columns = set(self.variables)
+        selected = self._select_variables(variables)
+        self.read_variables(selected)
+        columns = set(selected)
         columns.remove(self._time_variable)
         # Split columns according to those to be expanded into multiple columns
         if expand:
@@ -216,53 +446,78 @@ class FileReader:
                 columns_to_expand.discard("Quality")
         else:
             columns_to_expand = set()
-        columns_standard = columns.difference(columns_to_expand)
-        # Initialise dataframe with Timestamp as index
-        df = pandas.DataFrame(index=self.get_variable(self._time_variable))
-        df.index.name = self._time_variable
-        # Return empty dataframe, including column names
-        #  when retrieval from server is empty
-        if len(df.index) == 0:
-            for column in columns_standard:
-                df[column] = None
-            for column in columns_to_expand:
-                framename = DATANAMES_TO_FRAME_NAMES.get(column, "NEC")
-                suffixes = FRAME_LABELS[framename]
-                for suffix in suffixes:
-                    df[column + "_" + str(suffix)] = None
-            return df
-        # Separately add non-expanded and expanded columns
-        for column in columns_standard:
-            df[column] = list(self.get_variable(column))
-        for column in columns_to_expand:
-            vector_data = self.get_variable(column)
+        # Keep the order of the variables in the file
+        columns = [var for var in self.variables if var in columns]
+        index = self.get_variable(self._time_variable)
+        # Collect all columns first and create the dataframe in one pass
+        data = {}
+        for column in columns:
+            if column not in columns_to_expand:
+                data[column] = self._get_dataframe_column(
+                    column, len(index), vector_layout
+                )
+                continue
             framename = DATANAMES_TO_FRAME_NAMES.get(column, "NEC")
             suffixes = FRAME_LABELS[framename]
+            # Return empty columns when retrieval from server is empty
+            if len(index) == 0:
+                for suffix in suffixes:
+                    data[column + "_" + str(suffix)] = None
+                continue
+            vector_data = self.get_variable(column)
             if len(vector_data.shape) > 2:
                 raise NotImplementedError(f"{column}")
             if vector_data.shape[1] != len(suffixes):
                 raise NotImplementedError(f"{column}")
+            # columns of the 2D array (views, not copies)
             for i, suffix in enumerate(suffixes):
-                df[column + "_" + str(suffix)] = vector_data[:, i]
+                data[column + "_" + str(suffix)] = vector_data[:, i]
+        df = pandas.DataFrame(data, index=index, columns=list(data), copy=False)
+        df.index.name = self._time_variable
         return df
 
-    def as_xarray_dataset(self, reshape=False):
+    def _get_dataframe_column(self, var, size, vector_layout="object"):
+        """Get the data of a non-expanded dataframe column.
+
+        Scalar variables are used as they are. The records of the vector
+        and matrix variables are either views of the one array holding
+        the data (object layout) or Arrow fixed-size lists sharing
+        the buffer of this array (arrow layout).
+        """
+        if size == 0:
+            return None
+        data = self.get_variable(var)
+        if len(data.shape) < 2:
+            return data
+        if vector_layout == "arrow":
+            array = pyarrow.array(numpy.ascontiguousarray(data).ravel())
+            for dimsize in reversed(data.shape[1:]):
+                array = pyarrow.FixedSizeListArray.from_arrays(array, dimsize)
+            return pandas.array(array, dtype=pandas.ArrowDtype(array.type))
+        column = numpy.empty(data.shape[0], dtype="object")
+        for i in range(data.shape[0]):
+            column[i] = data[i]
+        return column
+
+    def as_xarray_dataset(self, reshape=False, variables=None):
         # NB currrently does not set the global metadata (attrs)
         #  (avoids issues with concatenating them)
         #  (this is done in ReturnedData)
+        variables = self._select_variables(variables)
+        self.read_variables(variables)
         # Initialise dataset with time coordinate
         ds = xarray.Dataset(
             coords={self._time_variable: self.get_variable(self._time_variable)}
         )
         # Add Spacecraft variable as Categorical to save memory
-        if "Spacecraft" in self.variables:
+        if "Spacecraft" in variables:
             ds["Spacecraft"] = (
                 (self._time_variable,),
                 pandas.Categorical(
                     self.get_variable("Spacecraft"), categories=ALLOWED_SPACECRFTS
                 ),
             )
-        datanames = set(self.variables) - {self._time_variable, "Spacecraft"}
+        datanames = set(variables) - {self._time_variable, "Spacecraft"}
         # Loop through each variable available and append them to the Dataset,
         #  attaching the Timestamp coordinate to each.
         # Attach dimension names based on the name of the variable,
@@ -284,18 +539,12 @@ class FileReader:
                     dims_used.add(dimname)
                 else:
                     dimname = "%s_dim1" % dataname
-                ds[dataname] = (
-                    (self._time_variable, dimname),
-                    self.get_variable(dataname),
-                )
+                ds[dataname] = ((self._time_variable, dimname), data)
             # 3D case (matrix series), e.g. QDBasis
             elif numdims == 2:
                 dimname1 = "%s_dim1" % dataname
                 dimname2 = "%s_dim2" % dataname
-                ds[dataname] = (
-                    (self._time_variable, dimname1, dimname2),
-                    self.get_variable(dataname),
-                )
+                ds[dataname] = ((self._time_variable, dimname1, dimname2), data)
             else:
                 raise NotImplementedError("%s: array too complicated" % dataname)
         # Add named coordinates
@@ -405,20 +654,28 @@ class FileReader:
         return self._reshape_one_code(ds, "SiteCode")
 
 
-def make_pandas_DataFrame_from_csv(csv_filename, time_variable="Timestamp"):
+def make_pandas_DataFrame_from_csv(
+    csv_filename, time_variable="Timestamp", columns=None
+):
     """Load a csv file into a pandas.DataFrame
 
     Set the Timestamp as a datetime index.
 
     Args:
         csv_filename (str)
+        columns (list of str): columns to be loaded (default all)
 
     Returns:
         pandas.DataFrame
 
     """
+    usecols = None
+    if columns is not None:
+        if isinstance(columns, str):
+            columns = [columns]
+        usecols = [time_variable, *(col for col in columns if col != time_variable)]
     try:
-        df = pandas.read_csv(csv_filename)
+        df = pandas.read_csv(csv_filename, usecols=usecols)
     except Exception:
         raise Exception("Bad or empty csv.")
     # Convert to datetime objects
@@ -449,6 +706,9 @@ class ReturnedDataFile:
 
     def __init__(self, filetype=None, tmpdir=None, file_options=None):
         self._file_options = file_options or {}
+        # time range (start, end) of the records read from a file holding
+        # a longer interval (e.g., restored from the DataStore)
+        self._time_slice = None
         self._supported_filetypes = ("csv", "cdf", "nc")
         self.filetype = "" if filetype is None else filetype
         if tmpdir is not None:
@@ -506,6 +766,20 @@ class ReturnedDataFile:
             with open(filename, "wb") as out_file:
                 shutil.copyfileobj(temp_file, out_file)
 
+    def _count_records(self):
+        """Get number of records held by the file (None if not known)"""
+        if self.filetype == "cdf":
+            with self._open_reader() as f:
+                start, end = f.get_record_range()
+                return end - start
+        if self.filetype == "csv" and self._time_slice is not None:
+            return len(self.as_dataframe())
+        if self.filetype == "csv":
+            with open(self._file.name, "rb") as file:
+                # one line per record following the header
+                return max(sum(1 for _ in file) - 1, 0)
+        return None
+
     @property
     def filetype(self):
         """Filetype is one of ("csv", "cdf", "nc")"""
@@ -546,9 +820,30 @@ class ReturnedDataFile:
 
         """
         self._check_outfile(path, self.filetype, overwrite)
-        self._write_file(path)
+        if self._time_slice is None:
+            self._write_file(path)
+        elif self.filetype == "csv":
+            self._write_csv_records(path)
+        else:
+            raise NotImplementedError(
+                "The data are a part of a longer stored file and cannot be "
+                "saved directly. Use as_xarray() or as_dataframe() instead."
+            )
         print("Data written to", path)
 
+    def _write_csv_records(self, path):
+        """Write the CSV records within the time slice to a regular file"""
+        mask = self._get_time_mask(
+            make_pandas_DataFrame_from_csv(self._file.name, columns=[]).index,
+            self._time_slice,
+        )
+        with open(self._file.name, "rb") as temp_file:
+            with open(path, "wb") as out_file:
+                out_file.write(temp_file.readline())
+                for line, selected in zip(temp_file, mask):
+                    if selected:
+                        out_file.write(line)
+
     def to_netcdf(self, path, overwrite=False):
         """Saves the data as a netCDF4 file (this is compatible with HDF5)
 
@@ -561,9 +856,25 @@ class ReturnedDataFile:
         ds.to_netcdf(path)
         print("Data written to", path)
 
-    def as_dataframe(self, expand=False):
+    def as_dataframe(
+        self,
+        expand=False,
+        columns=None,
+        time_slice=None,
+        variable_workers=None,
+        vector_layout="object",
+    ):
         """Convert the data to a pandas DataFrame.
 
+        Args:
+            expand (bool)
+            columns (list of str): variables to be loaded (default all)
+            time_slice (slice or tuple): time range (start, end) to be loaded
+            variable_workers (int): number of threads decoding the CDF
+                variables concurrently (default 1, see FileReader)
+            vector_layout (str): layout of the non-expanded CDF vector
+                columns, "object" (default) or "arrow"
+
         Returns:
             pandas.DataFrame
 
@@ -571,15 +882,74 @@ class ReturnedDataFile:
         if self.filetype == "csv":
             if expand:
                 raise NotImplementedError
-            df = make_pandas_DataFrame_from_csv(self._file.name)
+            df = make_pandas_DataFrame_from_csv(self._file.name, columns=columns)
+            time_slice = self._restrict_time_slice(time_slice)
+            if time_slice is not None:
+                df = df[self._get_time_mask(df.index, time_slice)]
         elif self.filetype == "nc":
-            df = self.as_xarray().to_dataframe()
+            if time_slice is not None:
+                raise NotImplementedError("time_slice is not supported for nc")
+            df = self.as_xarray(variables=columns).to_dataframe()
         elif self.filetype == "cdf":
-            with FileReader(self._file, **self._file_options) as f:
-                df = f.as_pandas_dataframe(expand=expand)
+            with self._open_reader(time_slice, variable_workers) as f:
+                df = f.as_pandas_dataframe(
+                    expand=expand, variables=columns, vector_layout=vector_layout
+                )
         return df
 
-    def as_xarray(self, group=None, reshape=False):
+    def _open_reader(self, time_slice=None, variable_workers=None):
+        """Open the CDF file as FileReader."""
+        return FileReader(
+            self._file,
+            time_slice=self._restrict_time_slice(time_slice),
+            variable_workers=variable_workers,
+            **self._file_options,
+        )
+
+    def _restrict_time_slice(self, time_slice):
+        """Restrict the time slice to the time slice of the file."""
+        if self._time_slice is None:
+            return time_slice
+        if time_slice is None:
+            return self._time_slice
+
+        def _parse(time_slice):
+            if isinstance(time_slice, slice):
+                time_slice = (time_slice.start, time_slice.stop)
+            return [
+                None if value is None else to_utc_naive(pandas.Timestamp(value))
+                for value in time_slice
+            ]
+
+        (start, end), (file_start, file_end) = _parse(time_slice), _parse(
+            self._time_slice
+        )
+        return (
+            file_start if start is None else max(start, file_start),
+            file_end if end is None else min(end, file_end),
+        )
+
+    @staticmethod
+    def _get_time_mask(times, time_slice):
+        """Get mask of the times within the time slice (start, end)."""
+        start, end = FileReader._parse_time_slice(time_slice)
+        times = (numpy.asarray(times, "datetime64[ns]").astype("int64")) / 1e6
+        times = times + CDF_EPOCH_1970
+        mask = numpy.ones(times.shape, dtype="bool")
+        if start is not None:
+            mask &= times >= start
+        if end is not None:
+            mask &= times < end
+        return mask
+
+    def as_xarray(
+        self,
+        group=None,
+        reshape=False,
+        variables=None,
+        time_slice=None,
+        variable_workers=None,
+    ):
         """Convert the data to an xarray Dataset.
 
         Note:
@@ -587,6 +957,14 @@ class ReturnedDataFile:
 
             Only supports scalar and 3D vectors (currently)
 
+        Args:
+            reshape (bool)
+            variables (list of str): variables to be loaded (default all)
+            time_slice (slice or tuple): time range (start, end) to be loaded
+                (only cdf)
+            variable_workers (int): number of threads decoding the CDF
+                variables concurrently (default 1, see FileReader)
+
         Returns:
             xarray.Dataset
 
@@ -594,9 +972,11 @@ class ReturnedDataFile:
         if self.filetype == "csv":
             raise NotImplementedError("csv to xarray is not supported")
         elif self.filetype == "cdf":
-            with FileReader(self._file, **self._file_options) as f:
-                ds = f.as_xarray_dataset(reshape=reshape)
+            with self._open_reader(time_slice, variable_workers) as f:
+                ds = f.as_xarray_dataset(reshape=reshape, variables=variables)
         elif self.filetype == "nc":
+            if time_slice is not None:
+                raise NotImplementedError("time_slice is not supported for nc")
             # xarrays open_dataset does not retrieve data in groups
             # group needs to be specified while opening
             # we iterate here over the available groups
@@ -623,6 +1003,10 @@ class ReturnedDataFile:
                         if parameter in field_type and field_type[parameter]["uom"]:
                             ds[parameter].attrs["units"] = field_type[parameter]["uom"]
             # TODO: Go through Swarm parameters
+            if variables is not None:
+                if isinstance(variables, str):
+                    variables = [variables]
+                ds = ds[list(variables)]
         return ds
 
     def as_xarray_dict(self):
@@ -808,7 +1192,16 @@ class ReturnedData:
                 )
         self._contents = value
 
-    def as_dataframe(self, expand=False):
+    def as_dataframe(
+        self,
+        expand=False,
+        columns=None,
+        time_slice=None,
+        max_workers=None,
+        vector_layout="object",
+        use_processes=False,
+        variable_workers=None,
+    ):
         """Convert the data to a pandas DataFrame.
 
         If expand is True, expand some columns, e.g.:
@@ -817,37 +1210,170 @@ class ReturnedData:
 
         B_VFM -> B_VFM_i, B_VFM_j, B_VFM_k
 
+        If columns are given, only these variables are read from the files
+        (the names of the variables before the expansion, e.g., B_NEC).
+
+        If time_slice is given, only the records within the time range are
+        read (start included, end excluded), e.g.::
+
+            data.as_dataframe(time_slice=("2020-01-01T10:00", "2020-01-01T11:00"))
+
+        The non-expanded vector columns of the CDF data hold by default
+        the records as numpy arrays (object layout). The compact "arrow"
+        layout stores the vectors as Arrow fixed-size lists sharing one
+        buffer (requires pyarrow).
+
         Args:
             expand (bool)
+            columns (list of str): variables to be loaded (default all)
+            time_slice (slice or tuple): time range (start, end) to be loaded
+            max_workers (int): maximum number of files decoded concurrently
+                (default 1). See the note on threads and processes below.
+            vector_layout (str): layout of the non-expanded vector columns,
+                "object" (default) or "arrow"
+            use_processes (bool): decode multiple CDF files by a pool of
+                max_workers processes instead of threads
+            variable_workers (int): number of threads decoding the variables
+                of each CDF file concurrently (default 1). These threads give
+                no speed-up of the cdflib record parsing.
+
+        Note:
+            The record parsing of cdflib is Python code holding the GIL.
+            Threads overlap only the file reading and the decompression.
+            For 8 files of 432000 records of the Swarm MAG variables, about
+            80 % of the decoding time is spent parsing the Spacecraft
+            character variable record by record and 4 threads give no
+            measurable speed-up (1.0x), whether decoding multiple files
+            or the variables of a single file. Processes decode the files
+            in parallel, but starting the workers and transferring the
+            decoded arrays back costs about 50 % of the serial decoding
+            time, i.e., they pay off only with several idle CPU cores.
 
         Returns:
             pandas.DataFrame
 
         """
-        dataframes = [data.as_dataframe(expand=expand) for data in self.contents]
+        _check_max_workers(max_workers)
+        _check_max_workers(variable_workers, "variable_workers")
+        _check_vector_layout(vector_layout)
+        merged = self._merge_cdf_files(
+            variables=columns,
+            time_slice=time_slice,
+            max_workers=max_workers,
+            use_processes=use_processes,
+            variable_workers=variable_workers,
+        )
+        if merged is not None:
+            with merged as f:
+                return f.as_pandas_dataframe(
+                    expand=expand, variables=columns, vector_layout=vector_layout
+                )
+        dataframes = list(
+            _imap_ordered(
+                lambda data: data.as_dataframe(
+                    expand=expand,
+                    columns=columns,
+                    time_slice=time_slice,
+                    variable_workers=variable_workers,
+                    vector_layout=vector_layout,
+                ),
+                self.contents,
+                max_workers,
+            )
+        )
         if len(dataframes) == 0:
             return None
         if (len(dataframes) == 1) or all([df.empty for df in dataframes]):
             return dataframes[0]
         return pandas.concat([df for df in dataframes if not df.empty])
 
-    def as_xarray(self, reshape=False):
+    def as_xarray(
+        self,
+        reshape=False,
+        variables=None,
+        time_slice=None,
+        max_workers=None,
+        use_processes=False,
+        variable_workers=None,
+    ):
         """Convert the data to an xarray Dataset.
 
         Args:
             reshape (bool): Reshape to a convenient higher dimensional form
+            variables (list of str): Variables to be loaded (default all).
+                Only the selected variables are read from the files.
+            time_slice (slice or tuple): Time range (start, end) to be loaded.
+                Only the records within the range are read from the files
+                (start included, end excluded).
+            max_workers (int): Maximum number of files decoded concurrently
+                by a pool of threads (default 1). The results are assembled
+                in the original order. See the note on threads and processes
+                in :py:meth:`as_dataframe`.
+            use_processes (bool): Decode multiple CDF files by a pool of
+                max_workers processes instead of threads (not applied with
+                reshape).
+            variable_workers (int): Number of threads decoding the variables
+                of each CDF file concurrently (default 1). These threads give
+                no speed-up of the cdflib record parsing.
 
         Returns:
             xarray.Dataset
 
         """
+        _check_max_workers(max_workers)
+        _check_max_workers(variable_workers, "variable_workers")
+        merged = None
+        if not reshape:
+            merged = self._merge_cdf_files(
+                variables=variables,
+                time_slice=time_slice,
+                max_workers=max_workers,
+                use_processes=use_processes,
+                variable_workers=variable_workers,
+            )
+        if merged is not None:
+            with merged as f:
+                ds = f.as_xarray_dataset(variables=variables)
+        else:
+            ds = self._concat_xarray(
+                reshape, variables, time_slice, max_workers, variable_workers
+            )
+            if ds is None:
+                return None
+
+        # Set the original data sources and models used as metadata
+        # only for cdf data types
+        ds.attrs["Sources"] = self.sources
+        if self.filetype == "cdf":
+            ds.attrs["MagneticModels"] = self.magnetic_models
+            ds.attrs["AppliedFilters"] = self.data_filters
+        return ds
+
+    def _concat_xarray(
+        self,
+        reshape=False,
+        variables=None,
+        time_slice=None,
+        max_workers=None,
+        variable_workers=None,
+    ):
+        """Convert each file to an xarray Dataset and concatenate them."""
         # ds_list is a list of xarray.Dataset objects
         #  - they are created from each file in self.contents
         # Some of them may be empty because of the time window they cover
         #  and the filtering that has been applied.
         ds_list = []
-        for i, data in enumerate(self.contents):
-            ds_part = data.as_xarray(reshape=reshape)
+        ds_parts = _imap_ordered(
+            lambda data: data.as_xarray(
+                reshape=reshape,
+                variables=variables,
+                time_slice=time_slice,
+                variable_workers=variable_workers,
+            ),
+            self.contents,
+            max_workers,
+        )
+        for i, ds_part in enumerate(ds_parts):
             if ds_part is None:
                 print(
                     "Warning: ",
@@ -887,15 +1413,93 @@ class ReturnedData:
                         )
                     )
                 ds = xarray.merge(ds_list_per_dim)
-
-        # Set the original data sources and models used as metadata
-        # only for cdf data types
-        ds.attrs["Sources"] = self.sources
-        if self.filetype == "cdf":
-            ds.attrs["MagneticModels"] = self.magnetic_models
-            ds.attrs["AppliedFilters"] = self.data_filters
         return ds
 
+    def _merge_cdf_files(
+        self,
+        variables=None,
+        time_slice=None,
+        max_workers=None,
+        use_processes=False,
+        variable_workers=None,
+    ):
+        """Read multiple CDF files into arrays allocated once for all files.
+
+        The first pass gets the numbers of records from the file metadata,
+        the second pass decodes the files, optionally by a pool of threads
+        or processes, and writes them in order directly into their slices
+        of the output arrays, avoiding the copies made by the concatenation.
+
+        Returns the FileReader of the first file holding the merged data
+        or None if the files are not merged this way.
+        """
+        if self.filetype != "cdf" or len(self.contents) < 2:
+            return None
+
+        def _read_metadata(item):
+            with item._open_reader(time_slice) as f:
+                start, end = f.get_record_range()
+                selected = f._select_variables(variables)
+                record_varying = {
+                    var: f._get_attr_or_key(f._get_varinfo(var), "Rec_Vary")
+                    for var in selected
+                }
+                return end - start, selected, record_varying
+
+        metadata = list(_imap_ordered(_read_metadata, self.contents, max_workers))
+        counts = [count for count, _, _ in metadata]
+        _, selected, record_varying = metadata[0]
+        if any(item[1] != selected for item in metadata[1:]):
+            return None
+        total = sum(counts)
+        if total == 0:
+            return None
+        items = [
+            (
+                item._file.name,
+                {**item._file_options, "variable_workers": variable_workers},
+                item._restrict_time_slice(time_slice),
+            )
+            for item, count in zip(self.contents, counts)
+            if count > 0
+        ]
+        counts = [count for count in counts if count > 0]
+        merged = {}
+        offset = 0
+        decoded = _imap_ordered(
+            partial(_decode_cdf_file, variables=selected),
+            items,
+            max_workers,
+            use_processes,
+        )
+        for count, data in zip(counts, decoded):
+            for var in selected:
+                if not record_varying[var]:
+                    merged.setdefault(var, data[var])
+                    continue
+                if len(data[var]) != count:
+                    return None
+                merged[var] = self._write_records(
+                    merged.get(var), data[var], offset, total
+                )
+            offset += count
+        reader = self.contents[0]._open_reader(time_slice)
+        reader._data.update(merged)
+        return reader
+
+    @staticmethod
+    def _write_records(output, records, offset, size):
+        """Write records to the output array, allocated on the first write."""
+        if output is None:
+            output = numpy.empty((size, *records.shape[1:]), dtype=records.dtype)
+        else:
+            # e.g., longer strings or finer time resolution
+            dtype = numpy.result_type(output.dtype, records.dtype)
+            if dtype != output.dtype:
+                output = output.astype(dtype)
+        output[offset : offset + len(records)] = records
+        return output
+
     def as_xarray_dict(self):
         """Convert the data to a dict containing an xarray per group.
 
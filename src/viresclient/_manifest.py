@@ -0,0 +1,163 @@
+# -------------------------------------------------------------------------------
+#
+# Manifest of the resumable chunked requests
+#
+# Authors: Ashley Smith <ashley.smith@ed.ac.uk>
+#          Martin Paces <martin.paces@eox.at>
+#
+# -------------------------------------------------------------------------------
+# Copyright (C) 2026 EOX IT Services GmbH
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies of this Software or works derived from this Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+# -------------------------------------------------------------------------------
+
+import json
+import os
+import shutil
+from hashlib import sha256
+from threading import Lock
+
+MANIFEST_VERSION = 1
+
+
+def _hash(*items):
+    """Get hexadecimal SHA-256 digest of the given strings or bytes."""
+    digest = sha256()
+    for item in items:
+        if isinstance(item, str):
+            item = item.encode("UTF-8")
+        digest.update(sha256(item).digest())
+    return digest.hexdigest()
+
+
+class ChunkManifest:
+    """Persistent record of the completed chunks of a chunked request.
+
+    The request is identified by a fingerprint calculated from the server
+    URL, the output file type and the rendered requests of all chunks, i.e.,
+    any change of the request parameters or of the chunk intervals results
+    in a new fingerprint. The manifest and the downloaded chunk files are
+    kept in the ``<resume_dir>/<fingerprint>/`` directory::
+
+        manifest.json
+        chunk_0000.cdf
+        chunk_0001.cdf
+        ...
+
+    The chunk files and the manifest are written atomically, i.e.,
+    an interrupted request never leaves a partially written chunk behind.
+    """
+
+    FILENAME = "manifest.json"
+
+    def __init__(self, resume_dir, url, filetype, intervals, chunk_requests):
+        if len(intervals) != len(chunk_requests):
+            raise ValueError("Number of intervals and chunk requests differ!")
+        chunk_hashes = [_hash(request) for request in chunk_requests]
+        self.fingerprint = _hash(url, filetype, *chunk_hashes)
+        self.filetype = filetype
+        self.path = os.path.join(resume_dir, self.fingerprint)
+        self._lock = Lock()
+        self._manifest = {
+            "version": MANIFEST_VERSION,
+            "fingerprint": self.fingerprint,
+            "url": url,
+            "filetype": filetype,
+            "chunks": [
+                {
+                    "begin_time": begin_time.isoformat(),
+                    "end_time": end_time.isoformat(),
+                    "request": chunk_hash,
+                    "file": None,
+                }
+                for (begin_time, end_time), chunk_hash in zip(intervals, chunk_hashes)
+            ],
+        }
+        os.makedirs(self.path, exist_ok=True)
+        self._load()
+
+    def __len__(self):
+        return len(self._chunks)
+
+    @property
+    def _chunks(self):
+        return self._manifest["chunks"]
+
+    @property
+    def completed(self):
+        """Indices of the completed chunks."""
+        return [index for index in range(len(self)) if self.is_completed(index)]
+
+    def is_completed(self, index):
+        """Return True if the chunk has been already downloaded."""
+        filename = self._chunks[index]["file"]
+        return filename is not None and os.path.isfile(
+            os.path.join(self.path, filename)
+        )
+
+    def restore(self, index, retdatafile):
+        """Copy the completed chunk to the ReturnedDataFile object.
+        Returns the size of the chunk file in bytes.
+        """
+        source = os.path.join(self.path, self._chunks[index]["file"])
+        with open(source, "rb") as file_in:
+            with open(retdatafile._file.name, "wb") as file_out:
+                shutil.copyfileobj(file_in, file_out)
+        return os.path.getsize(source)
+
+    def store(self, index, retdatafile):
+        """Save the downloaded chunk from the ReturnedDataFile object
+        and mark it as completed.
+        """
+        filename = f"chunk_{index:04d}.{self.filetype}"
+        target = os.path.join(self.path, filename)
+        tmp_target = f"{target}.part"
+        retdatafile._write_file(tmp_target)
+        os.replace(tmp_target, target)
+        with self._lock:
+            self._chunks[index]["file"] = filename
+            self._save()
+
+    def _load(self):
+        """Load the completed chunks from an existing manifest."""
+        try:
+            with open(os.path.join(self.path, self.FILENAME), encoding="UTF-8") as file:
+                manifest = json.load(file)
+        except FileNotFoundError:
+            return
+        except ValueError:
+            # corrupted manifest - start from scratch
+            return
+        if (
+            manifest.get("version") != MANIFEST_VERSION
+            or manifest.get("fingerprint") != self.fingerprint
+            or len(manifest.get("chunks", ())) != len(self)
+        ):
+            return
+        for chunk, stored_chunk in zip(self._chunks, manifest["chunks"]):
+            if chunk["request"] == stored_chunk.get("request"):
+                chunk["file"] = stored_chunk.get("file")
+
+    def _save(self):
+        """Write the manifest file."""
+        path = os.path.join(self.path, self.FILENAME)
+        tmp_path = f"{path}.part"
+        with open(tmp_path, "w", encoding="UTF-8") as file:
+            json.dump(self._manifest, file, indent=2)
+        os.replace(tmp_path, path)
@@ -0,0 +1,148 @@
+# -------------------------------------------------------------------------------
+#
+# Local index of the orbit numbers
+#
+# Authors: Ashley Smith <ashley.smith@ed.ac.uk>
+#          Martin Paces <martin.paces@eox.at>
+#
+# -------------------------------------------------------------------------------
+# Copyright (C) 2026 EOX IT Services GmbH
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies of this Software or works derived from this Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+# -------------------------------------------------------------------------------
+
+import os
+
+import numpy as np
+
+DEFAULT_ORBIT_INDEX_DIR = os.path.join(
+    os.path.expanduser("~"), ".cache", "viresclient", "orbits"
+)
+
+
+class OrbitIndex:
+    """Local table of the orbit start times of one spacecraft.
+
+    The table holds the orbit numbers and the times of the first record
+    of each orbit (ascending node crossing) and it is complete up to
+    ``end_time``. The lookups are vectorized binary searches.
+
+    Args:
+        orbit_numbers (array): increasing orbit numbers
+        start_times (array): start times of the orbits
+        end_time (datetime64): end of the time extent covered by the table
+        updated (datetime64): time of the last update of the table
+    """
+
+    UNKNOWN_ORBIT = -1
+
+    def __init__(self, orbit_numbers=(), start_times=(), end_time=None, updated=None):
+        self.orbit_numbers = np.asarray(orbit_numbers, dtype="int64")
+        self.start_times = np.asarray(start_times, dtype="datetime64[ns]")
+        self.end_time = np.datetime64(end_time, "ns")
+        self.updated = np.datetime64(updated, "ns")
+
+    def __len__(self):
+        return self.orbit_numbers.size
+
+    @classmethod
+    def load(cls, path):
+        """Load the table saved by :py:meth:`save`."""
+        with np.load(path) as data:
+            return cls(
+                data["orbit_numbers"],
+                data["start_times"],
+                data["end_time"][()],
+                data["updated"][()],
+            )
+
+    def save(self, path):
+        """Save the table to a file."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.part.npz"
+        np.savez(
+            tmp_path,
+            orbit_numbers=self.orbit_numbers,
+            start_times=self.start_times,
+            end_time=self.end_time,
+            updated=self.updated,
+        )
+        os.replace(tmp_path, path)
+
+    def extend(self, times, orbit_numbers, end_time, updated=None):
+        """Extend the table by the orbit numbers sampled at the given times.
+        The samples should include the first records of the orbits.
+        """
+        times = np.concatenate(
+            [self.start_times, np.asarray(times, dtype="datetime64[ns]")]
+        )
+        orbit_numbers = np.concatenate(
+            [self.orbit_numbers, np.asarray(orbit_numbers, dtype="int64")]
+        )
+        order = np.argsort(times, kind="stable")
+        times, orbit_numbers = times[order], orbit_numbers[order]
+        # keep the first sample of each orbit
+        is_first = np.ones(orbit_numbers.shape, dtype="bool")
+        is_first[1:] = orbit_numbers[1:] != orbit_numbers[:-1]
+        self.start_times = times[is_first]
+        self.orbit_numbers = orbit_numbers[is_first]
+        end_time = np.datetime64(end_time, "ns")
+        if np.isnat(self.end_time) or end_time > self.end_time:
+            self.end_time = end_time
+        if updated is not None:
+            self.updated = np.datetime64(updated, "ns")
+
+    def get_orbit_numbers(self, times):
+        """Get orbit numbers at the given times. The times outside
+        the table extent are marked by the UNKNOWN_ORBIT (-1) value.
+        """
+        times = np.asarray(times, dtype="datetime64[ns]")
+        if not len(self):
+            return np.full(times.shape, self.UNKNOWN_ORBIT, dtype="int64")
+        index = np.searchsorted(self.start_times, times, side="right") - 1
+        orbit_numbers = self.orbit_numbers[np.maximum(index, 0)]
+        is_unknown = (index < 0) | ~(times <= self.end_time)
+        orbit_numbers[is_unknown] = self.UNKNOWN_ORBIT
+        return orbit_numbers
+
+    def get_orbit_start_times(self, orbit_numbers):
+        """Get start times of the given orbits. The start times of the orbits
+        not in the table are NaT.
+        """
+        orbit_numbers = np.asarray(orbit_numbers, dtype="int64")
+        if not len(self):
+            return np.full(orbit_numbers.shape, np.datetime64("NaT", "ns"))
+        index = np.searchsorted(self.orbit_numbers, orbit_numbers)
+        index = np.minimum(index, len(self) - 1)
+        return np.where(
+            self.orbit_numbers[index] == orbit_numbers,
+            self.start_times[index],
+            np.datetime64("NaT", "ns"),
+        )
+
+    def get_times_for_orbits(self, start_orbits, end_orbits):
+        """Get the start times of the start orbits and the end times of
+        the end orbits. The times of the orbits not in the table are NaT.
+        """
+        end_orbits = np.asarray(end_orbits, dtype="int64")
+        return (
+            self.get_orbit_start_times(start_orbits),
+            # an orbit ends when the next one starts
+            self.get_orbit_start_times(end_orbits + 1),
+        )
@@ -0,0 +1,250 @@
+# -------------------------------------------------------------------------------
+#
+# Local evaluation of the spherical harmonic models in the SHC format
+#
+# Authors: Ashley Smith <ashley.smith@ed.ac.uk>
+#          Martin Paces <martin.paces@eox.at>
+#
+# -------------------------------------------------------------------------------
+# Copyright (C) 2026 EOX IT Services GmbH
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies of this Software or works derived from this Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+# -------------------------------------------------------------------------------
+
+import os
+
+import numpy as np
+
+# reference radius of the geomagnetic models (m)
+EARTH_RADIUS = 6371200.0
+
+
+def _to_decimal_year(times):
+    """Convert datetime64 array to decimal years."""
+    times = np.asarray(times, dtype="datetime64[ns]")
+    years = times.astype("datetime64[Y]")
+    year_start = years.astype("datetime64[ns]")
+    year_length = (years + 1).astype("datetime64[ns]") - year_start
+    return years.astype("int64") + 1970 + (times - year_start) / year_length
+
+
+class SHCModel:
+    """Spherical harmonic model of the magnetic field loaded from the SHC
+    format.
+
+    The SHC format holds the Gauss coefficients sampled at the given times
+    (decimal years). The model is a piecewise polynomial in time: each piece
+    spans ``nstep`` sampling intervals and it is the polynomial passing
+    through the ``nstep + 1`` samples of the piece (piecewise linear
+    interpolation for ``nstep=1``). Spline order 1 means piecewise constant
+    coefficients.
+
+    Example usage::
+
+        from viresclient import SHCModel
+
+        model = SHCModel.from_file("model.shc")
+        b_nec = model.eval(time, latitude, longitude, radius)
+
+    Args:
+        times (array): decimal years of the coefficient samples
+        degrees (array): degrees of the coefficients
+        orders (array): orders of the coefficients (negative for h
+            coefficients)
+        coefficients (array): coefficients (nT), shape (ncoeff, ntimes)
+        spline_order (int): order of the time interpolation
+        nstep (int): number of sampling intervals per piece
+    """
+
+    def __init__(self, times, degrees, orders, coefficients, spline_order=2, nstep=1):
+        self.times = np.asarray(times, dtype="float64")
+        self.degrees = np.asarray(degrees, dtype="int64")
+        self.orders = np.asarray(orders, dtype="int64")
+        self.coefficients = np.asarray(coefficients, dtype="float64").reshape(
+            self.degrees.size, self.times.size
+        )
+        self.spline_order = spline_order
+        self.nstep = max(nstep, 1)
+        self.max_degree = int(self.degrees.max())
+
+    @classmethod
+    def from_file(cls, path):
+        """Load model from an SHC file."""
+        with open(os.path.expanduser(path)) as file:
+            return cls.from_string(file.read())
+
+    @classmethod
+    def from_string(cls, text):
+        """Load model from the content of an SHC file."""
+        lines = (line.strip() for line in text.splitlines())
+        lines = [line for line in lines if line and not line.startswith("#")]
+        try:
+            header = lines[0].split()
+            ntimes, spline_order, nstep = (int(value) for value in header[2:5])
+            times = [float(value) for value in lines[1].split()]
+            records = np.array(
+                [[float(value) for value in line.split()] for line in lines[2:]]
+            ).reshape(-1, 2 + ntimes)
+        except (IndexError, ValueError) as error:
+            raise ValueError(f"Invalid SHC model! {error}") from None
+        if len(times) != ntimes:
+            raise ValueError("Invalid SHC model! Wrong number of times.")
+        return cls(
+            times,
+            records[:, 0].astype("int64"),
+            records[:, 1].astype("int64"),
+            records[:, 2:],
+            spline_order=spline_order,
+            nstep=nstep,
+        )
+
+    @property
+    def validity(self):
+        """Validity interval of the model in decimal years."""
+        if self.times.size == 1:
+            return -np.inf, np.inf
+        return self.times[0], self.times[-1]
+
+    def get_coefficients(self, times):
+        """Get coefficients interpolated at the given decimal years.
+        Returns array of shape (ncoeff, ntimes), NaN outside the validity
+        interval.
+        """
+        times = np.asarray(times, dtype="float64")
+        if self.times.size == 1:
+            return np.repeat(self.coefficients, times.size, axis=1)
+
+        nodes = self.times
+        result = np.full((self.degrees.size, times.size), np.nan)
+        is_valid = (times >= nodes[0]) & (times <= nodes[-1])
+        if self.spline_order == 1:
+            index = np.searchsorted(nodes, times[is_valid], side="right") - 1
+            index = np.minimum(index, nodes.size - 1)
+            result[:, is_valid] = self.coefficients[:, index]
+            return result
+
+        # piecewise polynomial - Lagrange interpolation within each piece
+        piece_starts = np.arange(0, nodes.size - 1, self.nstep)
+        piece = np.searchsorted(nodes[piece_starts], times, side="right") - 1
+        piece = np.clip(piece, 0, piece_starts.size - 1)
+        for ipiece, start in enumerate(piece_starts):
+            selection = is_valid & (piece == ipiece)
+            if not selection.any():
+                continue
+            piece_nodes = nodes[start : start + self.nstep + 1]
+            piece_coefficients = self.coefficients[:, start : start + self.nstep + 1]
+            values = 0.0
+            for i, node in enumerate(piece_nodes):
+                weight = np.ones(selection.sum())
+                for j, other_node in enumerate(piece_nodes):
+                    if i != j:
+                        weight *= (times[selection] - other_node) / (node - other_node)
+                values = values + piece_coefficients[:, i : i + 1] * weight
+            result[:, selection] = values
+        return result
+
+    def eval(self, time, latitude, longitude, radius):
+        """Evaluate the magnetic field at the given times and locations.
+
+        Args:
+            time (datetime64): array of times
+            latitude (float64): array of geocentric latitudes (deg)
+            longitude (float64): array of geocentric longitudes (deg)
+            radius (float64): array of radii (m)
+
+        Returns:
+            numpy.ndarray: B_NEC (nT), array of shape (n, 3)
+        """
+        time, latitude, longitude, radius = np.broadcast_arrays(
+            np.asarray(time, dtype="datetime64[ns]"),
+            np.asarray(latitude, dtype="float64"),
+            np.asarray(longitude, dtype="float64"),
+            np.asarray(radius, dtype="float64"),
+        )
+        shape = time.shape
+        coefficients = self.get_coefficients(_to_decimal_year(time.ravel()))
+        theta = np.deg2rad(90.0 - latitude.ravel())
+        phi = np.deg2rad(longitude.ravel())
+        cos_theta = np.cos(theta)
+        # avoid division by zero at the poles
+        sin_theta = np.maximum(np.sin(theta), 1e-12)
+        relative_radius = EARTH_RADIUS / radius.ravel()
+
+        index = {
+            (degree, order): i
+            for i, (degree, order) in enumerate(zip(self.degrees, self.orders))
+        }
+        b_r = np.zeros(cos_theta.shape)
+        b_theta = np.zeros(cos_theta.shape)
+        b_phi = np.zeros(cos_theta.shape)
+        for degree, order, p, dp in _legendre_functions(
+            self.max_degree, cos_theta, sin_theta
+        ):
+            i_g = index.get((degree, order))
+            i_h = index.get((degree, -order)) if order > 0 else None
+            if degree == 0 or (i_g is None and i_h is None):
+                continue
+            g = coefficients[i_g] if i_g is not None else 0.0
+            h = coefficients[i_h] if i_h is not None else 0.0
+            cos_mphi = np.cos(order * phi)
+            sin_mphi = np.sin(order * phi)
+            scale = relative_radius ** (degree + 2)
+            gh_cos = g * cos_mphi + h * sin_mphi
+            gh_sin = g * sin_mphi - h * cos_mphi
+            b_r += (degree + 1) * scale * gh_cos * p
+            b_theta -= scale * gh_cos * dp
+            b_phi += scale * order * gh_sin * p / sin_theta
+
+        return np.stack((-b_theta, b_phi, -b_r), axis=-1).reshape(*shape, 3)
+
+
+def _legendre_functions(max_degree, cos_theta, sin_theta):
+    """Generate the Schmidt semi-normalised associated Legendre functions
+    P_n^m(cos(theta)) and their derivatives with respect to theta.
+    Yields (degree, order, P_n^m, dP_n^m/dtheta) tuples, order by order,
+    keeping only the few arrays needed by the recursion in memory.
+    """
+    p_mm = np.ones(cos_theta.shape)
+    dp_mm = np.zeros(cos_theta.shape)
+    for order in range(max_degree + 1):
+        if order > 0:
+            # sectoral terms
+            factor = 1.0 if order == 1 else np.sqrt((2 * order - 1) / (2 * order))
+            p_mm, dp_mm = (
+                factor * sin_theta * p_mm,
+                factor * (sin_theta * dp_mm + cos_theta * p_mm),
+            )
+        yield order, order, p_mm, dp_mm
+        p_1, dp_1 = p_mm, dp_mm
+        p_2 = dp_2 = 0.0
+        for degree in range(order + 1, max_degree + 1):
+            # recursion in degree
+            root = np.sqrt(degree**2 - order**2)
+            root_2 = np.sqrt((degree - 1) ** 2 - order**2)
+            p_1, p_2, dp_1, dp_2 = (
+                ((2 * degree - 1) * cos_theta * p_1 - root_2 * p_2) / root,
+                p_1,
+                (
+                    (2 * degree - 1) * (cos_theta * dp_1 - sin_theta * p_1)
+                    - root_2 * dp_2
+                )
+                / root,
+                dp_1,
+            )
+            yield degree, order, p_1, dp_1
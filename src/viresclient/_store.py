@@ -0,0 +1,346 @@
+# -------------------------------------------------------------------------------
+#
+# Local time-partitioned data store
+#
+# Authors: Ashley Smith <ashley.smith@ed.ac.uk>
+#          Martin Paces <martin.paces@eox.at>
+#
+# -------------------------------------------------------------------------------
+# Copyright (C) 2026 EOX IT Services GmbH
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies of this Software or works derived from this Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+# -------------------------------------------------------------------------------
+
+import json
+import os
+import re
+import shutil
+from datetime import datetime, timedelta, timezone
+from tempfile import NamedTemporaryFile
+from urllib.parse import urlparse
+
+from ._wps.time_util import to_utc_naive
+
+DEFAULT_STORE_DIR = os.path.join(
+    os.path.expanduser("~"), ".cache", "viresclient", "store"
+)
+
+ONE_DAY = timedelta(days=1)
+
+
+def _to_path_component(value):
+    """Convert string to a safe file-name."""
+    return re.sub(r"[^\w.+-]", "_", value)
+
+
+def _floor_day(value):
+    """Get start of the day containing the given time."""
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _ceil_day(value):
+    """Get start of the first day starting at or after the given time."""
+    day = _floor_day(value)
+    return day if day == value else day + ONE_DAY
+
+
+class StorePartition:
+    """Data of a chunk interval held by the local data store.
+
+    The partition either refers to stored data (``stored=True``), optionally
+    restricted to the time_slice of a longer stored file, or to a file to be
+    stored together with the index of the whole days it covers.
+
+    Args:
+        base_path (str): directory of the stored request
+        name (str): file name of the stored data
+        stored (bool): True if the data are already stored
+        time_slice (tuple): (start, end) of the records of the stored file
+            covered by the chunk (None for the whole file)
+        days (dict): segments of the whole days covered by the file to be
+            stored, {day: [(file name, start, end), ...]}
+    """
+
+    def __init__(self, base_path, name, stored=False, time_slice=None, days=None):
+        self.base_path = base_path
+        self.name = name
+        self.stored = stored
+        self.time_slice = time_slice
+        self.days = days or {}
+
+    @property
+    def path(self):
+        return os.path.join(self.base_path, "files", self.name)
+
+
+class DataStore:
+    """Local store of the downloaded data indexed by days.
+
+    With the store enabled, the requests are planned from the days kept in
+    the store. Only the periods of the days missing in the store are
+    requested from the server. The contiguous missing days are merged
+    into chunks of as many whole days as fit in one server request (e.g.,
+    50 days of 1 Hz data), the days longer than that (e.g., 50 Hz data) are
+    split in parts.
+
+    The downloaded files are kept in the
+    ``<path>/<server>/<collections>/<fingerprint>/files/`` directory, where
+    the fingerprint identifies the requested variables, models, filters,
+    sampling step and file type. Each whole day they cover is indexed
+    in the ``days/<YYYY-MM-DD>.json`` file of the same directory. A day
+    requested again, e.g., by an overlapping or a shifted request, is read
+    from the part of the stored file holding it.
+
+    The days not yet finished, the partial days at the start and end of the
+    requested interval, and the chunks without any data (e.g., products not
+    yet available) are not stored.
+
+    Note:
+        The data read from a part of a stored CDF file cannot be saved
+        by ``to_file()``. Convert them by ``as_xarray()`` or
+        ``as_dataframe()`` instead.
+
+    Example usage::
+
+        from viresclient import DataStore, SwarmRequest
+
+        request = SwarmRequest(store=DataStore("~/vires_data"))
+
+    Args:
+        path (str): store directory (defaults to ~/.cache/viresclient/store)
+    """
+
+    def __init__(self, path=None):
+        self.path = os.path.expanduser(path or DEFAULT_STORE_DIR)
+        os.makedirs(self.path, exist_ok=True)
+
+    def __str__(self):
+        return f"viresclient DataStore at {self.path}"
+
+    def _get_base_path(self, url, collections, fingerprint):
+        return os.path.join(
+            self.path,
+            _to_path_component(urlparse(url).netloc or url),
+            _to_path_component("+".join(collections)),
+            fingerprint,
+        )
+
+    def lookup(self, url, collections, fingerprint, start_time, end_time):
+        """Get the (start, end) intervals of the stored whole days within
+        the requested interval. The consecutive days held by the same stored
+        file are merged into one interval.
+        """
+        base_path = self._get_base_path(url, collections, fingerprint)
+        return [
+            (_like(start, start_time), _like(end, start_time))
+            for start, end, _, _, _ in self._lookup(
+                base_path, to_utc_naive(start_time), to_utc_naive(end_time)
+            )
+        ]
+
+    def get_partitions(
+        self, url, collections, fingerprint, filetype, start_time, end_time, intervals
+    ):
+        """Get the store partition of each chunk interval or None if the chunk
+        is neither stored nor to be stored, i.e., it covers no whole day
+        within the requested interval.
+        """
+        base_path = self._get_base_path(url, collections, fingerprint)
+        start_time, end_time = to_utc_naive(start_time), to_utc_naive(end_time)
+        intervals = [
+            (to_utc_naive(start), to_utc_naive(end)) for start, end in intervals
+        ]
+        stored = {
+            (start, end): (name, file_start, file_end)
+            for start, end, name, file_start, file_end in self._lookup(
+                base_path, start_time, end_time
+            )
+        }
+        whole_days = set(self._get_whole_days(start_time, end_time))
+
+        def _get_partition(start, end):
+            if (start, end) in stored:
+                name, file_start, file_end = stored[(start, end)]
+                return StorePartition(
+                    base_path,
+                    name,
+                    stored=True,
+                    time_slice=(
+                        None if (start, end) == (file_start, file_end) else (start, end)
+                    ),
+                )
+            name = self._get_file_name(start, end, filetype)
+            days = {}
+            day = _ceil_day(start)
+            while day + ONE_DAY <= end:
+                if day in whole_days:
+                    days[day] = [(name, start, end)]
+                day += ONE_DAY
+            day = _floor_day(start)
+            if not days and end <= day + ONE_DAY and day in whole_days:
+                # part of a day split into several chunks
+                parts = [
+                    (
+                        self._get_file_name(part_start, part_end, filetype),
+                        part_start,
+                        part_end,
+                    )
+                    for part_start, part_end in intervals
+                    if day <= part_start and part_end <= day + ONE_DAY
+                ]
+                if self._is_tiling(day, parts):
+                    days[day] = parts
+            return StorePartition(base_path, name, days=days) if days else None
+
+        return [_get_partition(start, end) for start, end in intervals]
+
+    def _lookup(self, base_path, start_time, end_time):
+        """Get the stored intervals as a list of
+        (start, end, file name, file start, file end) tuples.
+        """
+        pieces = []
+        for day in self._get_whole_days(start_time, end_time):
+            segments = self._read_day(base_path, day)
+            if not segments:
+                continue
+            if len(segments) == 1:
+                name, file_start, file_end = segments[0]
+                if file_start > day or file_end < day + ONE_DAY:
+                    continue
+                if pieces and pieces[-1][1] == day and pieces[-1][2] == name:
+                    pieces[-1][1] = day + ONE_DAY
+                else:
+                    pieces.append([day, day + ONE_DAY, name, file_start, file_end])
+            elif self._is_tiling(day, segments):
+                pieces.extend(
+                    [file_start, file_end, name, file_start, file_end]
+                    for name, file_start, file_end in segments
+                )
+        return pieces
+
+    @staticmethod
+    def _is_tiling(day, segments):
+        """Check that the segments cover the day without gaps."""
+        last_end = day
+        for _, start, end in segments:
+            if start != last_end:
+                return False
+            last_end = end
+        return last_end == day + ONE_DAY
+
+    @staticmethod
+    def _get_whole_days(start_time, end_time):
+        """Get the finished whole days within the interval."""
+        now = to_utc_naive(datetime.now(timezone.utc))
+        day = _ceil_day(start_time)
+        while day + ONE_DAY <= min(end_time, now):
+            yield day
+            day += ONE_DAY
+
+    @staticmethod
+    def _get_file_name(start, end, filetype):
+        return f"{start:%Y%m%dT%H%M%S%f}_{end:%Y%m%dT%H%M%S%f}.{filetype}"
+
+    @staticmethod
+    def _get_day_path(base_path, day):
+        return os.path.join(base_path, "days", f"{day:%Y-%m-%d}.json")
+
+    def _read_day(self, base_path, day):
+        """Read the index of the stored day (None if not stored)."""
+        try:
+            with open(self._get_day_path(base_path, day)) as file:
+                segments = json.load(file)["segments"]
+        except (FileNotFoundError, ValueError, KeyError):
+            return None
+        return [
+            (name, datetime.fromisoformat(start), datetime.fromisoformat(end))
+            for name, start, end in segments
+        ]
+
+    @staticmethod
+    def restore(partition, retdatafile):
+        """Copy the stored partition file to the ReturnedDataFile object.
+        Returns the size of the file in bytes or None if not stored.
+        """
+        try:
+            with open(partition.path, "rb") as file_in:
+                with open(retdatafile._file.name, "wb") as file_out:
+                    shutil.copyfileobj(file_in, file_out)
+                    size = file_out.tell()
+        except FileNotFoundError:
+            return None
+        retdatafile._time_slice = partition.time_slice
+        return size
+
+    def store(self, partition, retdatafile):
+        """Save the downloaded ReturnedDataFile as a partition file and index
+        the whole days it covers.
+        """
+        if partition.stored:
+            return
+        _write_atomically(partition.path, retdatafile._write_file)
+        for day, segments in partition.days.items():
+            if not all(
+                os.path.exists(os.path.join(partition.base_path, "files", name))
+                for name, _, _ in segments
+            ):
+                # the other parts of the day are not yet stored
+                continue
+            index = {
+                "segments": [
+                    [name, start.isoformat(), end.isoformat()]
+                    for name, start, end in segments
+                ]
+            }
+            _write_atomically(
+                self._get_day_path(partition.base_path, day),
+                lambda tmp_path: _write_json(tmp_path, index),
+            )
+
+    def clear(self):
+        """Remove all stored data."""
+        shutil.rmtree(self.path, ignore_errors=True)
+        os.makedirs(self.path, exist_ok=True)
+
+
+def _like(value, reference):
+    """Convert the naive UTC time to the time-zone of the reference."""
+    if reference.tzinfo is None:
+        return value
+    return value.replace(tzinfo=timezone.utc).astimezone(reference.tzinfo)
+
+
+def _write_json(path, data):
+    with open(path, "w") as file:
+        json.dump(data, file)
+
+
+def _write_atomically(path, write):
+    """Write file by the given function through a temporary file."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with NamedTemporaryFile(
+        dir=os.path.dirname(path), suffix=".part", delete=False
+    ) as file:
+        tmp_path = file.name
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
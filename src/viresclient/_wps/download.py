@@ -0,0 +1,398 @@
+# -------------------------------------------------------------------------------
+#
+# Resumable and parallel download of the HTTP responses
+#
+# Authors: Martin Paces <martin.paces@eox.at>
+#          Ashley Smith <ashley.smith@ed.ac.uk>
+#
+# -------------------------------------------------------------------------------
+# Copyright (C) 2026 EOX IT Services GmbH
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies of this Software or works derived from this Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+# -------------------------------------------------------------------------------
+
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from tempfile import TemporaryFile
+from threading import Condition
+from time import sleep
+from urllib.error import URLError
+from urllib.request import Request
+
+from .http_util import open_request
+
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024  # size of the reads of the parallel download
+MIN_PART_SIZE = 8 * 1024 * 1024  # minimum size of a parallel download part
+
+
+def parse_content_range(content_range):
+    """Parse the Content-Range header value. Returns (start, end, total)
+    tuple of the byte positions. The total is None if not known.
+    Raises ValueError for an invalid header value.
+    """
+    unit, _, range_ = (content_range or "").partition(" ")
+    range_, _, total = range_.partition("/")
+    start, _, end = range_.partition("-")
+    if unit != "bytes":
+        raise ValueError(f"Invalid content range {content_range!r}!")
+    return int(start), int(end), (None if total == "*" else int(total))
+
+
+class ResumableResponse:
+    """File-like object reading the response of an HTTP GET request.
+
+    When the connection fails or the response is shorter than announced
+    by its Content-Length, the download is resumed by a Range request
+    starting at the first byte not yet read. The resumption attempts
+    follow the retry policy of the service proxy. If the server ignores
+    the Range request, URLError is raised and the whole download must be
+    repeated.
+
+    Optionally, only the given inclusive (start, end) byte range of the
+    resource is downloaded.
+    """
+
+    def __init__(self, service, request, byte_range=None, validator=None):
+        self._service = service
+        self._request = request
+        self._byte_range = byte_range
+        self._retry_policy = service.retry_policy.start()
+        self._offset = 0
+        self._context = None
+        self._total = None
+        # validator ensuring the resumed download is of the same content
+        self._validator = validator
+        try:
+            if byte_range is None:
+                self._response = self._open(request)
+            else:
+                self._response = self._open(self._get_range_request())
+                self._total = self._check_range_response(self._response)
+        except Exception:
+            self.close()
+            raise
+        headers = self._response.info()
+        length = headers.get("Content-Length")
+        self._length = int(length) if length is not None else None
+        if byte_range is None:
+            self._total = self._length
+        self._headers = headers
+        if not self._validator:
+            self._validator = headers.get("ETag") or headers.get("Last-Modified")
+
+    @classmethod
+    def opener(cls, service, **options):
+        """Get context manager opening a resumable response."""
+
+        @contextmanager
+        def _open_resumable(request):
+            response = cls(service, request, **options)
+            try:
+                yield response
+            finally:
+                response.close()
+
+        return _open_resumable
+
+    @property
+    def status(self):
+        return 200 if self._byte_range is None else 206
+
+    @property
+    def url(self):
+        return self._request.get_full_url()
+
+    def info(self):
+        return self._headers
+
+    def read(self, size=-1):
+        while True:
+            try:
+                data = self._response.read(size)
+            except URLError as error:
+                self._resume(error)
+                continue
+            if not data and self._length is not None and self._offset < self._length:
+                self._resume(
+                    URLError(
+                        f"Incomplete response! {self._offset} bytes out of "
+                        f"{self._length} received."
+                    )
+                )
+                continue
+            self._offset += len(data)
+            return data
+
+    def close(self):
+        if self._context is not None:
+            context, self._context = self._context, None
+            context.__exit__(None, None, None)
+
+    def _open(self, request):
+        context = open_request(self._service.session, request)
+        response = context.__enter__()
+        self._context = context
+        return response
+
+    def _get_range_request(self):
+        """Get Range request of the bytes not yet read."""
+        start, end = self._byte_range or (0, None)
+        headers = {
+            **dict(self._request.header_items()),
+            "Range": f"bytes={start + self._offset}-{'' if end is None else end}",
+        }
+        if self._validator:
+            headers["If-Range"] = self._validator
+        return Request(self.url, None, headers)
+
+    def _resume(self, error):
+        """Resume the interrupted download."""
+        self.close()
+        logger = self._service.logger
+        request = self._get_range_request()
+
+        while True:
+            delay = self._retry_policy.next_delay(error)
+            if delay is None:
+                logger.error(
+                    "Download of %s failed. No more retries. %s: %s",
+                    self.url,
+                    error.__class__.__name__,
+                    error,
+                )
+                raise error
+            logger.error(
+                "Download of %s interrupted after %d bytes. "
+                "Resuming in %.1f seconds. %s: %s",
+                self.url,
+                self._offset,
+                delay,
+                error.__class__.__name__,
+                error,
+            )
+            sleep(delay)
+            try:
+                response = self._open(request)
+            except URLError as open_error:
+                error = open_error
+                continue
+            break
+
+        self._check_range_response(response)
+        self._response = response
+
+    def _check_range_response(self, response):
+        """Check that the response matches the requested byte range.
+        Returns the total size of the resource if known.
+        """
+        if response.status != 206:
+            raise URLError("Range request failed! Range request ignored.")
+        try:
+            start, _, total = parse_content_range(response.info().get("Content-Range"))
+        except ValueError:
+            raise URLError("Range request failed! Invalid content range.") from None
+        start_expected = (self._byte_range or (0, None))[0] + self._offset
+        if start != start_expected or (
+            None not in (self._total, total) and total != self._total
+        ):
+            raise URLError("Range request failed! Content range mismatch.")
+        return total
+
+
+class ParallelResponse:
+    """File-like object reading the response of an HTTP GET request
+    downloaded by multiple concurrent connections.
+
+    The resource is split in contiguous byte ranges downloaded in parallel
+    by resumable Range requests into a preallocated file. If a target
+    file path is given, the parts are written directly into this file
+    at their offsets, otherwise an anonymous temporary file is used.
+    The bytes are read in order, as soon as they are downloaded.
+    The first failed part download terminates the whole download.
+    """
+
+    def __init__(
+        self, service, request, size, nparts, headers, validator=None, target=None
+    ):
+        self._service = service
+        self._request = request
+        self._size = size
+        self._headers = headers
+        self._validator = validator
+        self._offset = 0
+        self._error = None
+        self._closed = False
+        self._condition = Condition()
+        self.target = target
+        self._file = TemporaryFile() if target is None else open(target, "w+b")
+        self._file.truncate(size)
+        bounds = [size * index // nparts for index in range(nparts + 1)]
+        self._starts = bounds[:-1]
+        # positions of the first bytes not yet downloaded
+        self._positions = list(self._starts)
+        self._executor = ThreadPoolExecutor(nparts)
+        for index, end in enumerate(bounds[1:]):
+            self._executor.submit(self._download_part, index, end)
+
+    @classmethod
+    def opener(cls, service, connections, target=None):
+        """Get context manager opening a parallel response. The resource
+        is downloaded by a single connection if its size is unknown,
+        the server does not support Range requests or the resource is
+        too small to be split.
+        """
+
+        @contextmanager
+        def _open_parallel(request):
+            size, headers, validator = cls._probe(service, request)
+            nparts = min(connections, (size or 0) // MIN_PART_SIZE)
+            if nparts < 2:
+                with ResumableResponse.opener(service)(request) as response:
+                    yield response
+                return
+            service.logger.debug(
+                "Downloading %s by %d parallel connections.",
+                request.get_full_url(),
+                nparts,
+            )
+            response = cls(service, request, size, nparts, headers, validator, target)
+            try:
+                yield response
+            finally:
+                response.close()
+
+        return _open_parallel
+
+    @staticmethod
+    def _probe(service, request):
+        """Probe the resource by a single byte Range request.
+        Returns the total size, response headers and validator of the
+        resource, or (None, None, None) if the Range request is not supported.
+        """
+        probe = Request(
+            request.get_full_url(),
+            None,
+            {**dict(request.header_items()), "Range": "bytes=0-0"},
+        )
+        with open_request(service.session, probe) as response:
+            if response.status != 206:
+                return None, None, None
+            headers = response.info().copy()
+        try:
+            _, _, size = parse_content_range(headers.pop("Content-Range", None))
+        except ValueError:
+            return None, None, None
+        headers["Content-Length"] = str(size)
+        validator = headers.get("ETag") or headers.get("Last-Modified")
+        return size, headers, validator
+
+    @property
+    def status(self):
+        return 200
+
+    @property
+    def url(self):
+        return self._request.get_full_url()
+
+    def info(self):
+        return self._headers
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            return b"".join(iter(lambda: self.read(DOWNLOAD_CHUNK_SIZE), b""))
+        with self._condition:
+            while True:
+                if size == 0 or self._offset >= self._size:
+                    return b""
+                available = self._get_available_size()
+                if available > 0:
+                    break
+                if self._error is not None:
+                    raise self._error
+                self._condition.wait()
+            self._file.seek(self._offset)
+            data = self._file.read(min(size, available))
+            self._offset += len(data)
+        return data
+
+    def wait(self, callback=None):
+        """Wait until the whole resource is downloaded (into the target file).
+        The optional callback receives the number of the downloaded bytes.
+        """
+        downloaded = None
+        while True:
+            with self._condition:
+                while self._get_downloaded_size() == downloaded:
+                    if self._error is not None:
+                        raise self._error
+                    self._condition.wait()
+                downloaded = self._get_downloaded_size()
+            if callback:
+                callback(downloaded)
+            if downloaded >= self._size:
+                self._file.flush()
+                return
+
+    def close(self):
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+        # stop the part downloads and wait for the workers to finish
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._file.close()
+
+    def _get_downloaded_size(self):
+        """Get total number of the downloaded bytes."""
+        return sum(
+            position - start for position, start in zip(self._positions, self._starts)
+        )
+
+    def _get_available_size(self):
+        """Get number of the downloaded bytes following the current offset."""
+        index = bisect_right(self._starts, self._offset) - 1
+        return self._positions[index] - self._offset
+
+    def _download_part(self, index, end):
+        """Download one part of the resource."""
+        start = self._starts[index]
+        try:
+            open_response = ResumableResponse.opener(
+                self._service, byte_range=(start, end - 1), validator=self._validator
+            )
+            with open_response(self._request) as response:
+                while self._positions[index] < end:
+                    data = response.read(DOWNLOAD_CHUNK_SIZE)
+                    if not data:
+                        raise URLError("Incomplete response!")
+                    with self._condition:
+                        if self._closed:
+                            return
+                        position = self._positions[index]
+                        data = data[: end - position]
+                        self._file.seek(position)
+                        self._file.write(data)
+                        self._positions[index] = position + len(data)
+                        self._condition.notify_all()
+        except Exception as error:
+            with self._condition:
+                if self._error is None:
+                    self._error = error
+                self._condition.notify_all()
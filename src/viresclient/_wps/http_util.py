@@ -27,6 +27,15 @@
 # -------------------------------------------------------------------------------
 
 from base64 import standard_b64encode
+from contextlib import contextmanager
+from io import BytesIO
+from urllib.error import HTTPError, URLError
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import HTTPError as Urllib3HTTPError
+
+DEFAULT_POOL_SIZE = 10  # maximum number of persistent connections per host
 
 
 def encode_no_auth(**kwargs):
@@ -48,3 +57,89 @@ def encode_token_auth(token, **kwargs):
     """Encode token as the bearer authentication header."""
     # NOTE: Only ASCII characters are allowed in HTTP headers.
     return {b"Authorization": b"Bearer " + token.encode("ascii")}
+
+
+def create_session(pool_size=DEFAULT_POOL_SIZE):
+    """Create HTTP session keeping a pool of persistent (keep-alive)
+    connections. The session can be shared by multiple threads.
+    """
+    session = requests.Session()
+    set_pool_size(session, pool_size)
+    # Mimic urlopen() - no ~/.netrc credentials overriding the authorization
+    # header and no transparent content decoding altering Content-Length.
+    # The proxies (including no_proxy) and the CA bundle are still taken
+    # from the environment.
+    session.auth = _keep_authorization
+    session.headers["Accept-Encoding"] = "identity"
+    return session
+
+
+def set_pool_size(session, pool_size):
+    """Mount new connection pools of the given size to the HTTP session.
+    The connections of the replaced pools are not reused.
+    """
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+
+def _keep_authorization(request):
+    """Dummy requests authentication keeping the request headers as they are.
+    Setting it prevents the ~/.netrc look-up.
+    """
+    return request
+
+
+@contextmanager
+def open_request(session, request, timeout=None):
+    """Open urllib.request.Request using the given HTTP session.
+    Yields the streamed response as a file-like object mimicking
+    the urlopen() output.
+    Raises urllib.error.HTTPError for HTTP error responses
+    and urllib.error.URLError for connection failures.
+    """
+    try:
+        response = session.request(
+            request.get_method(),
+            request.get_full_url(),
+            data=request.data,
+            headers=dict(request.header_items()),
+            timeout=timeout,
+            stream=True,
+        )
+    except requests.RequestException as error:
+        raise URLError(error) from error
+    with response:
+        if response.status_code >= 400:
+            raise HTTPError(
+                request.get_full_url(),
+                response.status_code,
+                response.reason,
+                response.headers,
+                BytesIO(response.content),
+            )
+        yield HTTPResponse(response)
+
+
+class HTTPResponse:
+    """File-like wrapper of the streamed HTTP response."""
+
+    def __init__(self, response):
+        self._response = response
+
+    @property
+    def status(self):
+        return self._response.status_code
+
+    @property
+    def url(self):
+        return self._response.url
+
+    def info(self):
+        return self._response.headers
+
+    def read(self, size=-1):
+        try:
+            return self._response.raw.read(None if size is None or size < 0 else size)
+        except (requests.RequestException, Urllib3HTTPError) as error:
+            raise URLError(error) from error
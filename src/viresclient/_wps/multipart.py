@@ -56,6 +56,32 @@ def get_multipart_request_size(parts, boundary):
     return size
 
 
+class MultipartPayload:
+    """Multi-part payload streamed from the given parts (pairs of the part
+    payload and header dictionaries) and boundary string.
+
+    The payload size is known in advance, i.e., the payload is sent with
+    an explicit Content-Length rather than the chunked transfer encoding.
+    Each iteration generates the payload from the beginning and the request
+    can be repeated.
+    """
+
+    def __init__(self, parts, boundary, chunksize=CHUNK_SIZE):
+        self.parts = parts
+        self.boundary = boundary
+        self.chunksize = chunksize
+        self.size = get_multipart_request_size(parts, boundary)
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        return generate_multipart_request(self.parts, self.boundary, self.chunksize)
+
+    def __bytes__(self):
+        return b"".join(self)
+
+
 def _get_part_head(boundary, part, headers):
     headers = {
         **headers,
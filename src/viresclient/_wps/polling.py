@@ -0,0 +1,157 @@
+# -------------------------------------------------------------------------------
+#
+# Asynchronous WPS job status polling strategies
+#
+# Authors: Martin Paces <martin.paces@eox.at>
+#          Ashley Smith <ashley.smith@ed.ac.uk>
+#
+# -------------------------------------------------------------------------------
+# Copyright (C) 2026 EOX IT Services GmbH
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies of this Software or works derived from this Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+# -------------------------------------------------------------------------------
+
+from copy import copy
+
+
+class PollingStrategy:
+    """Base class of the asynchronous job status polling strategies.
+
+    The strategy object is a template. A fresh copy of it is created
+    by the start() method for each polled job, and the next_interval()
+    method of this copy returns the time in seconds to wait before
+    the next status poll.
+    """
+
+    def start(self):
+        """Get a new copy of the strategy for a newly submitted job."""
+        strategy = copy(self)
+        strategy.reset()
+        return strategy
+
+    def reset(self):
+        """Reset the internal state."""
+
+    def next_interval(self, percent_completed, elapsed_time):
+        """Get the waiting time in seconds before the next status poll
+        from the last reported job progress (0-100 or None) and the time
+        in seconds elapsed since the job submission.
+        """
+        raise NotImplementedError
+
+
+class FixedPolling(PollingStrategy):
+    """Poll the job status in fixed intervals.
+
+    Args:
+        interval (float): polling interval in seconds
+    """
+
+    def __init__(self, interval=1):
+        if interval <= 0:
+            raise ValueError("The polling interval must be positive!")
+        self.interval = interval
+
+    def next_interval(self, percent_completed, elapsed_time):
+        return self.interval
+
+
+class BackoffPolling(PollingStrategy):
+    """Poll the job status in exponentially growing intervals.
+
+    Args:
+        initial_interval (float): first polling interval in seconds
+        factor (float): multiplication factor applied after each poll
+        max_interval (float): maximum polling interval in seconds
+    """
+
+    def __init__(self, initial_interval=1, factor=1.5, max_interval=30):
+        if initial_interval <= 0 or max_interval < initial_interval:
+            raise ValueError("Invalid polling intervals!")
+        if factor < 1:
+            raise ValueError("The backoff factor must not be lower than 1!")
+        self.initial_interval = initial_interval
+        self.factor = factor
+        self.max_interval = max_interval
+        self.reset()
+
+    def reset(self):
+        self._interval = self.initial_interval
+
+    def next_interval(self, percent_completed, elapsed_time):
+        interval = self._interval
+        self._interval = min(self._interval * self.factor, self.max_interval)
+        return interval
+
+
+class PredictivePolling(PollingStrategy):
+    """Poll the job status at the expected job completion time.
+
+    The completion time is extrapolated from the trend of the reported job
+    progress. Until the progress is known, the intervals grow exponentially
+    as in BackoffPolling, up to max_backoff_interval, so that the completion
+    of the jobs not reporting any progress (e.g., short or queued jobs)
+    is not detected late. The interval is always kept between min_interval
+    and max_interval.
+
+    Args:
+        min_interval (float): minimum polling interval in seconds
+        max_interval (float): maximum polling interval in seconds
+        factor (float): backoff multiplication factor
+        max_backoff_interval (float): maximum polling interval in seconds
+            while the job progress is not known
+    """
+
+    def __init__(
+        self, min_interval=1, max_interval=60, factor=1.5, max_backoff_interval=5
+    ):
+        self._backoff = BackoffPolling(
+            min_interval,
+            factor,
+            max(min_interval, min(max_backoff_interval, max_interval)),
+        )
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.max_backoff_interval = max_backoff_interval
+        self.reset()
+
+    def reset(self):
+        self._backoff = self._backoff.start()
+        self._first_progress = None
+
+    def next_interval(self, percent_completed, elapsed_time):
+        if not percent_completed:
+            # no progress reported yet (e.g., job waiting in the queue)
+            return self._backoff.next_interval(percent_completed, elapsed_time)
+
+        if self._first_progress is None:
+            self._first_progress = (percent_completed, elapsed_time)
+
+        first_percent_completed, first_elapsed_time = self._first_progress
+        progress = percent_completed - first_percent_completed
+        duration = elapsed_time - first_elapsed_time
+
+        if progress <= 0 or duration <= 0:
+            return self._backoff.next_interval(percent_completed, elapsed_time)
+
+        remaining_time = (100 - percent_completed) * duration / progress
+        return min(max(remaining_time, self.min_interval), self.max_interval)
+
+
+DEFAULT_POLLING = PredictivePolling()
@@ -0,0 +1,158 @@
+# -------------------------------------------------------------------------------
+#
+# Request retry policy
+#
+# Authors: Martin Paces <martin.paces@eox.at>
+#          Ashley Smith <ashley.smith@ed.ac.uk>
+#
+# -------------------------------------------------------------------------------
+# Copyright (C) 2026 EOX IT Services GmbH
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies of this Software or works derived from this Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+# -------------------------------------------------------------------------------
+
+from copy import copy
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from random import uniform
+from urllib.error import HTTPError
+
+# HTTP status codes of the transient errors retried by default
+# (other 4xx client errors are not retried)
+RETRIED_CLIENT_ERRORS = (408, 425, 429)
+
+
+class RetryPolicy:
+    """Request retry policy.
+
+    The waiting time before the n-th retry is
+    ``backoff_base * backoff_factor ** (n - 1)`` seconds, limited by
+    ``backoff_max`` and randomly scaled by ``1 ± jitter`` so that
+    concurrently failed requests are not repeated all at the same time.
+    The ``Retry-After`` header of an HTTP error response takes precedence
+    over the calculated waiting time.
+
+    HTTP 5xx server errors and 408, 425 and 429 client errors are retried
+    by default. The default can be overridden by the ``status_codes``
+    dictionary mapping the HTTP status codes to True (retry) or False
+    (do not retry).
+
+    Args:
+        max_retries (int): maximum number of retry attempts of a request
+        backoff_base (float): waiting time before the first retry in seconds
+        backoff_factor (float): waiting time multiplication factor
+        backoff_max (float): maximum waiting time in seconds
+        jitter (float): relative random variation of the waiting time (0-1)
+        status_codes (dict): per-HTTP-status-code retry rules
+        respect_retry_after (bool): honour the ``Retry-After`` header
+        max_total_time (float): total retry budget of a request, i.e.,
+            maximum sum of the waiting times in seconds
+    """
+
+    def __init__(
+        self,
+        max_retries=3,
+        backoff_base=5,
+        backoff_factor=2,
+        backoff_max=60,
+        jitter=0.25,
+        status_codes=None,
+        respect_retry_after=True,
+        max_total_time=300,
+    ):
+        if max_retries < 0:
+            raise ValueError("The number of retries must not be negative!")
+        if not 0 <= jitter <= 1:
+            raise ValueError("The jitter must be between 0 and 1!")
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_factor = backoff_factor
+        self.backoff_max = backoff_max
+        self.jitter = jitter
+        self.status_codes = dict(status_codes or {})
+        self.respect_retry_after = respect_retry_after
+        self.max_total_time = max_total_time
+        self.reset()
+
+    def start(self):
+        """Get a new copy of the policy for a newly sent request."""
+        policy = copy(self)
+        policy.reset()
+        return policy
+
+    def reset(self):
+        """Reset the internal state."""
+        self.retries = 0
+        self.total_time = 0
+
+    def is_retried(self, error):
+        """Return True if the request failed with the given error
+        shall be retried.
+        """
+        if isinstance(error, HTTPError):
+            return self.status_codes.get(
+                error.code, error.code >= 500 or error.code in RETRIED_CLIENT_ERRORS
+            )
+        return True
+
+    def next_delay(self, error):
+        """Get the waiting time in seconds before the next retry of the request
+        failed with the given error, or None if the request shall not be
+        retried anymore.
+        """
+        if self.retries >= self.max_retries or not self.is_retried(error):
+            return None
+
+        delay = self._get_retry_after(error) if self.respect_retry_after else None
+        if delay is None:
+            delay = min(
+                self.backoff_base * self.backoff_factor**self.retries,
+                self.backoff_max,
+            )
+            delay *= uniform(1 - self.jitter, 1 + self.jitter)
+
+        if self.max_total_time is not None:
+            if self.total_time + delay > self.max_total_time:
+                return None
+
+        self.retries += 1
+        self.total_time += delay
+        return delay
+
+    @staticmethod
+    def _get_retry_after(error):
+        """Parse Retry-After header of an HTTP error response."""
+        headers = getattr(error, "headers", None)
+        value = headers.get("Retry-After") if headers else None
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            retry_time = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if retry_time.tzinfo is None:
+            retry_time = retry_time.replace(tzinfo=timezone.utc)
+        return max(0.0, (retry_time - datetime.now(timezone.utc)).total_seconds())
+
+
+DEFAULT_RETRY_POLICY = RetryPolicy()
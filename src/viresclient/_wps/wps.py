@@ -27,14 +27,25 @@
 # THE SOFTWARE.
 # -------------------------------------------------------------------------------
 
-from contextlib import closing
+from functools import partial
+from itertools import count
 from logging import LoggerAdapter, getLogger
+from threading import Lock
 from time import sleep
 from urllib.error import HTTPError, URLError
 from urllib.parse import urljoin
-from urllib.request import Request, urlopen
+from urllib.request import Request
 from xml.etree import ElementTree
 
+from .download import ParallelResponse, ResumableResponse
+from .http_util import (
+    DEFAULT_POOL_SIZE,
+    create_session,
+    open_request,
+    set_pool_size,
+)
+from .polling import DEFAULT_POLLING, FixedPolling
+from .retry import DEFAULT_RETRY_POLICY
 from .time_util import Timer
 
 NS_OWS11 = "http://www.opengis.net/ows/1.1"
@@ -89,14 +100,18 @@ class AuthenticationError(Exception):
         )
 
 
-def retry(n_retries, retry_time_seconds, label, exception_type=Exception):
-    """Request re-try decorator."""
+def retry(label, exception_type=Exception):
+    """Request re-try decorator applying the retry policy of the service
+    proxy (see the retry module).
+    """
 
     def _retry(method):
 
         def _retry_wrapper(self, *args, **kwargs):
 
-            for index in range(n_retries + 1):
+            retry_policy = self.retry_policy.start()
+
+            for index in count():
                 if index == 0:
                     self.logger.debug("sending %s.", label)
                 else:
@@ -105,15 +120,16 @@ def retry(n_retries, retry_time_seconds, label, exception_type=Exception):
                 try:
                     return method(self, *args, **kwargs)
 
-                except WPSError:
+                except (WPSError, AuthenticationError):
                     raise
 
                 except exception_type as error:
-                    if index < n_retries:
+                    delay = retry_policy.next_delay(error)
+                    if delay is not None:
                         self.logger.error(
-                            "%s failed. Retrying in %s seconds. %s: %s",
+                            "%s failed. Retrying in %.1f seconds. %s: %s",
                             label,
-                            self.RETRY_TIME,
+                            delay,
                             error.__class__.__name__,
                             error,
                         )
@@ -126,7 +142,7 @@ def retry(n_retries, retry_time_seconds, label, exception_type=Exception):
                         )
                         raise
 
-                sleep(retry_time_seconds)
+                sleep(delay)
 
         return _retry_wrapper
 
@@ -142,11 +158,19 @@ class WPS10Service:
         url     - service URL
         headers - optional dictionary of the HTTP headers sent with each
                   request
+        pool_size - optional maximum number of the persistent HTTP
+                  connections kept open by the service proxy (by default,
+                  the pool grows with the number of concurrent workers,
+                  see reserve_connections)
+        polling - optional default asynchronous job status polling strategy
+                  (see the polling module)
+        retry_policy - optional request retry policy (see the retry module)
+        download_connections - optional number of the parallel connections
+                  used to download large asynchronous job outputs
+                  (1 by default, i.e., no parallel download)
     """
 
     DEFAULT_CONTENT_TYPE = "application/xml; charset=utf-8"
-    RETRY_TIME = 20  # re-try wait period in seconds
-    REQUEST_RETRIES = 3  # re-try attempts
 
     STATUS = {
         "{http://www.opengis.net/wps/1.0.0}ProcessAccepted": "ACCEPTED",
@@ -159,12 +183,44 @@ class WPS10Service:
         def process(self, msg, kwargs):
             return "WPS10Service: %s" % msg, kwargs
 
-    def __init__(self, url, headers=None, logger=None):
+    def __init__(
+        self,
+        url,
+        headers=None,
+        logger=None,
+        pool_size=None,
+        polling=None,
+        retry_policy=None,
+        download_connections=None,
+    ):
+        if download_connections is not None and download_connections < 1:
+            raise ValueError("The number of download connections must be positive!")
         self.url = url
+        self.polling = polling or DEFAULT_POLLING
+        self.retry_policy = retry_policy or DEFAULT_RETRY_POLICY
         self.headers = headers or {}
         self.logger = self._LoggerAdapter(logger or getLogger(__name__), {})
-
-    @retry(REQUEST_RETRIES, RETRY_TIME, "synchronous request", exception_type=URLError)
+        # HTTP session shared by all requests (and threads) of this proxy
+        self.pool_size = pool_size
+        self._session_pool_size = pool_size or DEFAULT_POOL_SIZE
+        self._session_lock = Lock()
+        self.session = create_session(self._session_pool_size)
+        self.download_connections = download_connections or 1
+
+    def reserve_connections(self, nworkers):
+        """Enlarge the connection pool to keep the connections of nworkers
+        concurrent workers, each downloading by download_connections.
+        The pool size given to the proxy is kept as it is.
+        """
+        if self.pool_size is not None:
+            return
+        pool_size = nworkers * self.download_connections
+        with self._session_lock:
+            if pool_size > self._session_pool_size:
+                set_pool_size(self.session, pool_size)
+                self._session_pool_size = pool_size
+
+    @retry("synchronous request", exception_type=URLError)
     def retrieve(self, request, handler=None, content_type=None, headers=None):
         """Send a synchronous POST WPS request to a server and retrieve
         the output.
@@ -184,14 +240,16 @@ class WPS10Service:
         handler=None,
         status_handler=None,
         cleanup_handler=None,
-        polling_interval=1,
+        polling_interval=None,
         output_name="output",
         content_type=None,
         headers=None,
+        polling=None,
     ):
         """Send an asynchronous POST WPS request to a server and retrieve
         the output.
         """
+        polling = self.start_polling(polling, polling_interval)
         timer = Timer()
         status, percentCompleted, status_url, execute_response = self.submit_async(
             request,
@@ -221,7 +279,11 @@ class WPS10Service:
                 status_handler(wpsstatus)
 
             while wpsstatus.status not in ("FINISHED", "FAILED"):
-                sleep(polling_interval)
+                sleep(
+                    polling.next_interval(
+                        wpsstatus.percentCompleted, timer.elapsed_time
+                    )
+                )
 
                 last_status = wpsstatus.status
                 last_percentCompleted = wpsstatus.percentCompleted
@@ -249,13 +311,32 @@ class WPS10Service:
 
         return output
 
-    @retry(REQUEST_RETRIES, RETRY_TIME, "asynchronous output request")
-    def retrieve_async_output(self, status_url, output_name, handler=None):
-        """Retrieve asynchronous job output reference."""
+    def start_polling(self, polling=None, polling_interval=None):
+        """Get the status polling strategy of a new asynchronous job.
+        A fixed polling_interval (seconds) overrides the default strategy.
+        """
+        if polling is None:
+            if polling_interval:
+                polling = FixedPolling(polling_interval)
+            else:
+                polling = self.polling
+        return polling.start()
+
+    @retry("asynchronous output request")
+    def retrieve_async_output(
+        self, status_url, output_name, handler=None, connections=None
+    ):
+        """Retrieve asynchronous job output reference.
+        Large outputs are downloaded by the given number of parallel
+        connections (defaults to the download_connections of the proxy).
+        """
         self.logger.debug("Retrieving asynchronous job output '%s'.", output_name)
         output_url = self.parse_output_reference(status_url, output_name)
         return self._retrieve(
-            Request(urljoin(self.url, output_url), None, self.headers), handler
+            Request(urljoin(self.url, output_url), None, self.headers),
+            handler,
+            resumable=True,
+            connections=connections or self.download_connections,
         )
 
     @staticmethod
@@ -274,7 +355,7 @@ class WPS10Service:
                     or elm_reference.attrib["href"]
                 )
 
-    @retry(REQUEST_RETRIES, RETRY_TIME, "asynchronous request", exception_type=URLError)
+    @retry("asynchronous request", exception_type=URLError)
     def submit_async(self, request, content_type=None, headers=None):
         """Send a POST WPS asynchronous request to a server and retrieve
         the status URL.
@@ -291,7 +372,7 @@ class WPS10Service:
             self.error_handler,
         )
 
-    @retry(REQUEST_RETRIES, RETRY_TIME, "status poll request")
+    @retry("status poll request")
     def poll_status(self, status_url):
         """Poll status of an asynchronous WPS job."""
         return self._retrieve(
@@ -376,13 +457,32 @@ class WPS10Service:
         else:
             raise ElementTree.ParseError
 
-    def _retrieve(self, request, response_handler=None, error_handler=None):
-        """Retrieve and parse HTTP response."""
+    def _retrieve(
+        self,
+        request,
+        response_handler=None,
+        error_handler=None,
+        resumable=False,
+        connections=1,
+    ):
+        """Retrieve and parse HTTP response.
+        Interrupted download of a resumable (GET) request is continued
+        by an HTTP Range request. A resumable request can be downloaded
+        by multiple parallel connections.
+        """
         method = request.get_method()
         url = request.get_full_url()
         timer = Timer()
+        if resumable and connections > 1:
+            # handler downloading directly into its output file
+            target = getattr(response_handler, "target", None)
+            open_response = ParallelResponse.opener(self, connections, target)
+        elif resumable:
+            open_response = ResumableResponse.opener(self)
+        else:
+            open_response = partial(open_request, self.session)
         try:
-            with closing(urlopen(request)) as file_in:
+            with open_response(request) as file_in:
                 output = (response_handler or self._default_handler)(file_in)
             self.logger.info("%d %s %s %.3fs", 200, method, url, timer.elapsed_time)
             return output
@@ -0,0 +1,196 @@
+# -------------------------------------------------------------------------------
+#
+# WPS 1.0 asyncio service proxy
+#
+# Authors: Martin Paces <martin.paces@eox.at>
+#          Ashley Smith <ashley.smith@ed.ac.uk>
+#
+# -------------------------------------------------------------------------------
+# Copyright (C) 2026 EOX IT Services GmbH
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies of this Software or works derived from this Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+# -------------------------------------------------------------------------------
+
+import asyncio
+import contextvars
+import functools
+from urllib.parse import urljoin
+
+from .time_util import Timer
+from .wps import WPSStatus
+
+
+async def run_in_thread(executor, func, *args, **kwargs):
+    """Run the blocking function in the given executor, or in the default
+    executor of the event loop if no executor is given (as asyncio.to_thread).
+    """
+    if executor is None:
+        return await asyncio.to_thread(func, *args, **kwargs)
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(
+        executor, functools.partial(context.run, func, *args, **kwargs)
+    )
+
+
+class AsyncWPS10Service:
+    """WPS 1.0 asyncio service proxy class.
+
+    The proxy wraps a synchronous WPS 1.0 service proxy. The blocking HTTP
+    requests (job submission, status polling, output download and job
+    clean-up) are executed in worker threads so that they never block
+    the event loop, and the waiting between the status polls is done
+    by asyncio.sleep().
+
+    The worker threads are taken from the given executor. The default
+    executor of the event loop is limited to min(32, CPU count + 4) threads
+    which limits the number of concurrently processed requests.
+
+        wps = AsyncWPS10Service(WPS10Service(url, headers))
+        output = await wps.retrieve_async(request)
+
+    Parameters:
+        service - synchronous WPS 1.0 service proxy
+        executor - optional executor of the blocking calls
+    """
+
+    def __init__(self, service, executor=None):
+        self.service = service
+        self.executor = executor
+
+    @property
+    def url(self):
+        return self.service.url
+
+    @property
+    def logger(self):
+        return self.service.logger
+
+    async def retrieve(self, request, handler=None, content_type=None, headers=None):
+        """Send a synchronous POST WPS request to a server and retrieve
+        the output.
+        """
+        return await run_in_thread(
+            self.executor,
+            self.service.retrieve,
+            request,
+            handler=handler,
+            content_type=content_type,
+            headers=headers,
+        )
+
+    async def retrieve_async(
+        self,
+        request,
+        handler=None,
+        status_handler=None,
+        cleanup_handler=None,
+        polling_interval=None,
+        output_name="output",
+        content_type=None,
+        headers=None,
+        polling=None,
+    ):
+        """Send an asynchronous POST WPS request to a server and retrieve
+        the output.
+        """
+        polling = self.service.start_polling(polling, polling_interval)
+        timer = Timer()
+        status, percentCompleted, status_url, execute_response = (
+            await self.submit_async(
+                request,
+                content_type=content_type,
+                headers=headers,
+            )
+        )
+        wpsstatus = WPSStatus()
+        wpsstatus.update(
+            status, percentCompleted, urljoin(self.url, status_url), execute_response
+        )
+
+        def log_wpsstatus(wpsstatus):
+            self.logger.info(
+                "%s %s %.3fs", wpsstatus.status, wpsstatus.url, timer.elapsed_time
+            )
+
+        try:
+            log_wpsstatus(wpsstatus)
+            if status_handler:
+                status_handler(wpsstatus)
+
+            while wpsstatus.status not in ("FINISHED", "FAILED"):
+                await asyncio.sleep(
+                    polling.next_interval(
+                        wpsstatus.percentCompleted, timer.elapsed_time
+                    )
+                )
+
+                last_status = wpsstatus.status
+                wpsstatus.update(
+                    *await self.poll_status(urljoin(self.url, wpsstatus.url))
+                )
+
+                if wpsstatus.status != last_status:
+                    log_wpsstatus(wpsstatus)
+                if status_handler:
+                    status_handler(wpsstatus)
+
+            if wpsstatus.status == "FAILED":
+                ows_exception, namespace = self.service.find_exception(
+                    wpsstatus.execute_response
+                )
+                raise self.service.parse_ows_exception(ows_exception, namespace)
+
+            output = await self.retrieve_async_output(
+                wpsstatus.execute_response, output_name, handler
+            )
+
+        finally:
+            await run_in_thread(
+                self.executor,
+                cleanup_handler or self.service._default_cleanup_handler,
+                status_url,
+            )
+
+        return output
+
+    async def submit_async(self, request, content_type=None, headers=None):
+        """Send a POST WPS asynchronous request to a server and retrieve
+        the status URL.
+        """
+        return await run_in_thread(
+            self.executor,
+            self.service.submit_async,
+            request,
+            content_type=content_type,
+            headers=headers,
+        )
+
+    async def poll_status(self, status_url):
+        """Poll status of an asynchronous WPS job."""
+        return await run_in_thread(self.executor, self.service.poll_status, status_url)
+
+    async def retrieve_async_output(self, status_url, output_name, handler=None):
+        """Retrieve asynchronous job output reference."""
+        return await run_in_thread(
+            self.executor,
+            self.service.retrieve_async_output,
+            status_url,
+            output_name,
+            handler,
+        )
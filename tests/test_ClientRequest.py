@@ -1,6 +1,17 @@
+import asyncio
+import re
+import threading
+from datetime import datetime, timedelta
+from io import BytesIO
+
+import h5py
+import numpy as np
+import pandas
+import pytest
+
 import viresclient
-from viresclient import AeolusRequest, SwarmRequest
-from viresclient._client import ClientRequest
+from viresclient import AeolusRequest, AsyncSwarmRequest, SwarmRequest
+from viresclient._client import AdaptiveChunkPlanner, ClientRequest
 
 
 def test_ClientRequest():
@@ -17,3 +28,487 @@ def test_ClientRequest():
     assert isinstance(
         request._wps_service, viresclient._wps.wps_vires.ViresWPS10Service
     )
+
+
+class _FakeResponse(BytesIO):
+    """Mimics the file object returned by urlopen()"""
+
+    def info(self):
+        return {"Content-Length": str(len(self.getvalue()))}
+
+
+def _fake_get(request=None, response_handler=None, **kwargs):
+    """Replaces ClientRequest._get and echoes the rendered request back"""
+    return response_handler(_FakeResponse(request))
+
+
+def _counting_get(requests, get=_fake_get):
+    """Wraps the replacement of ClientRequest._get and records the requests"""
+
+    def _get(request=None, **kwargs):
+        requests.append(request)
+        return get(request, **kwargs)
+
+    return _get
+
+
+def _swarm_request():
+    request = SwarmRequest("dummy_url")
+    request.set_collection("SW_OPER_MAGA_LR_1B")
+    request.set_products(measurements=["F"], sampling_step="PT1S")
+    request._get = _fake_get
+    return request
+
+
+def test_get_between_max_workers():
+    """Test that concurrently processed chunks end up in the right files"""
+    start, end = datetime(2016, 1, 1), datetime(2016, 1, 1, 1)
+    request = _swarm_request()
+    serial = request.get_between(
+        start, end, nrecords_limit=600, show_progress_chunks=False
+    )
+    parallel = request.get_between(
+        start, end, nrecords_limit=600, show_progress_chunks=False, max_workers=4
+    )
+    assert len(serial.contents) == len(parallel.contents) == 6
+    for serial_file, parallel_file in zip(serial.contents, parallel.contents):
+        with open(serial_file._file.name, "rb") as file1:
+            with open(parallel_file._file.name, "rb") as file2:
+                assert file1.read() == file2.read()
+    with pytest.raises(ValueError):
+        request.get_between(start, end, max_workers=0)
+
+
+def test_iter_between():
+    """Test that the chunks are yielded in order"""
+    start, end = datetime(2016, 1, 1), datetime(2016, 1, 1, 1)
+    request = _swarm_request()
+    expected = request.get_between(
+        start, end, nrecords_limit=600, show_progress_chunks=False
+    )
+    requests = []
+    request._get = _counting_get(requests)
+    for prefetch in (0, 1, 2):
+        requests.clear()
+        chunks = list(
+            request.iter_between(
+                start,
+                end,
+                nrecords_limit=600,
+                output="file",
+                prefetch=prefetch,
+                show_progress_chunks=False,
+            )
+        )
+        assert len(chunks) == 6
+        # each chunk is requested exactly once
+        assert len(requests) == 6
+        for chunk, expected_file in zip(chunks, expected.contents):
+            with open(chunk._file.name, "rb") as file1:
+                with open(expected_file._file.name, "rb") as file2:
+                    assert file1.read() == file2.read()
+    with pytest.raises(ValueError):
+        request.iter_between(start, end, output="numpy")
+    with pytest.raises(ValueError):
+        request.iter_between(start, end, prefetch=-1)
+
+
+def test_get_between_resume_dir(tmp_path):
+    """Test that a repeated interrupted request skips the completed chunks"""
+    start, end = datetime(2016, 1, 1), datetime(2016, 1, 1, 1)
+    request = _swarm_request()
+    expected = request.get_between(
+        start, end, nrecords_limit=600, show_progress_chunks=False
+    )
+    requests = []
+
+    def _failing_get(request=None, **kwargs):
+        requests.append(request)
+        if len(requests) == 4:
+            raise RuntimeError("Connection lost!")
+        return _fake_get(request, **kwargs)
+
+    request._get = _failing_get
+    options = dict(nrecords_limit=600, show_progress_chunks=False)
+    with pytest.raises(RuntimeError):
+        request.get_between(start, end, resume_dir=str(tmp_path), **options)
+    assert len(requests) == 4
+    data = request.get_between(start, end, resume_dir=str(tmp_path), **options)
+    assert len(requests) == 4 + 3
+    for retdatafile, expected_file in zip(data.contents, expected.contents):
+        with open(retdatafile._file.name, "rb") as file1:
+            with open(expected_file._file.name, "rb") as file2:
+                assert file1.read() == file2.read()
+    # a different request is not resumed
+    request.get_between(start, end, resume_dir=str(tmp_path), nrecords_limit=1200)
+    assert len(requests) == 4 + 3 + 3
+
+
+def test_sampling_step_estimate():
+    """Test that the sampling of all requested spacecraft is considered"""
+    request = SwarmRequest("dummy_url")
+    request.set_collection("SW_OPER_MAGA_LR_1B", "SW_OPER_MAGB_HR_1B")
+    request.set_products(measurements=["F"])
+    assert request._get_sampling_step_estimate() == timedelta(
+        seconds=1 / (1 + 1 / 0.019)
+    )
+    request.set_products(measurements=["F"], sampling_step="PT10S")
+    assert request._get_sampling_step_estimate() == timedelta(seconds=5)
+
+
+def test_AdaptiveChunkPlanner():
+    """Test that the chunks are resized according to the observed records"""
+    start = datetime(2016, 1, 1)
+    planner = AdaptiveChunkPlanner(start, start + timedelta(days=1), "PT1S", 600)
+    interval = planner.next_interval()
+    assert interval == (start, start + timedelta(seconds=600))
+    # 60 records in 600s -> 0.1 record/s -> 4800s, limited by the max. growth
+    planner.update(interval, 60)
+    interval = planner.next_interval()
+    assert interval[1] - interval[0] == timedelta(seconds=2400)
+    planner.update(interval, 240)
+    interval = planner.next_interval()
+    assert interval[1] - interval[0] == timedelta(seconds=4800)
+    # denser data -> shrink, but never below the worst case
+    planner.update(interval, 4800)
+    interval = planner.next_interval()
+    assert interval[1] - interval[0] == timedelta(seconds=600)
+    # rejected interval is split in the worst-case chunks
+    assert planner.reject((start, start + timedelta(seconds=1000)))
+    assert planner.next_interval() == (start, start + timedelta(seconds=600))
+    assert planner.next_interval() == (
+        start + timedelta(seconds=600),
+        start + timedelta(seconds=1000),
+    )
+    assert not planner.reject((start, start + timedelta(seconds=600)))
+    planner.stop()
+    assert planner.next_interval() is None
+
+
+def test_get_between_adaptive_chunks():
+    """Test that sparse data are requested in fewer chunks"""
+    start, end = datetime(2016, 1, 1), datetime(2016, 1, 1, 1)
+    request = _swarm_request()
+    requests = []
+
+    def _sparse_get(request=None, response_handler=None, **kwargs):
+        # 10 records per chunk
+        requests.append(request)
+        csv = b"Timestamp,F\n" + b"2016-01-01T00:00:00Z,1.0\n" * 10
+        return response_handler(_FakeResponse(csv))
+
+    request._get = _sparse_get
+    data = request.get_between(
+        start,
+        end,
+        filetype="csv",
+        nrecords_limit=600,
+        show_progress=False,
+        adaptive_chunks=True,
+    )
+    assert len(requests) == len(data.contents) == 3
+    assert len(data.as_dataframe()) == 30
+    with pytest.raises(ValueError):
+        request.get_between(start, end, adaptive_chunks=True, resume_dir=".")
+
+
+def _daily_products(*days):
+    return [
+        (datetime(2020, 1, day), datetime(2020, 1, day, 23, 59, 59)) for day in days
+    ]
+
+
+def test_chunkify_request_by_products():
+    """Test that the chunks skip the gaps and follow the product files"""
+    start, end = datetime(2020, 1, 1), datetime(2020, 1, 6)
+    margin = timedelta(minutes=1)
+    intervals = ClientRequest._chunkify_request_by_products(
+        start, end, _daily_products(1, 2, 4, 5, 6), "PT1S", 2 * 86400, margin
+    )
+    assert intervals == [
+        (start, datetime(2020, 1, 3) + margin - timedelta(seconds=1)),
+        (datetime(2020, 1, 4) - margin, end),
+    ]
+    # chunks aligned with the product file starts
+    intervals = ClientRequest._chunkify_request_by_products(
+        start, end, _daily_products(1, 2, 3, 4, 5), "PT1S", 2 * 86400, margin
+    )
+    assert [interval[0] for interval in intervals] == [
+        start,
+        datetime(2020, 1, 3),
+        datetime(2020, 1, 5),
+    ]
+    assert intervals[-1][1] == end
+    # no data -> single empty chunk
+    intervals = ClientRequest._chunkify_request_by_products(
+        start, end, [], "PT1S", 86400, margin
+    )
+    assert intervals == [(start, datetime(2020, 1, 2))]
+
+
+def test_get_between_skip_gaps(monkeypatch):
+    """Test that the chunks without data are not requested"""
+
+    def _available_times(self, collection, start_time=None, end_time=None):
+        products = _daily_products(1, 5)
+        return pandas.DataFrame(
+            {
+                "starttime": pandas.to_datetime([start for start, _ in products]),
+                "endtime": pandas.to_datetime([end for _, end in products]),
+            }
+        )
+
+    monkeypatch.setattr(ClientRequest, "available_times", _available_times)
+    request = _swarm_request()
+    options = dict(nrecords_limit=86400, show_progress_chunks=False)
+    start, end = datetime(2020, 1, 1), datetime(2020, 1, 6)
+    assert len(request.get_between(start, end, **options).contents) == 5
+    data = request.get_between(start, end, skip_gaps=True, **options)
+    assert len(data.contents) == 2
+
+
+def test_get_between_cache(tmp_path):
+    """Test that the repeated request is served from the cache"""
+    start, end = datetime(2016, 1, 1), datetime(2016, 1, 1, 1)
+    request = _swarm_request()
+    request._cache = viresclient.ResponseCache(str(tmp_path))
+    requests = []
+    request._get = _counting_get(requests)
+    options = dict(nrecords_limit=600, show_progress_chunks=False)
+    data1 = request.get_between(start, end, **options)
+    data2 = request.get_between(start, end, **options)
+    assert len(requests) == 6
+    for file1, file2 in zip(data1.contents, data2.contents):
+        with open(file1._file.name, "rb") as file1:
+            with open(file2._file.name, "rb") as file2:
+                assert file1.read() == file2.read()
+
+
+def test_get_between_store(tmp_path):
+    """Test that only the days missing in the data store are downloaded"""
+    request = _swarm_request()
+    request._store = viresclient.DataStore(str(tmp_path))
+    requests = []
+    request._get = _counting_get(requests)
+    options = dict(filetype="csv", nrecords_limit=86400, show_progress_chunks=False)
+    data1 = request.get_between(
+        datetime(2016, 1, 1, 12), datetime(2016, 1, 4), **options
+    )
+    assert len(data1.contents) == 3
+    assert len(requests) == 3
+    # partial days are not stored
+    assert sorted(path.name for path in tmp_path.glob("*/*/*/days/*")) == [
+        "2016-01-02.json",
+        "2016-01-03.json",
+    ]
+    data2 = request.get_between(datetime(2016, 1, 2), datetime(2016, 1, 5), **options)
+    assert len(data2.contents) == 3
+    assert len(requests) == 4
+    for file1, file2 in zip(data1.contents[1:], data2.contents[:2]):
+        with open(file1._file.name, "rb") as file1:
+            with open(file2._file.name, "rb") as file2:
+                assert file1.read() == file2.read()
+    # different request parameters are stored separately
+    request.set_products(measurements=["B_NEC"], sampling_step="PT1S")
+    request.get_between(datetime(2016, 1, 2), datetime(2016, 1, 3), **options)
+    assert len(requests) == 5
+
+
+def _get_time_range(request):
+    """Extract the begin and end times from the rendered request"""
+    begin, end = re.findall(
+        r"<ows:Identifier>(?:begin|end)_time</ows:Identifier>\s*<wps:Data>"
+        r"\s*<wps:LiteralData>([^<]*)</wps:LiteralData>",
+        request.decode(),
+    )
+    return (
+        datetime.strptime(begin, "%Y-%m-%dT%H:%M:%SZ"),
+        datetime.strptime(end, "%Y-%m-%dT%H:%M:%SZ"),
+    )
+
+
+def _fake_csv_get(request=None, response_handler=None, **kwargs):
+    """Replaces ClientRequest._get and returns hourly CSV records"""
+    begin, end = _get_time_range(request)
+    times = pandas.date_range(begin, end, freq="h", inclusive="left")
+    lines = ["Timestamp,F", *(f"{time:%Y-%m-%dT%H:%M:%SZ},1.0" for time in times)]
+    return response_handler(_FakeResponse("\n".join(lines).encode()))
+
+
+def test_get_between_store_shifted(tmp_path):
+    """Test that a shifted request downloads only the days missing in the store"""
+    request = _swarm_request()
+    request._store = viresclient.DataStore(str(tmp_path))
+    requests = []
+    request._get = _counting_get(requests, _fake_csv_get)
+    options = dict(filetype="csv", show_progress_chunks=False)
+    data1 = request.get_between(datetime(2020, 1, 10), datetime(2020, 2, 9), **options)
+    assert len(requests) == len(data1.contents) == 1
+    data2 = request.get_between(datetime(2020, 1, 11), datetime(2020, 2, 10), **options)
+    # only the new day is requested
+    assert len(requests) == 2
+    assert _get_time_range(requests[1]) == (
+        datetime(2020, 2, 9),
+        datetime(2020, 2, 10),
+    )
+    # the stored days are sliced out of the stored file
+    times = data2.as_dataframe().index
+    assert len(times) == 30 * 24
+    assert times[0] == pandas.Timestamp("2020-01-11")
+    assert times[-1] == pandas.Timestamp("2020-02-09T23:00")
+
+
+class _FakeWPSService:
+    """Replaces the WPS service proxy and echoes the rendered request back"""
+
+    def retrieve(self, request, handler=None, **kwargs):
+        return handler(_FakeResponse(request))
+
+    def reserve_connections(self, nworkers):
+        pass
+
+
+def test_AsyncSwarmRequest_get_between():
+    """Test that the coroutine get_between retrieves all chunks"""
+    start, end = datetime(2016, 1, 1), datetime(2016, 1, 1, 1)
+    request = AsyncSwarmRequest("dummy_url")
+    request.set_collection("SW_OPER_MAGA_LR_1B")
+    request.set_products(measurements=["F"], sampling_step="PT1S")
+    request._wps_service = _FakeWPSService()
+    data = asyncio.run(
+        request.get_between(
+            start,
+            end,
+            asynchronous=False,
+            nrecords_limit=600,
+            show_progress_chunks=False,
+            max_concurrency=2,
+        )
+    )
+    assert len(data.contents) == 6
+    for retdatafile in data.contents:
+        with open(retdatafile._file.name, "rb") as file:
+            assert b"<wps:Execute" in file.read()
+
+
+def test_AsyncSwarmRequest_get_between_concurrency():
+    """Test that the chunks are not limited by the default executor"""
+    start, end = datetime(2016, 1, 1), datetime(2016, 1, 1, 8)
+    nchunks = 48  # more than the default executor threads
+    barrier = threading.Barrier(nchunks, timeout=10)
+
+    class _BarrierWPSService(_FakeWPSService):
+        def retrieve(self, request, handler=None, **kwargs):
+            barrier.wait()
+            return super().retrieve(request, handler, **kwargs)
+
+    request = AsyncSwarmRequest("dummy_url")
+    request.set_collection("SW_OPER_MAGA_LR_1B")
+    request.set_products(measurements=["F"], sampling_step="PT1S")
+    request._wps_service = _BarrierWPSService()
+    data = asyncio.run(
+        request.get_between(
+            start,
+            end,
+            asynchronous=False,
+            nrecords_limit=600,
+            show_progress_chunks=False,
+            max_concurrency=nchunks,
+        )
+    )
+    assert len(data.contents) == nchunks
+
+
+def _fake_eval_model_batch(model_expression, time, latitude, longitude, radius, **kw):
+    """Replaces SwarmRequest._eval_model_batch"""
+    result = {
+        "Timestamp": time,
+        "F": latitude + longitude,
+        "B_NEC": np.stack((latitude, longitude, radius), axis=-1),
+    }
+    return result, [f"source_{int(latitude[0]) // 4}", "common"]
+
+
+def test_eval_model_batches(tmp_path):
+    """Test that the batched model evaluation reassembles the results"""
+    request = SwarmRequest("dummy_url")
+    request._eval_model_batch = _fake_eval_model_batch
+    time = np.datetime64("2020-01-01") + np.arange(10) * np.timedelta64(1, "s")
+    latitude, longitude, radius = np.arange(10.0), np.ones(10), np.full(10, 6.8e6)
+    args = (["IGRF"], time, latitude, longitude, radius)
+
+    result, sources = request.eval_model(*args, batch_size=4, max_workers=3)
+    expected, _ = _fake_eval_model_batch(*args)
+    # sources in the batch order
+    assert sources == ["source_0", "common", "source_1", "source_2"]
+    result, sources = request.eval_model(*args, batch_size=4, max_workers=None)
+    assert sources == ["source_0", "common", "source_1", "source_2"]
+    for key, array in expected.items():
+        assert (result[key] == array).all()
+
+    output = {"F": np.zeros(10)}
+    result, _ = request.eval_model(*args, batch_size=4, output=output)
+    assert result is output
+    assert (output["F"] == expected["F"]).all()
+    assert output["B_NEC"].shape == (10, 3)
+
+    with h5py.File(tmp_path / "output.h5", "w") as hdf:
+        request.eval_model(*args, batch_size=3, output=hdf, show_progress=False)
+        assert (hdf["B_NEC"][...] == expected["B_NEC"]).all()
+        assert (
+            hdf["Timestamp"][...] == time.astype("datetime64[ns]").astype("int64")
+        ).all()
+
+    with pytest.raises(ValueError):
+        request.eval_model(*args, batch_size=0)
+
+
+def test_eval_model_in_memory(tmp_path, monkeypatch):
+    """Test the in-memory HDF5 encoding and the input compression options"""
+    monkeypatch.chdir(tmp_path)
+    request = SwarmRequest("dummy_url")
+    inputs = []
+
+    def _fake_eval_model_get(payload, response_handler=None, **kwargs):
+        input_file = payload.parts[1][0]
+        with h5py.File(input_file, "r") as hdf:
+            inputs.append({key: hdf[key].compression for key in hdf})
+            latitude = hdf["Latitude"][...]
+        output = BytesIO()
+        with h5py.File(output, "w") as hdf:
+            hdf.create_dataset("F", data=2 * latitude)
+            hdf.attrs["sources"] = ["source"]
+        return response_handler(_FakeResponse(output.getvalue()))
+
+    request._get = _fake_eval_model_get
+    time = np.datetime64("2020-01-01") + np.arange(5) * np.timedelta64(1, "s")
+    args = (["IGRF"], time, np.arange(5.0), np.zeros(5), np.full(5, 6.8e6))
+    result, sources = request.eval_model(*args)
+    assert (result["F"] == 2 * np.arange(5.0)).all()
+    assert sources == ["source"]
+    assert inputs[-1]["Latitude"] is None
+    request.eval_model(*args, compression="shuffle+gzip", compression_level=5)
+    assert inputs[-1]["Latitude"] == "gzip"
+    with pytest.raises(ValueError):
+        request.eval_model(*args, compression="lzf")
+    # no temporary files
+    assert list(tmp_path.iterdir()) == []
+
+    # large data held in temporary files in temp_dir
+    monkeypatch.setattr(viresclient._client_swarm, "EVAL_MODEL_IN_MEMORY_LIMIT", 0)
+    temp_files = []
+    temporary_file = viresclient._client_swarm.TemporaryFile
+
+    def _temporary_file(**kwargs):
+        temp_files.append(kwargs)
+        return temporary_file(**kwargs)
+
+    monkeypatch.setattr(viresclient._client_swarm, "TemporaryFile", _temporary_file)
+    result, sources = request.eval_model(*args, temp_dir=str(tmp_path))
+    assert (result["F"] == 2 * np.arange(5.0)).all()
+    assert [kwargs["prefix"] for kwargs in temp_files] == [
+        "_model_eval_input_",
+        "_model_eval_output_",
+    ]
+    assert all(kwargs["dir"] == str(tmp_path) for kwargs in temp_files)
+    assert list(tmp_path.iterdir()) == []
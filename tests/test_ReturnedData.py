@@ -1,9 +1,12 @@
 import os
 
+import cdflib
+import numpy
 import pandas
 import pytest
+import xarray
 
-from viresclient._data_handling import ReturnedData, ReturnedDataFile
+from viresclient._data_handling import FileReader, ReturnedData, ReturnedDataFile
 
 SUPPORTED_FILETYPES = ("csv", "cdf", "nc")
 
@@ -215,3 +218,195 @@ def test_ReturnedData_xarray():
     # NB Since xarray v0.11.0, Dataset keys no longer includes "Timestamp"
     assert set(ds.keys()) == set(df_json.keys())
     assert ds.indexes["Timestamp"].equals(df_json.index)
+
+
+def test_ReturnedData_projection(monkeypatch):
+    """Test that only the selected variables are read, each of them once"""
+    read_variables = []
+    varget = cdflib.cdfread.CDF.varget
+
+    def _varget(self, variable=None, *args, **kwargs):
+        read_variables.append(variable)
+        return varget(self, variable, *args, **kwargs)
+
+    monkeypatch.setattr(cdflib.cdfread.CDF, "varget", _varget)
+    data_cdf = ReturnedData(filetype="cdf")
+    with open(TEST_FILES["cdf"], "rb") as f:
+        data_cdf.contents[0]._write_new_data(f.read())
+
+    ds = data_cdf.as_xarray(variables=["F", "B_NEC"])
+    assert set(ds.keys()) == {"F", "B_NEC"}
+    assert ds["B_NEC"].shape == (ds["Timestamp"].size, 3)
+    assert sorted(read_variables) == ["B_NEC", "F", "Timestamp"]
+
+    read_variables.clear()
+    df = data_cdf.as_dataframe(expand=True, columns=["B_NEC"])
+    assert list(df.columns) == ["B_NEC_N", "B_NEC_E", "B_NEC_C"]
+    assert sorted(read_variables) == ["B_NEC", "Timestamp"]
+    assert (df["B_NEC_C"].values == ds["B_NEC"].values[:, 2]).all()
+
+    with pytest.raises(ValueError):
+        data_cdf.as_xarray(variables=["Foo"])
+
+
+def test_ReturnedData_time_slice():
+    """Test loading of the records within a time range"""
+    data_cdf = ReturnedData(filetype="cdf")
+    data_csv = ReturnedData(filetype="csv")
+    with open(TEST_FILES["cdf"], "rb") as f:
+        data_cdf.contents[0]._write_new_data(f.read())
+    with open(TEST_FILES["csv"], "rb") as f:
+        data_csv.contents[0]._write_new_data(f.read())
+    ds_all = data_cdf.as_xarray()
+    time_slice = ("2016-01-01T00:30:00", "2016-01-01T00:40:00")
+    ds = data_cdf.as_xarray(time_slice=time_slice)
+    expected = ds_all.sel(Timestamp=slice("2016-01-01T00:30:00", "2016-01-01T00:39:59"))
+    assert ds["Timestamp"].size == 60
+    assert (ds["Timestamp"].values == expected["Timestamp"].values).all()
+    assert (ds["B_NEC"].values == expected["B_NEC"].values).all()
+
+    df = data_cdf.as_dataframe(time_slice=slice(None, time_slice[1]))
+    assert df.index.equals(ds_all.indexes["Timestamp"][:72])
+    df = data_csv.as_dataframe(time_slice=time_slice)
+    assert df.index.equals(ds.indexes["Timestamp"])
+
+    ds = data_cdf.as_xarray(time_slice=("2017-01-01", None))
+    assert ds["Timestamp"].size == 0
+    assert set(ds.keys()) == set(ds_all.keys())
+
+
+def test_FileReader_dataframe_buffers():
+    """Test that the dataframe columns are built from the decoded arrays"""
+    with FileReader(TEST_FILES["cdf"]) as f:
+        b_nec = f.get_variable("B_NEC")
+        df = f.as_pandas_dataframe(expand=True)
+        assert numpy.shares_memory(df["F"].values, f.get_variable("F"))
+        assert numpy.shares_memory(df["B_NEC_C"].values, b_nec)
+        assert (df["B_NEC_C"].values == b_nec[:, 2]).all()
+        df = f.as_pandas_dataframe()
+        assert list(df.columns) == [
+            "Spacecraft",
+            "Latitude",
+            "Longitude",
+            "Radius",
+            "F",
+            "B_NEC",
+        ]
+        assert df["F"].dtype == numpy.float64
+        assert numpy.shares_memory(df["B_NEC"].iloc[1], b_nec)
+        assert (df["B_NEC"].iloc[1] == b_nec[1]).all()
+
+
+def test_ReturnedData_multiple_files():
+    """Test merging of multiple files into preallocated arrays"""
+    data_cdf = ReturnedData(filetype="cdf", N=3)
+    with open(TEST_FILES["cdf"], "rb") as f:
+        payload = f.read()
+    for item in data_cdf.contents:
+        item._write_new_data(payload)
+    ds_part = data_cdf.contents[0].as_xarray()
+    ds = data_cdf.as_xarray()
+    expected = xarray.concat([ds_part] * 3, dim="Timestamp")
+    assert ds["Timestamp"].size == 3 * ds_part["Timestamp"].size
+    for var in ["Timestamp", "Spacecraft", "F", "B_NEC"]:
+        assert (ds[var].values == expected[var].values).all()
+    assert ds["B_NEC"].attrs == ds_part["B_NEC"].attrs
+    assert ds.attrs["Sources"] == data_cdf.sources
+
+    df_part = data_cdf.contents[0].as_dataframe(expand=True)
+    df = data_cdf.as_dataframe(expand=True, time_slice=(None, "2016-01-01T00:30"))
+    assert df.equals(pandas.concat([df_part[:12]] * 3))
+
+    output = ReturnedData._write_records(None, numpy.array(["A", "B"]), 0, 4)
+    output = ReturnedData._write_records(output, numpy.array(["-", "AB"]), 2, 4)
+    assert output.tolist() == ["A", "B", "-", "AB"]
+
+
+def test_ReturnedData_max_workers():
+    """Test concurrent decoding of multiple files"""
+    data_cdf = ReturnedData(filetype="cdf", N=5)
+    with open(TEST_FILES["cdf"], "rb") as f:
+        payload = f.read()
+    for item in data_cdf.contents:
+        item._write_new_data(payload)
+    ds = data_cdf.as_xarray(max_workers=4)
+    assert ds.equals(data_cdf.as_xarray())
+    df = data_cdf.as_dataframe(expand=True, max_workers=2)
+    assert df.equals(data_cdf.as_dataframe(expand=True))
+    ds = data_cdf.as_xarray(max_workers=2, use_processes=True)
+    assert ds.equals(data_cdf.as_xarray())
+    df = data_cdf.as_dataframe(columns=["F"], max_workers=2, use_processes=True)
+    assert df.equals(data_cdf.as_dataframe(columns=["F"]))
+    # not merged into preallocated arrays
+    data_csv = ReturnedData(filetype="csv", N=3)
+    with open(TEST_FILES["csv"], "rb") as f:
+        payload = f.read()
+    for item in data_csv.contents:
+        item._write_new_data(payload)
+    df = data_csv.as_dataframe(max_workers=3)
+    assert df.index.equals(
+        pandas.concat([data_csv.contents[0].as_dataframe()] * 3).index
+    )
+    with pytest.raises(ValueError):
+        data_cdf.as_xarray(max_workers=0)
+
+
+def test_FileReader_variable_workers(monkeypatch):
+    """Test concurrent decoding of the variables of a single file"""
+    handles = []
+    open_cdf = FileReader._open_cdf
+
+    def _open_cdf(file):
+        handles.append(file)
+        return open_cdf(file)
+
+    monkeypatch.setattr(FileReader, "_open_cdf", staticmethod(_open_cdf))
+    with FileReader(TEST_FILES["cdf"]) as f:
+        expected = f.as_xarray_dataset()
+    handles.clear()
+    with FileReader(TEST_FILES["cdf"], variable_workers=3) as f:
+        ds = f.as_xarray_dataset()
+    assert ds.equals(expected)
+    # shared handle + one handle per thread
+    assert 2 <= len(handles) <= 4
+
+    data_cdf = ReturnedData(filetype="cdf")
+    with open(TEST_FILES["cdf"], "rb") as f:
+        data_cdf.contents[0]._write_new_data(f.read())
+    time_slice = ("2016-01-01T00:30", None)
+    df = data_cdf.as_dataframe(time_slice=time_slice, variable_workers=4)
+    assert df.equals(data_cdf.as_dataframe(time_slice=time_slice))
+    data_cdf = ReturnedData(filetype="cdf", N=2)
+    for item in data_cdf.contents:
+        with open(TEST_FILES["cdf"], "rb") as f:
+            item._write_new_data(f.read())
+    ds = data_cdf.as_xarray(max_workers=2, variable_workers=2)
+    assert ds.equals(data_cdf.as_xarray())
+    with pytest.raises(ValueError):
+        FileReader(TEST_FILES["cdf"], variable_workers=-1)
+    with pytest.raises(ValueError):
+        data_cdf.as_xarray(variable_workers=0)
+
+
+def test_FileReader_dataframe_arrow_layout():
+    """Test the compact Arrow layout of the vector columns"""
+    pyarrow = pytest.importorskip("pyarrow")
+    with FileReader(TEST_FILES["cdf"]) as f:
+        b_nec = f.get_variable("B_NEC")
+        df = f.as_pandas_dataframe(vector_layout="arrow")
+        assert df["B_NEC"].dtype == pandas.ArrowDtype(
+            pyarrow.list_(pyarrow.float64(), 3)
+        )
+        assert df["B_NEC"].iloc[1] == b_nec[1].tolist()
+        assert (numpy.stack(df["B_NEC"].to_numpy()) == b_nec).all()
+        assert df["F"].dtype == numpy.float64
+    data_cdf = ReturnedData(filetype="cdf", N=2)
+    with open(TEST_FILES["cdf"], "rb") as f:
+        payload = f.read()
+    for item in data_cdf.contents:
+        item._write_new_data(payload)
+    df = data_cdf.as_dataframe(vector_layout="arrow")
+    assert len(df) == 2 * len(b_nec)
+    assert isinstance(df["B_NEC"].dtype, pandas.ArrowDtype)
+    with pytest.raises(ValueError):
+        data_cdf.as_dataframe(vector_layout="block")
@@ -0,0 +1,129 @@
+import os
+import time
+from datetime import timedelta
+
+from viresclient import MetadataCache, ResponseCache, SwarmRequest
+
+
+def _put(cache, tmp_path, key, data, collections=()):
+    source = tmp_path / "source"
+    source.write_bytes(data)
+    cache.put(key, str(source), collections)
+
+
+def test_ResponseCache(tmp_path):
+    """Test storing and retrieving of the cached responses"""
+    cache = ResponseCache(str(tmp_path / "cache"))
+    key = cache.get_key("https://foo.bar/ows", b"<request>\n  <a/>\n</request>")
+    # canonical form of the request
+    assert key == cache.get_key("https://foo.bar/ows", "<request> <a/> </request>")
+    assert key != cache.get_key("https://foo.baz/ows", "<request> <a/> </request>")
+
+    target = tmp_path / "target"
+    assert cache.get(key, str(target)) is None
+    _put(cache, tmp_path, key, b"data")
+    assert cache.get(key, str(target)) == 4
+    assert target.read_bytes() == b"data"
+    assert cache.size == 4
+    cache.clear()
+    assert cache.get(key, str(target)) is None
+
+
+def test_ResponseCache_ttl(tmp_path):
+    """Test expiry of the cached responses"""
+    cache = ResponseCache(str(tmp_path / "cache"))
+    assert cache.get_ttl(["SW_FAST_MAGA_LR_1B"]) == timedelta(hours=12)
+    assert cache.get_ttl(["SW_OPER_MAGA_LR_1B"]) == timedelta(days=30)
+    assert cache.get_ttl(["SW_OPER_MAGA_LR_1B", "SW_FAST_MAGB_LR_1B"]) == timedelta(
+        hours=12
+    )
+    assert cache.get_ttl([]) == timedelta(days=1)
+
+    cache = ResponseCache(str(tmp_path / "cache"), ttl_rules=[("_FAST_", timedelta(0))])
+    _put(cache, tmp_path, "expired", b"data", ["SW_FAST_MAGA_LR_1B"])
+    time.sleep(0.01)
+    assert cache.get("expired", str(tmp_path / "target")) is None
+
+
+def test_ResponseCache_evict_expired(tmp_path):
+    """Test that the expired responses are evicted regardless of the size"""
+    cache = ResponseCache(
+        str(tmp_path / "cache"), ttl_rules=[("_FAST_", timedelta(seconds=0.01))]
+    )
+    _put(cache, tmp_path, "expired", b"data", ["SW_FAST_MAGA_LR_1B"])
+    _put(cache, tmp_path, "valid", b"data", ["SW_OPER_MAGA_LR_1B"])
+    time.sleep(0.02)
+    cache.evict()
+    assert not os.path.exists(cache._get_paths("expired")[0])
+    assert not os.path.exists(cache._get_paths("expired")[1])
+    assert cache.get("valid", str(tmp_path / "target")) == 4
+
+
+def test_ResponseCache_eviction(tmp_path):
+    """Test that the least recently used responses are evicted"""
+    cache = ResponseCache(str(tmp_path / "cache"), max_size=25)
+    for index, key in enumerate(("key1", "key2")):
+        _put(cache, tmp_path, key, b"0123456789")
+        data_path, _ = cache._get_paths(key)
+        os.utime(data_path, (index, index))
+    # access the older one
+    assert cache.get("key1", str(tmp_path / "target")) == 10
+    _put(cache, tmp_path, "key3", b"0123456789")
+    assert cache.get("key2", str(tmp_path / "target")) is None
+    assert cache.get("key1", str(tmp_path / "target")) == 10
+    assert cache.get("key3", str(tmp_path / "target")) == 10
+    assert not [
+        name for name in os.listdir(tmp_path / "cache" / "ke") if "part" in name
+    ]
+
+
+def test_MetadataCache(tmp_path):
+    """Test expiry, persistence and invalidation of the metadata responses"""
+    cache = MetadataCache(str(tmp_path / "cache"), ttls={"list_jobs": timedelta(0)})
+    key = cache.get_key("available_times", "https://foo.bar/ows", b"<request/>")
+    assert key != cache.get_key(
+        "available_times",
+        "https://foo.bar/ows",
+        b"<request/>",
+        {b"Authorization": b"Bearer token"},
+    )
+    assert cache.get("available_times", key) is None
+    cache.put("available_times", key, b"data")
+    assert cache.get("available_times", key) == b"data"
+    # persisted on disk
+    assert MetadataCache(str(tmp_path / "cache")).get("available_times", key) == (
+        b"data"
+    )
+    cache.put("list_jobs", "jobs", b"[]")
+    time.sleep(0.01)
+    assert cache.get("list_jobs", "jobs") is None
+
+    cache.put("get_model_info", "model", b"{}")
+    cache.invalidate("available_times")
+    assert cache.get("available_times", key) is None
+    assert MetadataCache(str(tmp_path / "cache")).get("available_times", key) is None
+    assert cache.get("get_model_info", "model") == b"{}"
+    cache.invalidate()
+    assert cache.get("get_model_info", "model") is None
+
+
+def test_SwarmRequest_metadata_cache():
+    """Test that the repeated metadata calls are served from the cache"""
+    request = SwarmRequest("dummy_url", metadata_cache=MetadataCache())
+    requests = []
+
+    def _fake_get(request=None, **kwargs):
+        requests.append(request)
+        return b'[{"name": "SW_OPER_MAGA_LR_1B"}]'
+
+    request._get = _fake_get
+    for _ in range(3):
+        info = request.get_collection_info("SW_OPER_MAGA_LR_1B")
+        assert info == [{"name": "SW_OPER_MAGA_LR_1B"}]
+        info[0]["name"] = "modified"
+    assert len(requests) == 1
+    request.get_collection_info("SW_OPER_MAGB_LR_1B")
+    assert len(requests) == 2
+    request._metadata_cache.invalidate()
+    request.get_collection_info("SW_OPER_MAGA_LR_1B")
+    assert len(requests) == 3
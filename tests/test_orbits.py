@@ -0,0 +1,127 @@
+import json
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from viresclient import SwarmRequest
+from viresclient._orbits import OrbitIndex
+
+ORBIT_STARTS = [
+    datetime(2020, 1, 1, 0, 30) + timedelta(minutes=90 * i) for i in range(16)
+]
+
+
+def _orbit_samples():
+    """Records around the equator crossings (orbit numbers from 101)"""
+    lines = ["Timestamp,OrbitNumber"]
+    for orbit, start in enumerate(ORBIT_STARTS, 101):
+        for time, number in (
+            (start - timedelta(seconds=1), orbit - 1),
+            (start, orbit),
+            (start + timedelta(seconds=1), orbit),
+            (start + timedelta(minutes=45), orbit),
+        ):
+            lines.append(f"{time:%Y-%m-%dT%H:%M:%SZ},{number}")
+    return "\n".join(lines).encode("UTF-8")
+
+
+def _probe_samples(step):
+    """Unfiltered records sampled with the given step (seconds)"""
+    lines = ["Timestamp,OrbitNumber"]
+    for i in range(60):
+        time = ORBIT_STARTS[0] + timedelta(seconds=step * i)
+        lines.append(f"{time:%Y-%m-%dT%H:%M:%SZ},101")
+    return "\n".join(lines).encode("UTF-8")
+
+
+def test_OrbitIndex(tmp_path):
+    """Test the lookups of the orbit numbers and times"""
+    times = np.array(["2020-01-01T01:00", "2020-01-01T01:01", "2020-01-01T01:02"])
+    index = OrbitIndex()
+    index.extend(times[1:], [2, 2], "2020-01-01T02:00", "2020-01-02")
+    index.extend(times[:2], [1, 2], "2020-01-01T01:30")
+    assert index.orbit_numbers.tolist() == [1, 2]
+    assert index.end_time == np.datetime64("2020-01-01T02:00")
+
+    orbits = index.get_orbit_numbers(
+        np.array(["2019-12-31", "2020-01-01T01:00:30", "2020-01-01T01:30", "NaT"])
+    )
+    assert orbits.tolist() == [-1, 1, 2, -1]
+    assert index.get_orbit_numbers(np.array(["2020-01-01T03:00"])).tolist() == [-1]
+
+    start_times, end_times = index.get_times_for_orbits([1, 1, 2], [1, 2, 3])
+    assert (
+        start_times.tolist()
+        == np.array(
+            ["2020-01-01T01:00", "2020-01-01T01:00", "2020-01-01T01:01"],
+            "datetime64[ns]",
+        ).tolist()
+    )
+    assert end_times[0] == np.datetime64("2020-01-01T01:01")
+    assert np.isnat(end_times[1:]).all()
+
+    index.save(str(tmp_path / "index.npz"))
+    loaded = OrbitIndex.load(str(tmp_path / "index.npz"))
+    assert loaded.orbit_numbers.tolist() == [1, 2]
+    assert loaded.end_time == index.end_time
+    assert loaded.updated == np.datetime64("2020-01-02")
+
+
+def test_SwarmRequest_get_orbit_numbers(tmp_path):
+    """Test that the orbit index is downloaded once and reused"""
+    requests = []
+
+    def _fake_get(request=None, **kwargs):
+        requests.append(request)
+        if b"vires:get_collection_info" in request:
+            return json.dumps(
+                [
+                    {
+                        "name": "SW_OPER_MODA_SC_1B",
+                        "timeExtent": {
+                            "start": "2020-01-01T00:00:00Z",
+                            "end": "2020-01-02T00:00:00Z",
+                        },
+                    }
+                ]
+            ).encode("UTF-8")
+        if b"Latitude" not in request:
+            # probe of the sampling step
+            assert not kwargs["asynchronous"]
+            return _probe_samples(10)
+        # window widened for the 10 seconds sampling
+        assert b"Latitude >= -0.7 AND Latitude <= 0.7" in request
+        assert kwargs["asynchronous"]
+        return _orbit_samples()
+
+    def _swarm_request():
+        request = SwarmRequest("dummy_url")
+        request._orbit_index_dir = str(tmp_path)
+        request._get = _fake_get
+        return request
+
+    request = _swarm_request()
+    times = np.array(ORBIT_STARTS[:3], dtype="datetime64[ns]") + np.timedelta64(1, "m")
+    assert request.get_orbit_numbers("Alpha", times).tolist() == [101, 102, 103]
+    nrequests = len(requests)
+    assert nrequests == 3
+
+    start_times, end_times = request.get_times_for_orbits_many(
+        [(101, 102), (103, 103)], spacecraft="A"
+    )
+    assert (
+        start_times.tolist()
+        == np.array([ORBIT_STARTS[0], ORBIT_STARTS[2]], "datetime64[ns]").tolist()
+    )
+    assert (
+        end_times.tolist()
+        == np.array([ORBIT_STARTS[2], ORBIT_STARTS[3]], "datetime64[ns]").tolist()
+    )
+    # served from the index stored on disk, recently updated index
+    # is not updated again
+    request = _swarm_request()
+    orbits = request.get_orbit_numbers(
+        "A", [datetime(2020, 1, 1, 0, 29, 59, 500000), datetime(2021, 1, 1)]
+    )
+    assert orbits.tolist() == [100, -1]
+    assert len(requests) == nrequests
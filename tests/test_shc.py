@@ -0,0 +1,157 @@
+from math import factorial
+
+import numpy as np
+import pytest
+from numpy.polynomial.legendre import Legendre
+
+from viresclient import SHCModel, SwarmRequest
+from viresclient._shc import _to_decimal_year
+
+SHC_DIPOLE = """# dipole test model
+1 1 3 2 1
+2000.0 2010.0 2020.0
+1 0 -30000.0 -30000.0 -29000.0
+1 1 0.0 0.0 1000.0
+1 -1 0.0 0.0 0.0
+"""
+
+
+def test_SHCModel_from_string():
+    """Test parsing of the SHC format"""
+    model = SHCModel.from_string(SHC_DIPOLE)
+    assert model.times.tolist() == [2000.0, 2010.0, 2020.0]
+    assert model.degrees.tolist() == [1, 1, 1]
+    assert model.orders.tolist() == [0, 1, -1]
+    assert model.validity == (2000.0, 2020.0)
+    with pytest.raises(ValueError):
+        SHCModel.from_string("1 1 3 2 1\n2000.0 2010.0\n")
+
+
+def test_SHCModel_coefficients():
+    """Test the time interpolation of the coefficients"""
+    model = SHCModel.from_string(SHC_DIPOLE)
+    coefficients = model.get_coefficients([1999.0, 2005.0, 2015.0, 2020.0])
+    assert np.isnan(coefficients[:, 0]).all()
+    assert coefficients[0, 1:].tolist() == [-30000.0, -29500.0, -29000.0]
+    # quadratic pieces spanning two sampling intervals
+    model = SHCModel([0.0, 1.0, 2.0], [1], [0], [[0.0, 1.0, 4.0]], 3, 2)
+    assert np.allclose(model.get_coefficients([0.5, 1.5])[0], [0.25, 2.25])
+    # piecewise constant
+    model = SHCModel([0.0, 1.0, 2.0], [1], [0], [[0.0, 1.0, 4.0]], 1, 1)
+    assert model.get_coefficients([0.5, 1.5])[0].tolist() == [0.0, 1.0]
+    # static model
+    model = SHCModel([2000.0], [1], [0], [[1.0]], 1, 1)
+    assert model.get_coefficients([1900.0])[0].tolist() == [1.0]
+
+
+def test_SHCModel_eval():
+    """Test the field of a dipole"""
+    model = SHCModel.from_string(SHC_DIPOLE)
+    time = np.array(["2005-01-01"] * 3, dtype="datetime64[ns]")
+    b_nec = model.eval(time, [0.0, 90.0, 0.0], [0.0, 0.0, 0.0], [6371200.0] * 3)
+    assert np.allclose(b_nec[0], [30000.0, 0.0, 0.0])
+    assert np.allclose(b_nec[1], [0.0, 0.0, 60000.0], atol=1e-6)
+    # field decreasing with the third power of the distance
+    b_nec = model.eval(time[:1], [0.0], [0.0], [2 * 6371200.0])
+    assert np.allclose(b_nec[0], [30000.0 / 8, 0.0, 0.0])
+    # g11 term - eastward component at the equator
+    time = np.array(["2020-01-01"], dtype="datetime64[ns]")
+    b_nec = model.eval(time, [0.0], [90.0], [6371200.0])
+    assert np.allclose(b_nec[0], [29000.0, 1000.0, 0.0])
+
+
+def test_to_decimal_year():
+    times = np.array(["2020-01-01", "2020-07-02", "2021-01-01"], "datetime64[ns]")
+    assert np.allclose(_to_decimal_year(times), [2020.0, 2020.5, 2021.0])
+
+
+def test_eval_model_local(tmp_path):
+    """Test the local evaluation of the custom models"""
+    (tmp_path / "dipole.shc").write_text(SHC_DIPOLE)
+    request = SwarmRequest("dummy_url")
+    time = np.full(5, np.datetime64("2005-01-01"))
+    latitude, longitude, radius = np.zeros(5), np.zeros(5), np.full(5, 6371200.0)
+    result, sources = request.eval_model(
+        str(tmp_path / "dipole.shc"),
+        time,
+        latitude,
+        longitude,
+        radius,
+        local=True,
+        batch_size=2,
+        show_progress=False,
+    )
+    assert sources == ["dipole.shc"]
+    assert result["B_NEC_Custom_Model"].shape == (5, 3)
+    assert np.allclose(result["F_Custom_Model"], 30000.0)
+    model = SHCModel.from_string(SHC_DIPOLE)
+    result, sources = request.eval_model(
+        {"Dipole": model}, time, latitude, longitude, radius, local=True
+    )
+    assert sources == ["Dipole"]
+    assert np.allclose(result["B_NEC_Dipole"][:, 0], 30000.0)
+
+
+def _reference_potential(degrees, orders, coefficients, latitude, longitude, radius):
+    """Magnetic potential built from numpy's Legendre polynomials"""
+    theta = np.radians(90.0 - latitude)
+    phi = np.radians(longitude)
+    x = np.cos(theta)
+    relative_radius = 6371200.0 / radius
+    potential = 0.0
+    for degree, order, value in zip(degrees, orders, coefficients):
+        m = abs(order)
+        # Schmidt semi-normalised associated Legendre function
+        legendre = (1 - x**2) ** (m / 2) * Legendre.basis(degree).deriv(m)(x)
+        if m > 0:
+            legendre *= np.sqrt(2.0 * factorial(degree - m) / factorial(degree + m))
+        harmonic = np.cos(m * phi) if order >= 0 else np.sin(m * phi)
+        potential += (
+            6371200.0 * relative_radius ** (degree + 1) * value * harmonic * legendre
+        )
+    return potential
+
+
+def test_SHCModel_eval_finite_differences():
+    """Test the higher degree and order terms against the gradient of
+    the potential evaluated by finite differences
+    """
+    rng = np.random.default_rng(0)
+    degrees, orders = zip(*[(n, m) for n in range(1, 7) for m in range(-n, n + 1)])
+    coefficients = rng.normal(size=len(degrees)) * 1000.0 / np.array(degrees) ** 2
+    model = SHCModel([2000.0], degrees, orders, coefficients[:, None], 1, 1)
+
+    latitude = np.array([-63.0, -12.5, 0.0, 27.0, 71.3])
+    longitude = np.array([-170.0, -45.0, 10.0, 95.5, 150.0])
+    radius = np.array([6371200.0, 6800000.0, 7000000.0, 6500000.0, 8000000.0])
+    time = np.full(latitude.shape, np.datetime64("2000-01-01"))
+    b_nec = model.eval(time, latitude, longitude, radius)
+
+    def _potential(latitude, longitude, radius):
+        return _reference_potential(
+            degrees, orders, coefficients, latitude, longitude, radius
+        )
+
+    step_angle, step_radius = 1e-4, 1.0
+    d_radius = (
+        _potential(latitude, longitude, radius + step_radius)
+        - _potential(latitude, longitude, radius - step_radius)
+    ) / (2 * step_radius)
+    d_latitude = (
+        _potential(latitude + step_angle, longitude, radius)
+        - _potential(latitude - step_angle, longitude, radius)
+    ) / np.radians(2 * step_angle)
+    d_longitude = (
+        _potential(latitude, longitude + step_angle, radius)
+        - _potential(latitude, longitude - step_angle, radius)
+    ) / np.radians(2 * step_angle)
+    # B = -grad(V)
+    expected = np.stack(
+        (
+            -d_latitude / radius,
+            -d_longitude / (radius * np.cos(np.radians(latitude))),
+            d_radius,
+        ),
+        axis=-1,
+    )
+    assert np.allclose(b_nec, expected, rtol=0, atol=1e-4)
@@ -0,0 +1,338 @@
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.error import HTTPError, URLError
+from urllib.request import Request
+
+import pytest
+
+from viresclient._wps import download
+from viresclient._wps.http_util import create_session, open_request
+from viresclient._wps.multipart import MultipartPayload, generate_multipart_request
+from viresclient._wps.polling import BackoffPolling, FixedPolling, PredictivePolling
+from viresclient._wps.retry import RetryPolicy
+from viresclient._wps.wps import WPS10Service
+
+PAYLOAD = b"0123456789" * 1000
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Minimal HTTP server serving PAYLOAD at /data"""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path == "/unavailable":
+            self.server.unavailable_count += 1
+            self.send_response(503)
+            self.send_header("Retry-After", "0")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.path in ("/flaky", "/flaky-norange"):
+            self._send_flaky(ranges=self.path == "/flaky")
+            return
+        if self.path == "/ranged":
+            self._send_ranged()
+            return
+        if self.path != "/data":
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.server.connections.add(self.client_address)
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(PAYLOAD)))
+        self.end_headers()
+        self.wfile.write(PAYLOAD)
+
+    def do_POST(self):
+        """Echo the request payload."""
+        self.server.post_headers.append(dict(self.headers))
+        payload = self.rfile.read(int(self.headers["Content-Length"]))
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _send_flaky(self, ranges=True):
+        """Drop the connection in the middle of the first download."""
+        self.server.flaky_count += 1
+        range_ = self.headers.get("Range")
+        self.server.ranges.append(range_)
+        if range_ and ranges:
+            start = int(range_.partition("=")[2].rstrip("-"))
+            self.send_response(206)
+            self.send_header(
+                "Content-Range", f"bytes {start}-{len(PAYLOAD) - 1}/{len(PAYLOAD)}"
+            )
+            self.send_header("Content-Length", str(len(PAYLOAD) - start))
+            self.end_headers()
+            self.wfile.write(PAYLOAD[start:])
+            return
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(PAYLOAD)))
+        self.end_headers()
+        self.wfile.write(PAYLOAD[: len(PAYLOAD) // 2])
+        self.wfile.flush()
+        self.close_connection = True
+        self.connection.shutdown(socket.SHUT_RDWR)
+
+    def _send_ranged(self):
+        """Serve PAYLOAD supporting the Range requests."""
+        range_ = self.headers.get("Range")
+        self.server.ranges.append(range_)
+        if not range_:
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(PAYLOAD)))
+            self.end_headers()
+            self.wfile.write(PAYLOAD)
+            return
+        start, _, end = range_.partition("=")[2].partition("-")
+        start, end = int(start), int(end or len(PAYLOAD) - 1)
+        self.send_response(206)
+        self.send_header("Content-Range", f"bytes {start}-{end}/{len(PAYLOAD)}")
+        self.send_header("Content-Length", str(end + 1 - start))
+        self.send_header("ETag", '"payload"')
+        self.end_headers()
+        self.wfile.write(PAYLOAD[start : end + 1])
+
+
+@pytest.fixture
+def server_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    server.connections = set()
+    server.unavailable_count = 0
+    server.flaky_count = 0
+    server.ranges = []
+    server.post_headers = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server, "http://127.0.0.1:%d" % server.server_address[1]
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_WPS10Service_persistent_connection(server_url):
+    """Test that the requests of the service proxy reuse one connection"""
+    server, url = server_url
+    wps = WPS10Service(url)
+    for _ in range(3):
+        assert wps._retrieve(Request(f"{url}/data")) == PAYLOAD
+    assert len(server.connections) == 1
+
+
+def test_WPS10Service_pool_size():
+    """Test that the connection pool grows with the concurrent workers"""
+
+    def _pool_size(wps):
+        return wps.session.get_adapter("https://foo.bar/")._pool_maxsize
+
+    wps = WPS10Service("https://foo.bar/ows", download_connections=4)
+    assert _pool_size(wps) == 10
+    wps.reserve_connections(2)
+    assert _pool_size(wps) == 10
+    wps.reserve_connections(8)
+    assert _pool_size(wps) == 32
+    # the given pool size is kept
+    wps = WPS10Service("https://foo.bar/ows", pool_size=2, download_connections=4)
+    wps.reserve_connections(8)
+    assert _pool_size(wps) == 2
+
+
+def test_WPS10Service_errors(server_url):
+    """Test that the urllib exceptions are raised on failures"""
+    _, url = server_url
+    wps = WPS10Service(url)
+    with pytest.raises(HTTPError) as error:
+        wps._retrieve(Request(f"{url}/missing"))
+    assert error.value.status == 404
+    with pytest.raises(URLError):
+        wps._retrieve(Request("http://127.0.0.1:1/data"))
+
+
+def test_polling_strategies():
+    """Test the intervals of the job status polling strategies"""
+    fixed = FixedPolling(2).start()
+    assert [fixed.next_interval(None, t) for t in range(3)] == [2, 2, 2]
+
+    template = BackoffPolling(initial_interval=1, factor=2, max_interval=5)
+    backoff = template.start()
+    intervals = [backoff.next_interval(None, t) for t in range(5)]
+    assert intervals == [1, 2, 4, 5, 5]
+    # each job starts from the initial interval
+    assert template.start().next_interval(None, 0) == 1
+
+    predictive = PredictivePolling(min_interval=1, max_interval=60).start()
+    # no progress reported yet -> backoff
+    assert predictive.next_interval(0, 0) == 1
+    assert predictive.next_interval(10, 10) == 1.5
+    # 10% -> 20% in 10s => 80s remaining, capped by max_interval
+    assert predictive.next_interval(20, 20) == 60
+    # 10% -> 80% in 20s => ~5.7s remaining
+    assert predictive.next_interval(80, 30) == pytest.approx(20 * 20 / 70)
+    # 99% completed => at least min_interval
+    assert predictive.next_interval(99.9, 40) == 1
+
+    # jobs without any reported progress are polled at least every 5s
+    predictive = PredictivePolling(min_interval=1, max_interval=60).start()
+    intervals = [predictive.next_interval(None, t) for t in range(8)]
+    assert max(intervals) == 5
+    assert intervals[:3] == [1, 1.5, 2.25]
+
+
+def _http_error(code, headers=None):
+    return HTTPError("http://foo.bar", code, "", headers or {}, None)
+
+
+def test_RetryPolicy():
+    """Test the waiting times and limits of the retry policy"""
+    template = RetryPolicy(
+        max_retries=4, backoff_base=1, backoff_factor=2, backoff_max=5, jitter=0
+    )
+    policy = template.start()
+    error = URLError("connection refused")
+    assert [policy.next_delay(error) for _ in range(5)] == [1, 2, 4, 5, None]
+    # each request starts with a fresh state
+    assert template.start().next_delay(error) == 1
+
+    # jitter
+    policy = RetryPolicy(backoff_base=10, jitter=0.5).start()
+    assert 5 <= policy.next_delay(error) <= 15
+
+    # per-status-code rules
+    policy = RetryPolicy(status_codes={500: False, 404: True}, jitter=0).start()
+    assert policy.next_delay(_http_error(503)) == 5
+    assert policy.next_delay(_http_error(429)) == 10
+    assert policy.next_delay(_http_error(500)) is None
+    assert policy.next_delay(_http_error(400)) is None
+    assert policy.next_delay(_http_error(404)) == 20
+
+    # Retry-After header
+    policy = RetryPolicy().start()
+    assert policy.next_delay(_http_error(503, {"Retry-After": "42"})) == 42
+    policy = RetryPolicy(respect_retry_after=False, jitter=0).start()
+    assert policy.next_delay(_http_error(503, {"Retry-After": "42"})) == 5
+
+    # total retry budget
+    policy = RetryPolicy(backoff_base=10, jitter=0, max_total_time=25).start()
+    assert [policy.next_delay(error) for _ in range(3)] == [10, None, None]
+
+
+def test_WPS10Service_retry(server_url):
+    """Test that the failed requests are retried according to the policy"""
+    server, url = server_url
+    wps = WPS10Service(url, retry_policy=RetryPolicy(max_retries=2))
+    with pytest.raises(HTTPError):
+        wps.poll_status(f"{url}/unavailable")
+    assert server.unavailable_count == 3
+
+
+def test_WPS10Service_resumable_download(server_url):
+    """Test that an interrupted download is resumed by a Range request"""
+    server, url = server_url
+    wps = WPS10Service(url, retry_policy=RetryPolicy(backoff_base=0.01))
+
+    def _handler(file_obj):
+        return b"".join(iter(lambda: file_obj.read(1000), b""))
+
+    output = wps._retrieve(Request(f"{url}/flaky"), _handler, resumable=True)
+    assert output == PAYLOAD
+    assert server.ranges == [None, f"bytes={len(PAYLOAD) // 2}-"]
+    # the server ignoring the Range requests requires the full restart
+    with pytest.raises(URLError):
+        wps._retrieve(Request(f"{url}/flaky-norange"), resumable=True)
+
+
+def test_WPS10Service_parallel_download(server_url, monkeypatch, tmp_path):
+    """Test the download of a resource by multiple parallel connections"""
+    server, url = server_url
+    monkeypatch.setattr(download, "MIN_PART_SIZE", 1000)
+    monkeypatch.setattr(download, "DOWNLOAD_CHUNK_SIZE", 100)
+    wps = WPS10Service(url, download_connections=4)
+
+    def _handler(file_obj):
+        assert file_obj.info()["Content-Length"] == str(len(PAYLOAD))
+        return b"".join(iter(lambda: file_obj.read(333), b""))
+
+    output = wps._retrieve(
+        Request(f"{url}/ranged"), _handler, resumable=True, connections=4
+    )
+    assert output == PAYLOAD
+    assert server.ranges[0] == "bytes=0-0"
+    assert sorted(server.ranges[1:]) == [
+        "bytes=0-2499",
+        "bytes=2500-4999",
+        "bytes=5000-7499",
+        "bytes=7500-9999",
+    ]
+    # server not supporting the Range requests -> single connection
+    output = wps._retrieve(Request(f"{url}/data"), resumable=True, connections=4)
+    assert output == PAYLOAD
+
+    # parts downloaded directly into the target file
+    def _no_temporary_file():
+        raise AssertionError("temporary file used")
+
+    monkeypatch.setattr(download, "TemporaryFile", _no_temporary_file)
+    progress = []
+
+    def _target_handler(file_obj):
+        assert file_obj.target == _target_handler.target
+        file_obj.wait(progress.append)
+
+    _target_handler.target = str(tmp_path / "output")
+    wps._retrieve(
+        Request(f"{url}/ranged"), _target_handler, resumable=True, connections=4
+    )
+    assert (tmp_path / "output").read_bytes() == PAYLOAD
+    assert progress[-1] == len(PAYLOAD)
+    with pytest.raises(ValueError):
+        WPS10Service(url, download_connections=0)
+
+
+def test_WPS10Service_streamed_upload(server_url, tmp_path):
+    """Test the multipart payload streamed with an explicit Content-Length"""
+    server, url = server_url
+    wps = WPS10Service(url)
+    (tmp_path / "input").write_bytes(PAYLOAD)
+    with open(tmp_path / "input", "rb") as input_file:
+        parts = [
+            (b"<request/>", {"Content-Type": "application/xml"}),
+            (input_file, {"Content-Id": "input"}),
+        ]
+        expected = b"".join(generate_multipart_request(parts, "boundary"))
+        payload = MultipartPayload(parts, "boundary", chunksize=1000)
+        assert len(payload) == len(expected)
+        assert wps.retrieve(payload) == expected
+        assert server.post_headers[-1]["Content-Length"] == str(len(expected))
+        assert "Transfer-Encoding" not in server.post_headers[-1]
+        # the payload can be sent repeatedly
+        assert wps.retrieve(payload) == expected
+        assert bytes(payload) == expected
+
+
+def test_create_session_environment(server_url, tmp_path, monkeypatch):
+    """Test that the session honours the proxy settings but not ~/.netrc"""
+    server, url = server_url
+    (tmp_path / "netrc").write_text("machine 127.0.0.1 login user password secret\n")
+    monkeypatch.setenv("NETRC", str(tmp_path / "netrc"))
+    monkeypatch.setenv("HTTP_PROXY", "http://127.0.0.1:1")
+    monkeypatch.setenv("NO_PROXY", "127.0.0.1")
+    session = create_session()
+    request = Request(
+        f"{url}/data", data=b"payload", headers={"Authorization": "Bearer token"}
+    )
+    with open_request(session, request) as response:
+        assert response.read() == b"payload"
+    assert server.post_headers[-1]["Authorization"] == "Bearer token"
+    # bypassed proxy
+    monkeypatch.delenv("NO_PROXY")
+    with pytest.raises(URLError):
+        with open_request(create_session(), request):
+            pass